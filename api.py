@@ -0,0 +1,129 @@
+"""API JSON versionada (``/api/v1``) para o app móvel.
+
+Os dados são os mesmos das páginas (``queries`` e ``Catalog``), serializados
+de forma compacta com ``orjson`` quando instalado (senão ``json`` da
+biblioteca padrão, com a mesma saída para os tipos usados aqui).
+
+Todas as respostas têm ETag forte:
+
+- Perfis e trilhas: o JSON depende só do conteúdo, então é gerado uma vez
+  por digest do ``Catalog`` e guardado pronto (bytes e ETag).
+- Dashboard: o ETag vem de ``estatisticas_usuario.versao``, que os triggers
+  da migração 0007 aumentam a cada mudança nos dados do usuário. A versão
+  fica num cache em memória com TTL curto, invalidado pelo worker que grava;
+  dentro do TTL um ``If-None-Match`` igual vira 304 sem consultar o banco.
+  Gravações feitas por outro worker aparecem em no máximo um TTL.
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from cachetools import TTLCache
+
+import queries
+
+try:
+    import orjson
+except ImportError:  # opcional: serialização mais rápida
+    orjson = None
+
+VERSAO = "v1"
+MAX_USUARIOS_CACHE = 10000
+
+_lock = threading.Lock()
+_versoes = TTLCache(maxsize=MAX_USUARIOS_CACHE, ttl=5)
+
+
+def dumps(obj):
+    """JSON compacto em UTF-8 (``bytes``)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False,
+                      default=datetime.isoformat).encode("utf-8")
+
+
+def etag(*partes):
+    raw = ":".join(str(parte) for parte in (VERSAO, *partes)).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def blob(obj):
+    """``(corpo, etag)`` de um documento estático, para guardar pronto."""
+    corpo = dumps(obj)
+    return corpo, etag(hashlib.sha1(corpo).hexdigest())
+
+
+# --- VERSÃO DOS DADOS DO USUÁRIO ---
+def configure(ttl):
+    global _versoes
+    with _lock:
+        _versoes = TTLCache(maxsize=MAX_USUARIOS_CACHE, ttl=ttl)
+
+
+def invalidate(usuario_id):
+    with _lock:
+        _versoes.pop(usuario_id, None)
+
+
+def get_user_version(conn_factory, usuario_id):
+    """Versão dos dados do usuário; ``conn_factory`` só é chamada se a versão
+    não estiver no cache."""
+    with _lock:
+        versao = _versoes.get(usuario_id)
+    if versao is not None:
+        return versao
+    versao = queries.get_user_version(conn_factory(), usuario_id)
+    with _lock:
+        _versoes[usuario_id] = versao
+    return versao
+
+
+# --- DOCUMENTOS ---
+def _data(valor):
+    return valor.isoformat() if valor else None
+
+
+def perfil_payload(perfil_key, perfil):
+    return {
+        "perfil": perfil_key,
+        "nome": perfil.get("nome", perfil_key),
+        "descricao": perfil.get("descricao", ""),
+        "carreiras": perfil.get("carreiras", []),
+        "cursos_recomendados": perfil.get("cursos_recomendados", []),
+        "trilhas": [
+            {"id": trilha["id_trilha"], "titulo": trilha["titulo"], "duracao": trilha.get("duracao")}
+            for trilha in perfil.get("trilhas", [])
+        ],
+    }
+
+
+def trilha_payload(trilha, perfil_key):
+    return {
+        "id": trilha["id_trilha"],
+        "perfil": perfil_key,
+        "titulo": trilha["titulo"],
+        "duracao": trilha.get("duracao"),
+        "modulos": [
+            {"nome": modulo["nome"], "link": modulo.get("link")}
+            for modulo in trilha.get("modulos", [])
+        ],
+    }
+
+
+def dashboard_payload(nome, resumo, historico, proximo):
+    return {
+        "nome": nome,
+        "total_testes": resumo["total_testes"],
+        "total_feedbacks": resumo["total_feedbacks"],
+        "total_conversas": resumo["total_conversas"],
+        "ultimos_feedbacks": [
+            {"comentario": f["comentario"], "data_criacao": _data(f["data_criacao"])}
+            for f in resumo["ultimos_feedbacks"]
+        ],
+        "historico_testes": [
+            {"id": row["id"], "perfil": row["perfil"], "data_teste": _data(row["data_teste"])}
+            for row in historico
+        ],
+        "proximo_cursor": proximo,
+    }
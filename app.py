@@ -1,77 +1,167 @@
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, make_response
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from functools import wraps
-import sqlite3
+import click
+import hashlib
+import hmac
+import io
 import os
 import re
-from werkzeug.security import generate_password_hash, check_password_hash
+import sys
 import json
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+import api
+import assets
+import bulk_import
+import db
+import export
+import metrics as instrumentation
+import queries
+import repository
+import retention
+import rollups
+import search
+import sessions
+import stats as stats_cache
+from catalog import Catalog
+from chat_engine import ChatEngine
+from content_store import ContentError, ContentStore, load_content
+from db import get_db
+from passwords import HasherBusy, PasswordHasher
+from rate_limit_storage import default_storage_uri  # também registra o esquema sqlite://
+from scoring import Scorer, rescore_results
+from write_behind import WriteBehindQueue
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "trilhafuturo_secret_key_dev")
 
+app.config.update(
+    DB_NAME=os.environ.get("DB_NAME", "trilhafuturo.db"),
+    DATABASE_URL=os.environ.get("DATABASE_URL"),
+    DB_POOL_SIZE=int(os.environ.get("DB_POOL_SIZE", 8)),
+    DB_POOL_MAX_OVERFLOW=int(os.environ.get("DB_POOL_MAX_OVERFLOW", 0)),
+    DB_POOL_TIMEOUT=float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    DB_POOL_STATS=os.environ.get("DB_POOL_STATS", "0") == "1",
+    SQLITE_MMAP_SIZE=int(os.environ.get("SQLITE_MMAP_SIZE", 64 * 1024 * 1024)),
+    SQLITE_CACHE_SIZE=int(os.environ.get("SQLITE_CACHE_SIZE", -16000)),
+    STATS_CACHE_TTL=float(os.environ.get("STATS_CACHE_TTL", 5)),
+    USER_VERSION_CACHE_TTL=float(os.environ.get("USER_VERSION_CACHE_TTL", 5)),
+    WRITE_BEHIND_ENABLED=os.environ.get("WRITE_BEHIND_ENABLED", "0") == "1",
+    WRITE_BEHIND_BATCH_SIZE=int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", 100)),
+    WRITE_BEHIND_FLUSH_INTERVAL=float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", 0.5)),
+    WRITE_BEHIND_QUEUE_SIZE=int(os.environ.get("WRITE_BEHIND_QUEUE_SIZE", 10000)),
+    CHAT_CACHE_SIZE=int(os.environ.get("CHAT_CACHE_SIZE", 1024)),
+    CHAT_CACHE_TTL=float(os.environ.get("CHAT_CACHE_TTL", 3600)),
+    CHAT_CACHE_STATS=os.environ.get("CHAT_CACHE_STATS", "0") == "1",
+    SCORING_WEIGHTS_PATH=os.environ.get("SCORING_WEIGHTS_PATH"),
+    CONTENT_CACHE_MAX_AGE=int(os.environ.get("CONTENT_CACHE_MAX_AGE", 86400)),
+    CONTENT_PATH=os.environ.get("CONTENT_PATH", os.path.join(app.root_path, "content", "catalogo.json")),
+    CONTENT_SCHEMA_PATH=os.path.join(app.root_path, "content", "catalogo.schema.json"),
+    CONTENT_CHECK_INTERVAL=float(os.environ.get("CONTENT_CHECK_INTERVAL", 2)),
+    RATELIMIT_ENABLED=os.environ.get("RATELIMIT_ENABLED", "1") == "1",
+    PASSWORD_HASH_METHOD=os.environ.get("PASSWORD_HASH_METHOD", "scrypt"),
+    PASSWORD_HASH_WORKERS=int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+    PASSWORD_HASH_MAX_PENDING=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 8)),
+    PASSWORD_HASH_TIMEOUT=float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10)),
+    ADMIN_TOKEN=os.environ.get("ADMIN_TOKEN"),
+    BULK_IMPORT_HASH_WORKERS=int(os.environ.get("BULK_IMPORT_HASH_WORKERS", os.cpu_count() or 1)),
+    BULK_IMPORT_CHUNK_SIZE=int(os.environ.get("BULK_IMPORT_CHUNK_SIZE", bulk_import.CHUNK_SIZE)),
+    EXPORT_CHUNK_SIZE=int(os.environ.get("EXPORT_CHUNK_SIZE", export.CHUNK_SIZE)),
+    METRICS_ENABLED=os.environ.get("METRICS_ENABLED", "0") == "1",
+    METRICS_PATH=os.environ.get("METRICS_PATH", instrumentation.default_metrics_path()),
+    METRICS_FLUSH_INTERVAL=float(os.environ.get("METRICS_FLUSH_INTERVAL", 1)),
+    SLOW_REQUEST_MS=float(os.environ.get("SLOW_REQUEST_MS", 0)),
+    SESSION_BACKEND=os.environ.get("SESSION_BACKEND", "cookie"),
+    SESSION_STORE_PATH=os.environ.get("SESSION_STORE_PATH", sessions.default_store_path()),
+    SESSION_CLEANUP_INTERVAL=float(os.environ.get("SESSION_CLEANUP_INTERVAL", 60)),
+    RETENTION_CHAT_DAYS=int(os.environ.get("RETENTION_CHAT_DAYS", 0)),
+    RETENTION_FEEDBACK_DAYS=int(os.environ.get("RETENTION_FEEDBACK_DAYS", 0)),
+    RETENTION_BATCH_SIZE=int(os.environ.get("RETENTION_BATCH_SIZE", retention.BATCH_SIZE)),
+    ARCHIVE_PATH=os.environ.get("ARCHIVE_PATH", os.path.join(app.root_path, "archive")),
+    ASSETS_ENABLED=os.environ.get("ASSETS_ENABLED", "1") == "1",
+    ASSETS_MAX_AGE=int(os.environ.get("ASSETS_MAX_AGE", assets.MAX_AGE_IMUTAVEL)),
+    APP_VERSION=os.environ.get("APP_VERSION", ""),
+)
+
+# Arquivos estáticos com hash no nome, pré-comprimidos e com cache imutável,
+# quando static/dist foi gerado por "flask assets-build" (ver assets.py)
+static_assets = assets.Assets(app.static_folder, max_age=app.config["ASSETS_MAX_AGE"])
+static_assets.init_app(app, enabled=app.config["ASSETS_ENABLED"])
+
+# Sessões no servidor (opcional): o cookie leva só um id opaco (ver sessions.py)
+session_store = None
+if app.config["SESSION_BACKEND"] == "server":
+    session_store = sessions.SessionStore(
+        app.config["SESSION_STORE_PATH"],
+        cleanup_interval=app.config["SESSION_CLEANUP_INTERVAL"],
+    )
+    app.session_interface = sessions.ServerSessionInterface(session_store)
+
 # Configuração do Rate Limiting
+# Os contadores ficam num SQLite local compartilhado por todos os workers
+# (ver rate_limit_storage.py); RATELIMIT_STORAGE_URI=memory:// volta ao
+# comportamento por processo.
 limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=os.environ.get("RATELIMIT_STORAGE_URI", default_storage_uri())
 )
 
-DB_NAME = "trilhafuturo.db"
-
-# --- ESTRUTURAÇÃO DO BANCO DE DADOS ---
-def init_db():
-    # Esta função cria o banco de dados se ele não existir
-    if not os.path.exists(DB_NAME):
-        print(f"Criando banco de dados '{DB_NAME}'...")
-        with sqlite3.connect(DB_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS usuarios (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nome TEXT NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    senha TEXT NOT NULL,
-                    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS feedbacks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    usuario_id INTEGER,
-                    comentario TEXT NOT NULL,
-                    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
-                )
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS resultados_teste (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    usuario_id INTEGER,
-                    pontuacao INTEGER,
-                    perfil TEXT NOT NULL,
-                    data_teste TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
-                )
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS conversas_chat (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    usuario_id INTEGER,
-                    pergunta TEXT NOT NULL,
-                    resposta TEXT NOT NULL,
-                    data_conversa TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
-                )
-            """)
-            # Adicionar índices para melhor performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_email ON usuarios(email)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_resultados_usuario ON resultados_teste(usuario_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_feedbacks_usuario ON feedbacks(usuario_id)")
-        print("Banco de dados criado com sucesso.")
+# Hash de senhas num pool de processos limitado, com recusa rápida quando saturado
+password_hasher = PasswordHasher(
+    method=app.config["PASSWORD_HASH_METHOD"],
+    workers=app.config["PASSWORD_HASH_WORKERS"],
+    max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+    timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+)
+
+# Engine com pool de conexões por worker; as migrações pendentes são aplicadas
+# antes da primeira conexão (ou já em create_app)
+db.init_app(app)
+stats_cache.configure(app.config["STATS_CACHE_TTL"])
+api.configure(app.config["USER_VERSION_CACHE_TTL"])
+
+def invalidar_caches(registros):
+    # A versão em cache dos dados do usuário (ETag da API) e, com testes novos,
+    # os totais globais deixam de valer quando os registros estão gravados
+    for usuario_id in {valores.get("usuario_id") for _, valores in registros} - {None}:
+        api.invalidate(usuario_id)
+    if any(tabela == "resultados_teste" for tabela, _ in registros):
+        stats_cache.invalidate()
+
+# Fila write-behind opcional para chat, feedback e resultados de teste
+write_queue = None
+if app.config["WRITE_BEHIND_ENABLED"]:
+    write_queue = WriteBehindQueue(
+        db.connect,
+        batch_size=app.config["WRITE_BEHIND_BATCH_SIZE"],
+        flush_interval=app.config["WRITE_BEHIND_FLUSH_INTERVAL"],
+        max_size=app.config["WRITE_BEHIND_QUEUE_SIZE"],
+        # Depois do commit: antes dele, o que fosse relido ainda seria o antigo
+        on_written=invalidar_caches,
+    )
+
+# Latência por endpoint, SQL e templates, agregadas entre workers em /metrics
+metrics = None
+if app.config["METRICS_ENABLED"]:
+    metrics = instrumentation.Metrics(
+        app.config["METRICS_PATH"],
+        flush_interval=app.config["METRICS_FLUSH_INTERVAL"],
+        slow_request_ms=app.config["SLOW_REQUEST_MS"],
+    )
+    metrics.init_app(app, db.get_database().engine)
+
+# Matriz de pesos do teste vocacional, carregada uma única vez
+if app.config["SCORING_WEIGHTS_PATH"]:
+    scorer = Scorer.from_file(app.config["SCORING_WEIGHTS_PATH"])
+else:
+    scorer = Scorer()
 
 # --- FUNÇÕES AUXILIARES ---
 def validate_email(email):
@@ -81,130 +171,144 @@ def validate_email(email):
 def validate_password(senha):
     return len(senha) >= 6
 
-def get_db_connection():
-    ### CORREÇÃO ###
-    # Verificamos se o banco de dados existe *antes* de conectar.
-    # Se não existir (como no servidor após um 'rm'), a função init_db() será chamada.
-    init_db() 
-    
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# --- BASES DE CONHECIMENTO (DADOS ESTÁTICOS) ---
-CHAT_KNOWLEDGE_BASE = {
-    "ux": { 
-        "resposta": "UX Designer é um profissional que foca na experiência do usuário, criando produtos intuitivos e agradáveis. Trabalha com pesquisa de usuários, prototipagem e testes de usabilidade.", 
-        "carreiras": ["UX Designer", "UI Designer", "Product Designer", "UX Researcher"], 
-        "habilidades": ["Pesquisa com usuários", "Wireframes", "Testes de usabilidade", "Prototipagem"] 
-    },
-    "programação": { 
-        "resposta": "Programação envolve criar soluções através de código. Desenvolvedores trabalham com diversas linguagens e frameworks para construir aplicações web, mobile e desktop.", 
-        "carreiras": ["Desenvolvedor Front-end", "Desenvolvedor Back-end", "Full Stack", "Mobile Developer"], 
-        "habilidades": ["Lógica de programação", "Estruturas de dados", "Versionamento", "Resolução de problemas"] 
-    },
-    "dados": { 
-        "resposta": "Área de dados foca em coletar, processar e analisar informações para gerar insights valiosos para empresas.", 
-        "carreiras": ["Cientista de Dados", "Analista de Dados", "Engenheiro de Dados", "BI Analyst"], 
-        "habilidades": ["Estatística", "Python/R", "SQL", "Visualização de dados"] 
-    }
-}
-     
-RECOMENDACOES = {
-    "humanas": { 
-        "nome": "Área de Humanas", 
-        "descricao": "Perfil criativo e social, com forte habilidade de comunicação e interesse por relações humanas.", 
-        "carreiras": ["Psicólogo", "Professor", "Jornalista", "Advogado", "RH"], 
-        "cursos_recomendados": ["Psicologia", "Letras", "História", "Direito", "Pedagogia"],
-        # --- ADIÇÃO ---
-        "trilhas": [
-            {
-                "id_trilha": "humanas_comunicacao",
-                "titulo": "Fundamentos da Comunicação Social",
-                "duracao": "4 Semanas",
-                "modulos": [
-                    {"nome": "Introdução à Comunicação", "link": "https://youtu.be/80S_VmT8SQc?si=3QASrbXX7RstTAEz"},
-                    {"nome": "Comunicação e Oratória", "link": "https://youtu.be/cTQHrNOlAUo?si=wBubbzGVrTXemK_C"},
-                    {"nome": "Escrita Criativa", "link": "https://youtu.be/pb4DzrrGQvc?si=RxSHC7qlr4hgGv8j"},
-                ]
-            },
-            {
-                "id_trilha": "humanas_psicologia",
-                "titulo": "Introdução à Psicologia",
-                "duracao": "6 Semanas",
-                "modulos": [
-                    {"nome": "Psicologia Comportamental", "link": "https://youtu.be/I_yhJ8MG_MM?si=dV8FdrOWXz5G2U4a"},
-                    {"nome": "Processos Cognitivos", "link": "https://youtu.be/k9WBY0k5MC0?si=I1Ru9w1iruBStUlC"}
-                ]
-            }
-        ]
-        # --- FIM DA ADIÇÃO ---
-    },
-    "exatas": { 
-        "nome": "Área de Exatas", 
-        "descricao": "Perfil analítico e lógico, com aptidão para números e resolução de problemas complexos.", 
-        "carreiras": ["Engenheiro", "Cientista de Dados", "Desenvolvedor", "Matemático"], 
-        "cursos_recomendados": ["Engenharia", "Ciência da Computação", "Matemática", "Física"],
-        # --- ADIÇÃO ---
-        "trilhas": [
-            {
-                "id_trilha": "exatas_programacao",
-                "titulo": "Fundamentos da Programação",
-                "duracao": "8 Semanas",
-                "modulos": [
-                    {"nome": "Lógica de Programação", "link": "https://youtu.be/epf-WQdVis0?si=Xj9QQJ1WKDJsHQNu"},
-                    {"nome": "Introdução ao Python", "link": "https://youtu.be/g_R_Asf6Co0?si=HgOBVqro1UuXiIZA"},
-                    {"nome": "Estrutura de Dados", "link": "https://youtu.be/hCXDjdcn31A?si=bd9X7_Dbf2p9lNLq"}
-                ]
-            },
-            {
-                "id_trilha": "exatas_dados",
-                "titulo": "Introdução à Análise de Dados",
-                "duracao": "6 Semanas",
-                "modulos": [
-                    {"nome": "SQL Básico", "link": "https://youtu.be/QBDjB2V_uDM?si=VrErtEYCsNQc8Oey"},
-                    {"nome": "Estatística para Dados", "link": "https://youtu.be/n1ALcRhrn50?si=T38VeVaHO7P2rZQ_"},
-                    {"nome": "Visualização (Power BI/Tableau)", "link": "https://youtu.be/37oxzq2pSbI?si=n962WLbZeDp3DEOm"}
-                ]
-            }
-        ]
-        # --- FIM DA ADIÇÃO ---
-    },
-    "biologicas": { 
-        "nome": "Área de Biológicas", 
-        "descricao": "Perfil observador e investigativo, com interesse por seres vivos e processos naturais.", 
-        "carreiras": ["Médico", "Biólogo", "Enfermeiro", "Pesquisador"], 
-        "cursos_recomendados": ["Medicina", "Biologia", "Enfermagem", "Farmácia"],
-        # --- ADIÇÃO ---
-        "trilhas": [
-            {
-                "id_trilha": "bio_saude",
-                "titulo": "Fundamentos da Área da Saúde",
-                "duracao": "10 Semanas",
-                "modulos": [
-                    {"nome": "Anatomia Humana Básica", "link": "https://youtu.be/5c3Pp-b7uwc?si=0-Sdz7-UHXoMj1iV"},
-                    {"nome": "Bioquímica Celular", "link": "https://youtu.be/56ZQadxAgKA?si=vqgceM2brkQaTBQX"},
-                    {"nome": "Saúde Coletiva", "link": "https://www.youtube.com/live/9r9bZYE-RR4?si=wLhHVfhinrz6ZCXw"},
-                ]
-            },
-            {
-                "id_trilha": "bio_ambiental",
-                "titulo": "Ecologia e Ciências Ambientais",
-                "duracao": "8 Semanas",
-                "modulos": [
-                    {"nome": "Ecossistemas Brasileiros", "link": "https://youtu.be/r6Uhi4gb4hk?si=ZLVChIrVELE8jhZ_"},
-                    {"nome": "Gestão Ambiental", "link": "https://youtu.be/k5ZTYJVbcDY?si=_bKvB_HEi_noCqrs"}
-                ]
-            }
-        ]
-        # --- FIM DA ADIÇÃO ---
-    }
-}
+_versao_build = None
+
+def versao_build():
+    # Templates, manifesto dos assets e APP_VERSION: depois de um deploy as
+    # páginas ganham ETag novo, mesmo com o conteúdo igual. Calculada uma vez
+    # por processo, como o manifesto é lido uma vez.
+    global _versao_build
+    if _versao_build is None:
+        h = hashlib.sha1(app.config["APP_VERSION"].encode("utf-8"))
+        h.update(static_assets.digest.encode("utf-8"))
+        for nome in sorted(app.jinja_env.list_templates(extensions=["html"])):
+            fonte, _, _ = app.jinja_loader.get_source(app.jinja_env, nome)
+            h.update(f"{nome}\0{fonte}\0".encode("utf-8"))
+        _versao_build = h.hexdigest()[:12]
+    return _versao_build
+
+def pagina_condicional(digest_conteudo, render):
+    # Páginas de conteúdo estático: o ETag combina o digest do conteúdo e a
+    # versão do build com o que varia por usuário (nome e estado de login no
+    # cabeçalho), e um 304 dispensa qualquer renderização. Com mensagens flash
+    # pendentes a página precisa ser renderizada para exibi-las.
+    if '_flashes' in session:
+        return render()
+
+    logado = 'usuario_id' in session
+    variante = (f"{versao_build()}:{digest_conteudo}:{int(logado)}:"
+                f"{session.get('usuario_nome', '')}")
+    etag = hashlib.sha1(variante.encode("utf-8")).hexdigest()[:20]
+
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.vary.add("Cookie")
+    if logado:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        # Visitantes: navegador e CDN podem servir a página sem consultar o worker
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config["CONTENT_CACHE_MAX_AGE"]
+    return response
+
+def registrar_erro(mensagem):
+    # Erro tratado: vai para o log com o traceback e para a métrica do endpoint
+    app.logger.exception(mensagem)
+    if metrics is not None:
+        metrics.inc("trilhafuturo_handled_errors_total", endpoint=request.endpoint)
+
+def utc_timestamp():
+    # Fixado no momento da requisição, com a mesma precisão do CURRENT_TIMESTAMP
+    return datetime.utcnow().replace(microsecond=0)
+
+def salvar_registro(tabela, valores):
+    # Com WRITE_BEHIND_ENABLED o INSERT vai para a fila e é gravado em lote pela
+    # thread do worker, que invalida os caches depois do commit; se a fila
+    # estiver cheia (ou desabilitada), grava e invalida na hora.
+    if write_queue is not None and write_queue.submit(tabela, valores):
+        return
+    conn = get_db()
+    repository.insert_rows(conn, tabela, [valores])
+    conn.commit()
+    invalidar_caches([(tabela, valores)])
+
+def importar_usuarios(conn, stream, formato, dry_run=False, processos=None):
+    # Pool de hash só da importação, com todos os núcleos: os logins seguem
+    # no password_hasher sem disputar a fila com o lote
+    hasher = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["BULK_IMPORT_HASH_WORKERS"] if processos is None else processos,
+    )
+    try:
+        relatorio = bulk_import.run(
+            conn, stream, formato, hasher, scorer, validate_email, validate_password,
+            agora=utc_timestamp(), chunk_size=app.config["BULK_IMPORT_CHUNK_SIZE"], dry_run=dry_run,
+            on_written=lambda resultados: invalidar_caches(
+                [("resultados_teste", resultado) for resultado in resultados]),
+        )
+    finally:
+        hasher.shutdown()
+    if relatorio["importados"] and not dry_run:
+        stats_cache.invalidate()
+    return relatorio
+
+def admin_required(view):
+    # Rotas administrativas só existem com ADMIN_TOKEN configurado e exigem
+    # o cabeçalho "Authorization: Bearer <ADMIN_TOKEN>"
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config["ADMIN_TOKEN"]
+        if not token:
+            return jsonify({"error": "Não encontrado"}), 404
+        enviado = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(enviado.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return jsonify({"error": "Não autorizado"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+# --- BASES DE CONHECIMENTO (CONTEÚDO EXTERNO) ---
+# Perfis, trilhas e a base do chat ficam em content/catalogo.json, carregados
+# na primeira requisição e recarregados sem restart quando o arquivo muda.
+content_store = ContentStore(
+    app.config["CONTENT_PATH"],
+    app.config["CONTENT_SCHEMA_PATH"],
+    check_interval=app.config["CONTENT_CHECK_INTERVAL"],
+)
+
+# Índice de palavras-chave do chat (ver chat_engine.py)
+chat_engine = ChatEngine(
+    {},
+    fallback="",
+    cache_size=app.config["CHAT_CACHE_SIZE"],
+    cache_ttl=app.config["CHAT_CACHE_TTL"],
+)
+
+# Índice de trilhas e cache de fragmentos renderizados (ver catalog.py)
+catalog = Catalog()
+
+# Índice de busca textual do catálogo, em memória (ver search.py)
+search_index = search.CatalogIndex()
+
+# Cada índice só é reconstruído quando a sua seção do conteúdo muda
+content_store.on_change("recomendacoes", catalog.load)
+content_store.on_change("recomendacoes", search_index.load)
+content_store.on_change("chat", lambda chat: chat_engine.build(chat["topicos"], fallback=chat["fallback"]))
+
 # --- MIDDLEWARE DE AUTENTICAÇÃO ---
+@app.before_request
+def refresh_content():
+    # No máximo um stat a cada CONTENT_CHECK_INTERVAL segundos
+    content_store.refresh()
+
 @app.before_request
 def check_authentication():
     # Esta função já protege suas rotas. Não precisamos do decorador @login_required.
-    protected_routes = ['/dashboard', '/teste', '/feedback', '/chat', '/api/stats', '/api/chart/profile-distribution']
+    protected_routes = ['/dashboard', '/teste', '/feedback', '/chat', '/api/stats', '/api/chart/profile-distribution',
+                        '/api/chart/profile-trend', '/api/chart/test-volume', '/api/chart/chat-topics']
     if request.path in protected_routes and 'usuario_id' not in session:
         flash("Por favor, faça login para acessar esta página.", "warning")
         return redirect(url_for('login', next=request.path)) # 'next' leva o usuário de volta após o login
@@ -238,23 +342,15 @@ def index():
     chart_data = {"labels": [], "values": []}
 
     try:
-        with get_db_connection() as conn:
-            stats['total_users'] = conn.execute("SELECT COUNT(id) FROM usuarios").fetchone()[0]
-            stats['total_tests'] = conn.execute("SELECT COUNT(id) FROM resultados_teste").fetchone()[0]
-
-            dados_grafico = conn.execute("""
-                SELECT perfil, COUNT(id) as count
-                FROM resultados_teste
-                GROUP BY perfil
-            """).fetchall()
+        # Leitura O(1) dos contadores materializados (ver stats.py)
+        agregados = stats_cache.get_global_stats(get_db())
+        stats['total_users'] = agregados['total_users']
+        stats['total_tests'] = agregados['total_tests']
+        chart_data = agregados['chart']
 
-            if dados_grafico:
-                chart_data['labels'] = [row['perfil'].capitalize() for row in dados_grafico]
-                chart_data['values'] = [row['count'] for row in dados_grafico]
-
-    except Exception as e:
+    except Exception:
         # Se o banco de dados acabou de ser criado, as tabelas podem estar vazias
-        print(f"Erro ao buscar dados para a página inicial (pode ser normal na primeira execução): {e}")
+        registrar_erro("Erro ao buscar dados para a página inicial (pode ser normal na primeira execução)")
 
     chart_data_json = json.dumps(chart_data)
     return render_template("index.html", stats=stats, chart_data=chart_data_json)
@@ -277,18 +373,22 @@ def register():
             flash("A senha deve ter pelo menos 6 caracteres.", "danger")
             return render_template("register.html")
 
-        senha_hash = generate_password_hash(senha)
+        try:
+            # Hash calculado no pool de processos (ver passwords.py)
+            senha_hash = password_hasher.hash(senha)
+        except HasherBusy:
+            flash("Servidor ocupado no momento. Tente novamente em alguns segundos.", "warning")
+            return render_template("register.html"), 503
 
         try:
-            with get_db_connection() as conn:
-                conn.execute(
-                    "INSERT INTO usuarios (nome, email, senha) VALUES (?, ?, ?)",
-                    (nome, email, senha_hash)
-                )
-                conn.commit()
-                flash("Cadastro realizado com sucesso! Faça login.", "success")
-                return redirect(url_for("login"))
-        except sqlite3.IntegrityError:
+            conn = get_db()
+            repository.create_user(conn, nome, email, senha_hash)
+            conn.commit()
+            stats_cache.invalidate()
+            flash("Cadastro realizado com sucesso! Faça login.", "success")
+            return redirect(url_for("login"))
+        except IntegrityError:
+            get_db().rollback()
             flash("Este e-mail já está cadastrado.", "danger")
         except Exception as e:
             flash(f"Ocorreu um erro inesperado: {e}", "danger")
@@ -307,19 +407,34 @@ def login():
             return render_template("login.html")
 
         try:
-            with get_db_connection() as conn:
-                usuario = conn.execute("SELECT * FROM usuarios WHERE email = ?", (email,)).fetchone()
-
-                if usuario and check_password_hash(usuario["senha"], senha):
-                    session.clear() # Limpa qualquer sessão antiga
-                    session["usuario_id"] = usuario["id"]
-                    session["usuario_nome"] = usuario["nome"]
-                    session["usuario_email"] = usuario["email"]
-                    flash(f"Bem-vinda(o), {usuario['nome']}!", "success")
-                    next_page = request.args.get('next')
-                    return redirect(next_page or url_for("dashboard"))
-                else:
-                    flash("E-mail ou senha incorretos.", "danger")
+            conn = get_db()
+            usuario = repository.get_user_by_email(conn, email)
+
+            if usuario and password_hasher.verify(usuario["senha"], senha):
+                if password_hasher.needs_rehash(usuario["senha"]):
+                    # Hash com método/custo antigo: refaz com os parâmetros atuais.
+                    # A senha já foi conferida: se falhar (pool ocupado, banco), o
+                    # login segue e o hash é refeito num próximo login
+                    try:
+                        repository.update_password_hash(
+                            conn, usuario["id"], usuario["senha"], password_hasher.hash(senha)
+                        )
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        registrar_erro("Erro ao refazer o hash da senha no login")
+                session.clear() # Limpa qualquer sessão antiga
+                session["usuario_id"] = usuario["id"]
+                session["usuario_nome"] = usuario["nome"]
+                session["usuario_email"] = usuario["email"]
+                flash(f"Bem-vinda(o), {usuario['nome']}!", "success")
+                next_page = request.args.get('next')
+                return redirect(next_page or url_for("dashboard"))
+            else:
+                flash("E-mail ou senha incorretos.", "danger")
+        except HasherBusy:
+            flash("Servidor ocupado no momento. Tente novamente em alguns segundos.", "warning")
+            return render_template("login.html"), 503
         except Exception as e:
             flash(f"Ocorreu um erro inesperado: {e}", "danger")
 
@@ -344,38 +459,26 @@ def dashboard():
         return redirect(url_for('login'))
 
     historico_testes = []
+    proximo_cursor = None
     ultimos_feedbacks = []
     total_testes = 0
     total_feedbacks = 0
 
+    # Paginação por keyset: ?antes=<id do último teste da página anterior>
+    antes = request.args.get('antes', type=int)
+
     try:
-        with get_db_connection() as conn:
-            # Histórico de testes
-            historico_testes = conn.execute("""
-                SELECT perfil, data_teste FROM resultados_teste
-                WHERE usuario_id = ? ORDER BY data_teste DESC
-            """, (usuario_id,)).fetchall()
-
-            # Últimos feedbacks
-            ultimos_feedbacks = conn.execute("""
-                SELECT comentario, data_criacao FROM feedbacks
-                WHERE usuario_id = ? ORDER BY data_criacao DESC LIMIT 3
-            """, (usuario_id,)).fetchall()
-
-            # Total de testes
-            total_testes = conn.execute(
-                "SELECT COUNT(id) FROM resultados_teste WHERE usuario_id = ?",
-                (usuario_id,)
-            ).fetchone()[0]
-
-            # Total de feedbacks
-            total_feedbacks = conn.execute(
-                "SELECT COUNT(id) FROM feedbacks WHERE usuario_id = ?",
-                (usuario_id,)
-            ).fetchone()[0]
+        conn = get_db()
+        # Totais e últimos feedbacks numa única consulta
+        resumo = queries.get_user_summary(conn, usuario_id)
+        ultimos_feedbacks = resumo['ultimos_feedbacks']
+        total_testes = resumo['total_testes']
+        total_feedbacks = resumo['total_feedbacks']
+
+        # Histórico de testes (uma página)
+        historico_testes, proximo_cursor = queries.get_test_history(conn, usuario_id, antes=antes)
 
     except Exception as e:
-        # Este é o erro que você estava vendo!
         flash(f"Erro ao carregar dados do dashboard: {e}", "danger")
 
     ### CORREÇÃO ###
@@ -384,6 +487,7 @@ def dashboard():
     return render_template("dashboard.html",
                         nome=session.get("usuario_nome"),
                         historico_testes=historico_testes,
+                        proximo_cursor=proximo_cursor,
                         ultimos_feedbacks=ultimos_feedbacks,
                         total_testes=total_testes,
                         total_feedbacks=total_feedbacks)
@@ -397,42 +501,19 @@ def teste():
             flash("Você precisa responder pelo menos 5 perguntas para um resultado preciso.", "warning")
             return redirect(url_for("teste"))
 
-        pontuacao_humanas = 0
-        pontuacao_exatas = 0
-        pontuacao_biologicas = 0
-
-        for pergunta, resposta in respostas.items():
-            if resposta == "criativo":
-                pontuacao_humanas += 2
-                pontuacao_biologicas += 1
-            elif resposta == "analitico":
-                pontuacao_exatas += 2
-                pontuacao_biologicas += 1
-            elif resposta == "social":
-                pontuacao_humanas += 2
-                pontuacao_biologicas += 1
-            elif resposta == "organizado":
-                pontuacao_exatas += 1
-                pontuacao_humanas += 1
-
-        if pontuacao_exatas >= pontuacao_humanas and pontuacao_exatas >= pontuacao_biologicas:
-            perfil = "exatas"
-        elif pontuacao_biologicas >= pontuacao_humanas and pontuacao_biologicas >= pontuacao_exatas:
-            perfil = "biologicas"
-        else:
-            perfil = "humanas"
-        
-        # Pontuação total para salvar no DB (exemplo: a pontuação mais alta)
-        pontuacao_total = max(pontuacao_exatas, pontuacao_humanas, pontuacao_biologicas)
+        # Pontuação = contagens das respostas x matriz de pesos (ver scoring.py);
+        # a pontuação total salva no DB é a da área vencedora
+        perfil, pontuacao_total, contagens = scorer.score(respostas.values())
 
         try:
-            with get_db_connection() as conn:
-                conn.execute(
-                    "INSERT INTO resultados_teste (usuario_id, pontuacao, perfil) VALUES (?, ?, ?)",
-                    (session["usuario_id"], pontuacao_total, perfil)
-                )
-                conn.commit()
-                return redirect(url_for("resultado", perfil=perfil))
+            salvar_registro("resultados_teste", {
+                "usuario_id": session["usuario_id"],
+                "pontuacao": pontuacao_total,
+                "perfil": perfil,
+                "respostas": json.dumps(scorer.counts_to_dict(contagens)),
+                "data_teste": utc_timestamp(),
+            })
+            return redirect(url_for("resultado", perfil=perfil))
         except Exception as e:
             flash(f"Erro ao salvar resultado do teste: {e}", "danger")
 
@@ -440,73 +521,60 @@ def teste():
 
 @app.route("/resultado")
 def resultado():
-    perfil_key = request.args.get("perfil", "humanas")
-    perfil = RECOMENDACOES.get(perfil_key, RECOMENDACOES["humanas"])
+    perfil_key, perfil = catalog.get_perfil(request.args.get("perfil", "humanas"))
     nome = session.get("usuario_nome", "Visitante")
 
-    return render_template("resultado.html", perfil=perfil, nome=nome)
+    def render():
+        conteudo = catalog.fragment("perfil", perfil_key, "_perfil_conteudo.html", perfil=perfil)
+        return render_template("resultado.html", perfil=perfil, nome=nome, conteudo=conteudo)
+
+    return pagina_condicional(catalog.digest("perfil", perfil_key), render)
+
 @app.route("/trilha/<id_trilha>")
 def trilha(id_trilha):
     # Esta rota é acessível publicamente (ou protegida pelo @app.before_request se você preferir)
-    trilha_encontrada = None
-    perfil_key = None
-
-    # Procura a trilha em todos os perfis
-    for key, perfil in RECOMENDACOES.items():
-        for trilha_obj in perfil.get('trilhas', []):
-            if trilha_obj['id_trilha'] == id_trilha:
-                trilha_encontrada = trilha_obj
-                perfil_key = key
-                break
-        if trilha_encontrada:
-            break
-            
+    # Busca O(1) no índice id_trilha -> (trilha, perfil_key) montado na inicialização
+    trilha_encontrada, perfil_key = catalog.find_trilha(id_trilha)
+
     if not trilha_encontrada:
         flash("Trilha não encontrada.", "danger")
         return redirect(url_for("dashboard"))
 
-    return render_template("trilha.html", trilha=trilha_encontrada, perfil_key=perfil_key)
+    def render():
+        conteudo = catalog.fragment("trilha", id_trilha, "_trilha_conteudo.html",
+                                    trilha=trilha_encontrada, perfil_key=perfil_key)
+        return render_template("trilha.html", trilha=trilha_encontrada,
+                               perfil_key=perfil_key, conteudo=conteudo)
+
+    return pagina_condicional(catalog.digest("trilha", id_trilha), render)
+
 @app.route("/chat", methods=["GET", "POST"])
 @limiter.limit("10 per minute")
 def chat():
     reply = None
     carreiras = []
     habilidades = []
+    topico = None
 
     if request.method == "POST":
         pergunta = request.form.get("question", "").lower().strip()
         if not pergunta:
             flash("Por favor, digite uma pergunta.", "warning")
         else:
-            # Lógica de busca na base de conhecimento
-            if "ux" in pergunta or "design" in pergunta or "experiência" in pergunta:
-                info = CHAT_KNOWLEDGE_BASE["ux"]
-                reply = info["resposta"]
-                carreiras = info.get("carreiras", [])
-                habilidades = info.get("habilidades", [])
-            elif "programação" in pergunta or "codigo" in pergunta or "desenvolvedor" in pergunta:
-                info = CHAT_KNOWLEDGE_BASE["programação"]
-                reply = info["resposta"]
-                carreiras = info.get("carreiras", [])
-                habilidades = info.get("habilidades", [])
-            elif "dados" in pergunta or "analise" in pergunta or "estatística" in pergunta:
-                info = CHAT_KNOWLEDGE_BASE["dados"]
-                reply = info["resposta"]
-                carreiras = info.get("carreiras", [])
-                habilidades = info.get("habilidades", [])
-            else:
-                reply = "Desculpe, não entendi. Pode reformular a pergunta? Posso ajudar com informações sobre UX Design, Programação ou Área de Dados."
+            # Busca na base de conhecimento pelo índice de palavras-chave
+            reply, carreiras, habilidades, topico = chat_engine.answer(pergunta)
 
         if 'usuario_id' in session and reply:
             try:
-                with get_db_connection() as conn:
-                    conn.execute(
-                        "INSERT INTO conversas_chat (usuario_id, pergunta, resposta) VALUES (?, ?, ?)",
-                        (session["usuario_id"], pergunta, reply)
-                    )
-                    conn.commit()
-            except Exception as e:
-                print(f"Erro ao salvar conversa: {e}")
+                salvar_registro("conversas_chat", {
+                    "usuario_id": session["usuario_id"],
+                    "pergunta": pergunta,
+                    "resposta": reply,
+                    "data_conversa": utc_timestamp(),
+                    "topico": topico or rollups.SEM_TOPICO,
+                })
+            except Exception:
+                registrar_erro("Erro ao salvar conversa")
 
     return render_template("chat.html", reply=reply, carreiras=carreiras, habilidades=habilidades)
 
@@ -521,14 +589,13 @@ def feedback():
             flash("O feedback deve ter pelo menos 10 caracteres.", "danger")
         else:
             try:
-                with get_db_connection() as conn:
-                    conn.execute(
-                        "INSERT INTO feedbacks (usuario_id, comentario) VALUES (?, ?)",
-                        (session["usuario_id"], comentario)
-                    )
-                    conn.commit()
-                    flash("Feedback enviado com sucesso! Obrigado pela contribuição.", "success")
-                    return redirect(url_for("dashboard"))
+                salvar_registro("feedbacks", {
+                    "usuario_id": session["usuario_id"],
+                    "comentario": comentario,
+                    "data_criacao": utc_timestamp(),
+                })
+                flash("Feedback enviado com sucesso! Obrigado pela contribuição.", "success")
+                return redirect(url_for("dashboard"))
             except Exception as e:
                 flash(f"Erro ao enviar feedback: {e}", "danger")
 
@@ -542,19 +609,13 @@ def api_stats():
         return jsonify({"error": "Não autorizado"}), 401
         
     try:
-        with get_db_connection() as conn:
-            total_testes = conn.execute("SELECT COUNT(*) FROM resultados_teste WHERE usuario_id = ?", 
-                                      (usuario_id,)).fetchone()[0]
-            total_feedbacks = conn.execute("SELECT COUNT(*) FROM feedbacks WHERE usuario_id = ?", 
-                                         (usuario_id,)).fetchone()[0]
-            total_conversas = conn.execute("SELECT COUNT(*) FROM conversas_chat WHERE usuario_id = ?", 
-                                         (usuario_id,)).fetchone()[0]
-
-            return jsonify({
-                "total_testes": total_testes,
-                "total_feedbacks": total_feedbacks,
-                "total_conversas": total_conversas
-            })
+        resumo = queries.get_user_summary(get_db(), usuario_id)
+
+        return jsonify({
+            "total_testes": resumo["total_testes"],
+            "total_feedbacks": resumo["total_feedbacks"],
+            "total_conversas": resumo["total_conversas"]
+        })
     except Exception as e:
         return jsonify({"error": f"Erro interno: {e}"}), 500
 
@@ -562,23 +623,215 @@ def api_stats():
 def profile_distribution_chart():
     # Este gráfico mostra a distribuição de TODOS os usuários, por isso não filtra por usuario_id
     try:
-        with get_db_connection() as conn:
-            dados_grafico = conn.execute("""
-                SELECT perfil, COUNT(id) as count
-                FROM resultados_teste
-                GROUP BY perfil
-            """).fetchall()
-
-            if not dados_grafico:
-                return jsonify({"labels": [], "values": []})
+        agregados = stats_cache.get_global_stats(get_db())
+    except Exception as e:
+        return jsonify({"error": f"Erro interno: {e}"}), 500
 
-            labels = [row['perfil'].capitalize() for row in dados_grafico]
-            values = [row['count'] for row in dados_grafico]
+    # Clientes que fazem polling recebem 304 enquanto a distribuição não mudar
+    response = jsonify(agregados["chart"])
+    response.set_etag(f"perfis-{agregados['version']}")
+    response.last_modified = agregados["last_modified"]
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
-            return jsonify({"labels": labels, "values": values})
+def rollup_chart(consulta):
+    # ?granularidade=dia|semana|mes&inicio=AAAA-MM-DD&fim=AAAA-MM-DD
+    try:
+        periodo = rollups.parse_periodo(
+            request.args.get("granularidade", "dia"),
+            request.args.get("inicio"),
+            request.args.get("fim"),
+        )
+    except rollups.RollupError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        dados = consulta(get_db(), *periodo)
     except Exception as e:
         return jsonify({"error": f"Erro interno: {e}"}), 500
 
+    # Lê só os rollups; o ETag do conteúdo poupa a transferência no polling
+    response = jsonify(dados)
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route("/api/chart/profile-trend")
+def profile_trend_chart():
+    return rollup_chart(rollups.profile_trend)
+
+@app.route("/api/chart/test-volume")
+def test_volume_chart():
+    return rollup_chart(rollups.test_volume)
+
+@app.route("/api/chart/chat-topics")
+def chat_topics_chart():
+    return rollup_chart(rollups.chat_topics)
+
+@app.route("/api/search")
+@limiter.limit("60 per minute")
+def search_api():
+    # Catálogo para todos; conversas só as do próprio usuário logado
+    termos = search.parse_query(request.args.get("q", ""))
+    escopo = request.args.get("escopo", "tudo")
+    if not termos:
+        return jsonify({"error": "Informe o que buscar em 'q'"}), 400
+    if escopo not in search.ESCOPOS:
+        return jsonify({"error": f"Escopo inválido (use {', '.join(search.ESCOPOS)})"}), 400
+    if escopo == "conversas" and 'usuario_id' not in session:
+        return jsonify({"error": "Faça login para buscar nas suas conversas"}), 401
+    limite = min(max(request.args.get("limite", search.LIMITE_PADRAO, type=int), 1), search.MAX_LIMITE)
+
+    resultado = {"termos": termos}
+    if escopo in ("tudo", "catalogo"):
+        itens = search_index.search(termos, limite)
+        for item in itens:
+            if item["tipo"] in ("trilha", "modulo"):
+                item["url"] = url_for("trilha", id_trilha=item["chave"])
+            else:
+                item["url"] = url_for("resultado", perfil=item["perfil"])
+        resultado["catalogo"] = itens
+    if escopo in ("tudo", "conversas") and 'usuario_id' in session:
+        try:
+            resultado["conversas"] = search.search_chats(get_db(), session["usuario_id"], termos, limite)
+        except Exception:
+            registrar_erro("Erro ao buscar conversas")
+            return jsonify({"error": "Erro interno"}), 500
+
+    response = jsonify(resultado)
+    response.vary.add("Cookie")
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+# --- API JSON (v1) ---
+def resposta_json(corpo, etag, publica):
+    # ETag forte; com If-None-Match igual, 304 sem corpo
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(corpo, mimetype="application/json")
+    response.set_etag(etag)
+    if publica:
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config["CONTENT_CACHE_MAX_AGE"]
+    else:
+        response.vary.add("Cookie")
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
+
+@app.route("/api/v1/perfis/<perfil_key>")
+def api_perfil(perfil_key):
+    if perfil_key not in catalog.recomendacoes:
+        return jsonify({"error": "Não encontrado"}), 404
+    _, perfil = catalog.get_perfil(perfil_key)
+    corpo, etag = catalog.blob("perfil", perfil_key, lambda: api.blob(api.perfil_payload(perfil_key, perfil)))
+    return resposta_json(corpo, etag, publica=True)
+
+@app.route("/api/v1/trilhas/<id_trilha>")
+def api_trilha(id_trilha):
+    trilha_encontrada, perfil_key = catalog.find_trilha(id_trilha)
+    if not trilha_encontrada:
+        return jsonify({"error": "Não encontrado"}), 404
+    corpo, etag = catalog.blob("trilha", id_trilha,
+                               lambda: api.blob(api.trilha_payload(trilha_encontrada, perfil_key)))
+    return resposta_json(corpo, etag, publica=True)
+
+@app.route("/api/v1/me/dashboard")
+def api_dashboard():
+    usuario_id = session.get("usuario_id")
+    if not usuario_id:
+        return jsonify({"error": "Não autorizado"}), 401
+    antes = request.args.get("antes", type=int)
+    nome = session.get("usuario_nome")
+    try:
+        # Dentro do TTL do cache de versões, um 304 não consulta o banco
+        versao = api.get_user_version(get_db, usuario_id)
+        etag = api.etag(usuario_id, versao, nome, antes)
+        if request.if_none_match.contains(etag):
+            return resposta_json(None, etag, publica=False)
+        conn = get_db()
+        resumo = queries.get_user_summary(conn, usuario_id)
+        historico, proximo = queries.get_test_history(conn, usuario_id, antes=antes)
+    except Exception:
+        registrar_erro("Erro ao carregar dados do dashboard (API)")
+        return jsonify({"error": "Erro interno"}), 500
+    corpo = api.dumps(api.dashboard_payload(nome, resumo, historico, proximo))
+    return resposta_json(corpo, etag, publica=False)
+
+@app.route("/metrics")
+@limiter.exempt
+def prometheus_metrics():
+    # Soma de todos os workers (ver metrics.py), para o scrape do Prometheus
+    if metrics is None:
+        return jsonify({"error": "Não encontrado"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/db/pool-stats")
+def db_pool_stats():
+    # Estatísticas do pool deste worker, para dimensionar DB_POOL_SIZE sob carga
+    if not app.config["DB_POOL_STATS"]:
+        return jsonify({"error": "Não encontrado"}), 404
+    payload = {"pid": os.getpid(), **db.get_database().stats()}
+    if write_queue is not None:
+        payload["write_behind"] = write_queue.stats()
+    return jsonify(payload)
+
+@app.route("/api/chat/cache-stats")
+def chat_cache_stats():
+    # Acertos, erros e remoções do cache de respostas do chat neste worker
+    if not app.config["CHAT_CACHE_STATS"]:
+        return jsonify({"error": "Não encontrado"}), 404
+    return jsonify({"pid": os.getpid(), **chat_engine.cache_stats()})
+
+@app.route("/api/admin/export/<tabela>")
+@admin_required
+def admin_export(tabela):
+    # Streaming em blocos: ?formato=csv|ndjson|parquet&desde_id=<watermark>&desde=<data ISO>
+    try:
+        ate_id, dados = export.prepare(
+            db.connect,
+            tabela,
+            formato=request.args.get("formato", "csv"),
+            desde_id=request.args.get("desde_id", type=int),
+            desde=request.args.get("desde"),
+            chunk_size=request.args.get("chunk", app.config["EXPORT_CHUNK_SIZE"], type=int),
+        )
+    except export.ExportError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mimetype, extensao = export.FORMATOS[request.args.get("formato", "csv")]
+    response = Response(dados, mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{tabela}-{ate_id}.{extensao}"'
+    # Próxima exportação incremental: ?desde_id=<este valor>
+    response.headers["X-Export-Watermark"] = str(ate_id)
+    response.cache_control.no_store = True
+    return response
+
+@app.route("/api/admin/users/<int:usuario_id>/sessions", methods=["DELETE"])
+@admin_required
+def admin_revoke_sessions(usuario_id):
+    # Encerra todas as sessões do usuário (ex.: conta comprometida)
+    if session_store is None:
+        return jsonify({"error": "Disponível apenas com SESSION_BACKEND=server"}), 404
+    return jsonify({"usuario_id": usuario_id, "sessoes_encerradas": session_store.revoke_user(usuario_id)})
+
+@app.route("/api/admin/users/import", methods=["POST"])
+@admin_required
+def admin_import_users():
+    # Corpo CSV (cabeçalho nome,email,senha[,respostas]) ou NDJSON, lido em
+    # streaming; ?formato=csv|ndjson (padrão: pelo Content-Type) e ?dry_run=1
+    formato = request.args.get("formato") or bulk_import.format_for(request.mimetype)
+    if formato not in bulk_import.FORMATOS:
+        return jsonify({"error": "Informe o formato (csv ou ndjson) em 'formato' ou no Content-Type"}), 400
+    stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding="utf-8-sig", newline="")
+    try:
+        relatorio = importar_usuarios(get_db(), stream, formato,
+                                      dry_run=request.args.get("dry_run") == "1")
+    except (bulk_import.BulkImportError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(relatorio)
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template("404.html"), 404
@@ -589,14 +842,229 @@ def internal_error(error):
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
+    if metrics is not None:
+        metrics.inc("trilhafuturo_ratelimit_rejections_total", endpoint=request.endpoint)
     flash("Muitas tentativas em pouco tempo. Aguarde um momento antes de tentar novamente.", "warning")
     # Redireciona para a página anterior ou para o index
     return redirect(request.referrer or url_for("index"))
 
+# --- COMANDOS DE LINHA DE COMANDO (flask ...) ---
+@app.cli.command("rescore")
+@click.option("--pesos", type=click.Path(exists=True, dir_okay=False),
+              help="JSON com novos pesos; o padrão é a matriz atual.")
+@click.option("--dry-run", is_flag=True, help="Só mostra o efeito, sem gravar.")
+@click.option("--chunk-size", default=50000, show_default=True)
+def rescore_command(pesos, dry_run, chunk_size):
+    """Recalcula os resultados de teste salvos com a matriz de pesos."""
+    novo_scorer = Scorer.from_file(pesos) if pesos else scorer
+    with db.connect() as conn:
+        resumo = rescore_results(conn, novo_scorer, chunk_size=chunk_size, dry_run=dry_run)
+    stats_cache.invalidate()
+
+    click.echo(f"Resultados analisados: {resumo['analisados']}")
+    click.echo(f"Resultados {'que mudariam' if dry_run else 'alterados'}: {resumo['alterados']}")
+    for perfil in sorted(set(resumo["antes"]) | set(resumo["depois"]), key=str):
+        click.echo(f"  {perfil}: {resumo['antes'].get(perfil, 0)} -> {resumo['depois'].get(perfil, 0)}")
+
+@app.cli.command("db-upgrade")
+@click.argument("revisao", default="head")
+def db_upgrade_command(revisao):
+    """Aplica as migrações do banco até a revisão indicada."""
+    url = db.database_url(app.config["DB_NAME"], app.config["DATABASE_URL"])
+    db.upgrade_database(url, revisao)
+    click.echo(f"Banco atualizado até a revisão {revisao}.")
+
+@app.cli.command("export")
+@click.argument("tabela", type=click.Choice(sorted(export.TABELAS)))
+@click.option("--formato", type=click.Choice(sorted(export.FORMATOS)), default="csv", show_default=True)
+@click.option("--saida", "-o", default="-", help="Arquivo de saída ('-' = stdout).")
+@click.option("--desde-id", type=int, help="Só registros com id maior (watermark anterior).")
+@click.option("--desde", help="Só registros a partir desta data (AAAA-MM-DD[THH:MM:SS]).")
+@click.option("--chunk-size", default=export.CHUNK_SIZE, show_default=True)
+def export_command(tabela, formato, saida, desde_id, desde, chunk_size):
+    """Exporta resultados de teste ou conversas do chat em streaming."""
+    try:
+        ate_id, dados = export.prepare(db.connect, tabela, formato=formato, desde_id=desde_id,
+                                       desde=desde, chunk_size=chunk_size)
+    except export.ExportError as e:
+        raise click.ClickException(str(e))
+    with click.open_file(saida, "wb") as f:
+        for bloco in dados:
+            f.write(bloco)
+    click.echo(f"Watermark: {ate_id} (próxima exportação: --desde-id {ate_id})", err=True)
+
+@app.cli.command("rollups-backfill")
+@click.option("--desde", type=click.DateTime(["%Y-%m-%d"]), help="Primeiro dia a recalcular.")
+@click.option("--ate", type=click.DateTime(["%Y-%m-%d"]), help="Último dia a recalcular.")
+@click.option("--classificar/--sem-classificar", default=True, show_default=True,
+              help="Classifica antes o tópico das conversas antigas (sem tópico).")
+@click.option("--chunk-size", default=5000, show_default=True)
+def rollups_backfill_command(desde, ate, classificar, chunk_size):
+    """Reconstrói os rollups dos gráficos de tendência a partir dos registros."""
+    desde = desde.date() if desde else None
+    ate = ate.date() if ate else None
+    with db.connect() as conn:
+        if classificar:
+            content_store.refresh()  # fora de requisição o conteúdo ainda não foi carregado
+            total = rollups.classify_chats(conn, chat_engine.classify, chunk_size=chunk_size)
+            click.echo(f"Conversas classificadas: {total}")
+        linhas = rollups.rebuild(conn, desde=desde, ate=ate)
+        conn.commit()
+    for tabela, total in linhas.items():
+        click.echo(f"{tabela}: {total} linhas recalculadas")
+
+@app.cli.command("sessions-revoke")
+@click.argument("email")
+def sessions_revoke_command(email):
+    """Encerra todas as sessões de um usuário (SESSION_BACKEND=server)."""
+    if session_store is None:
+        raise click.ClickException("Disponível apenas com SESSION_BACKEND=server.")
+    with db.connect() as conn:
+        usuario = repository.get_user_by_email(conn, email.strip().lower())
+    if usuario is None:
+        raise click.ClickException(f"Usuário não encontrado: {email}")
+    click.echo(f"Sessões encerradas: {session_store.revoke_user(usuario['id'])}")
+
+@app.cli.command("sessions-cleanup")
+def sessions_cleanup_command():
+    """Remove as sessões expiradas do store (SESSION_BACKEND=server)."""
+    if session_store is None:
+        raise click.ClickException("Disponível apenas com SESSION_BACKEND=server.")
+    click.echo(f"Sessões expiradas removidas: {session_store.cleanup()}")
+    click.echo(f"Sessões ativas: {session_store.count()}")
+
+@app.cli.command("maintenance")
+@click.option("--dias-chat", type=int, help="Retenção das conversas em dias (padrão: RETENTION_CHAT_DAYS; 0 = tudo).")
+@click.option("--dias-feedback", type=int, help="Retenção dos feedbacks em dias (padrão: RETENTION_FEEDBACK_DAYS).")
+@click.option("--formato", type=click.Choice(sorted(retention.FORMATOS)), default="parquet", show_default=True)
+@click.option("--pasta", help="Destino dos arquivos (padrão: ARCHIVE_PATH).")
+@click.option("--batch-size", type=int, help="Registros apagados por transação (padrão: RETENTION_BATCH_SIZE).")
+@click.option("--pausa", default=0.05, show_default=True, help="Segundos entre lotes de exclusão.")
+@click.option("--vacuum-completo", is_flag=True, help="SQLite: VACUUM completo para ativar o modo incremental (uma vez).")
+@click.option("--a-cada", type=float, help="Repete a cada N horas, sem cron (o comando fica rodando).")
+def maintenance_command(dias_chat, dias_feedback, formato, pasta, batch_size, pausa, vacuum_completo, a_cada):
+    """Arquiva e apaga conversas e feedbacks antigos e compacta o banco."""
+    pasta = pasta or app.config["ARCHIVE_PATH"]
+    retencao = {
+        "conversas_chat": app.config["RETENTION_CHAT_DAYS"] if dias_chat is None else dias_chat,
+        "feedbacks": app.config["RETENTION_FEEDBACK_DAYS"] if dias_feedback is None else dias_feedback,
+    }
+
+    def mb(valor):
+        return f"{valor / 1024 / 1024:.1f} MB"
+
+    while True:
+        try:
+            with retention.exclusive(pasta):
+                _, compactacao = retention.run(
+                    db.get_database(), pasta, retencao, formato=formato,
+                    batch_size=batch_size or app.config["RETENTION_BATCH_SIZE"], pausa=pausa,
+                    vacuum_completo=vacuum_completo, echo=click.echo,
+                )
+        except retention.RetentionError as e:
+            raise click.ClickException(str(e))
+        antes, depois = compactacao["antes"], compactacao["depois"]
+        click.echo(f"Banco: {mb(antes)} -> {mb(depois)} ({mb(antes - depois)} recuperados, "
+                   f"compactação: {compactacao['modo']})")
+        if compactacao["livres_depois"]:
+            click.echo(f"Espaço livre dentro do arquivo: {mb(compactacao['livres_depois'])}")
+        if not a_cada:
+            return
+        # Só a primeira execução converte o arquivo
+        vacuum_completo = False
+        click.echo(f"Próxima manutenção em {a_cada:g} h")
+        time.sleep(a_cada * 3600)
+
+@app.cli.command("assets-build")
+@click.option("--fontes", is_flag=True, help="Baixa antes a Poppins para static/fonts (uma vez).")
+@click.option("--sem-minificar", is_flag=True, help="Só fingerprint e compressão.")
+def assets_build_command(fontes, sem_minificar):
+    """Gera static/dist: arquivos minificados, com hash no nome e pré-comprimidos."""
+    if fontes:
+        try:
+            assets.download_fonts(app.static_folder, echo=click.echo)
+        except Exception as e:
+            raise click.ClickException(f"Falha ao baixar as fontes: {e}")
+    manifesto = assets.build(app.static_folder, minificar=not sem_minificar, echo=click.echo)
+    click.echo(f"{len(manifesto['arquivos'])} arquivos em static/{assets.PASTA_DIST} "
+               "(reinicie os workers para usá-los)")
+
+@app.cli.command("users-import")
+@click.argument("arquivo", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--formato", type=click.Choice(sorted(bulk_import.FORMATOS)),
+              help="Padrão: pela extensão do arquivo.")
+@click.option("--processos", type=int, help="Processos de hash (padrão: BULK_IMPORT_HASH_WORKERS).")
+@click.option("--dry-run", is_flag=True, help="Só valida, sem gravar.")
+@click.option("--relatorio", type=click.Path(dir_okay=False), help="Grava o relatório completo em JSON.")
+def users_import_command(arquivo, formato, processos, dry_run, relatorio):
+    """Importa usuários (e respostas do teste) de um CSV ou NDJSON.
+
+    Linhas com e-mail já cadastrado e respostas do teste gravam o resultado
+    na conta existente (nome e senha do arquivo são ignorados); sem respostas,
+    são recusadas e aparecem como erro no relatório.
+    """
+    formato = formato or bulk_import.format_for(arquivo)
+    if formato is None:
+        raise click.ClickException("Informe --formato (csv ou ndjson)")
+    if arquivo == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    else:
+        stream = open(arquivo, encoding="utf-8-sig", newline="")
+    try:
+        with stream, db.connect() as conn:
+            resultado = importar_usuarios(conn, stream, formato, dry_run=dry_run, processos=processos)
+    except (bulk_import.BulkImportError, UnicodeDecodeError) as e:
+        raise click.ClickException(str(e))
+
+    if relatorio:
+        with open(relatorio, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+    for erro in resultado["erros"]:
+        click.echo(f"Linha {erro['linha']}: {erro['email'] or '-'}: {erro['erro']}", err=True)
+    click.echo(f"Registros: {resultado['registros']}, "
+               f"{'válidos' if dry_run else 'importados'}: {resultado['importados']}, "
+               f"com teste: {resultado['testes']} "
+               f"({resultado['testes_de_cadastrados']} de usuários já cadastrados), "
+               f"erros: {resultado['total_erros']}")
+    if resultado["total_erros"]:
+        sys.exit(1)
+
+@app.cli.command("content-validate")
+@click.argument("path", required=False, type=click.Path(exists=True, dir_okay=False))
+def content_validate_command(path):
+    """Valida um arquivo de conteúdo antes de publicá-lo."""
+    path = path or app.config["CONTENT_PATH"]
+    try:
+        data = load_content(path, app.config["CONTENT_SCHEMA_PATH"])
+    except ContentError as e:
+        raise click.ClickException(str(e))
+    trilhas = sum(len(p["trilhas"]) for p in data["recomendacoes"].values())
+    click.echo(f"{path}: OK ({len(data['recomendacoes'])} perfis, {trilhas} trilhas, "
+               f"{len(data['chat']['topicos'])} tópicos do chat)")
+
+# --- FÁBRICA DA APLICAÇÃO ---
+def create_app(preload=False):
+    """Prepara o app para servir e o devolve (``gunicorn "app:create_app()"``).
+
+    Importar o módulo não abre conexão nem importa alembic, jsonschema ou
+    numpy: cada um é carregado no primeiro uso. Aqui as migrações pendentes
+    são aplicadas já na subida, para um banco inacessível derrubar o worker
+    em vez da primeira requisição. Com ``preload`` (gunicorn ``--preload``,
+    chamado uma vez no processo mestre) também são carregados o conteúdo e
+    seus índices, a matriz do teste e os templates compilados: os workers
+    nascem prontos e compartilham essas páginas de memória com o mestre.
+    """
+    db.get_database().ensure_schema()
+    if preload:
+        content_store.refresh()
+        # Montada antes do fork, a matriz fica compartilhada (copy-on-write)
+        scorer.warm()
+        for nome in app.jinja_env.list_templates(extensions=["html"]):
+            app.jinja_env.get_template(nome)
+        versao_build()
+    return app
+
 # --- EXECUÇÃO DA APLICAÇÃO ---
 if __name__ == "__main__":
-    ### CORREÇÃO ###
-    # Removido o init_db() daqui, pois ele agora é chamado por get_db_connection()
-    # Removido o bloco duplicado
     port = int(os.environ.get("PORT", 5002))
-    app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
+    create_app().run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
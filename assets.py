@@ -0,0 +1,299 @@
+"""Pipeline dos arquivos estáticos: minificação, fingerprint e pré-compressão.
+
+``build`` copia cada arquivo de ``static/`` para ``static/dist/`` com o hash
+do conteúdo no nome (``css/style.css`` -> ``css/style.3f9a1c2b7d4e.css``),
+minificando CSS e JS e gerando ao lado as variantes ``.gz`` e, com o pacote
+``brotli`` instalado, ``.br``. O mapa nome lógico -> nome com hash vai para
+``static/dist/manifest.json``; referências ``url(...)`` dentro dos CSS são
+reescritas para os nomes com hash. Arquivos de builds anteriores não são
+apagados, para páginas já servidas continuarem achando os seus.
+
+``Assets.init_app`` faz ``url_for('static', filename=...)`` devolver o nome
+com hash e troca a view ``static``: arquivos de ``dist/`` são servidos com
+``Cache-Control: immutable`` de um ano e, conforme o ``Accept-Encoding``, a
+variante pré-comprimida com ``Content-Encoding``. Sem manifesto (ou com
+``ASSETS_ENABLED=0``) nada muda. O manifesto é lido na inicialização: depois
+de um build os workers precisam ser reiniciados.
+
+``download_fonts`` baixa a Poppins do Google Fonts uma única vez, só o
+subconjunto ``latin`` (que cobre o português), para ``static/fonts/`` e
+escreve ``static/css/fontes.css``; a partir daí ``base.html`` usa as fontes
+locais em vez da folha do Google.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PASTA_DIST = "dist"
+MANIFESTO = "manifest.json"
+MAX_AGE_IMUTAVEL = 365 * 86400
+
+# Formatos de texto; imagens e woff2 já são comprimidos
+COMPRIMIVEIS = {".css", ".js", ".svg", ".json", ".txt", ".ico", ".map"}
+COMPRESSAO_MINIMA = 512
+
+# Preferência do servidor quando o cliente aceita as duas
+CODIFICACOES = (("br", ".br"), ("gzip", ".gz"))
+
+FONTES_URL = "https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600;700&display=swap"
+FONTES_SUBCONJUNTO = "latin"
+# O Google só devolve woff2 para navegadores que o suportam
+FONTES_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                     "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+
+
+# --- MINIFICAÇÃO ---
+_CSS_COMENTARIO_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_ESPACO_RE = re.compile(r"\s+")
+_CSS_PONTUACAO_RE = re.compile(r"\s*([{};,])\s*")
+_CSS_DOIS_PONTOS_RE = re.compile(r":\s+")
+
+
+def minify_css(texto):
+    """Remove comentários e espaços supérfluos.
+
+    Conservador: não mexe no espaço antes de ``:`` (``a :hover`` é um
+    seletor diferente de ``a:hover``) nem em volta de operadores.
+    """
+    texto = _CSS_COMENTARIO_RE.sub("", texto)
+    texto = _CSS_ESPACO_RE.sub(" ", texto)
+    texto = _CSS_PONTUACAO_RE.sub(r"\1", texto)
+    texto = _CSS_DOIS_PONTOS_RE.sub(":", texto)
+    return texto.replace(";}", "}").strip()
+
+
+def minify_js(texto):
+    """Remove comentários, indentação e linhas em branco.
+
+    As quebras de linha ficam (a inserção automática de ``;`` depende delas)
+    e strings e template literals são copiados intactos.
+    """
+    saida = []
+    i, n = 0, len(texto)
+    while i < n:
+        c = texto[i]
+        if c in "'\"`":
+            fim = i + 1
+            while fim < n and texto[fim] != c:
+                fim += 2 if texto[fim] == "\\" else 1
+            saida.append(texto[i:fim + 1])
+            i = fim + 1
+        elif texto.startswith("//", i):
+            fim = texto.find("\n", i)
+            i = n if fim < 0 else fim
+        elif texto.startswith("/*", i):
+            fim = texto.find("*/", i + 2)
+            i = n if fim < 0 else fim + 2
+        else:
+            saida.append(c)
+            i += 1
+    linhas = (linha.strip() for linha in "".join(saida).splitlines())
+    return "\n".join(linha for linha in linhas if linha)
+
+
+MINIFICADORES = {".css": minify_css, ".js": minify_js}
+
+
+# --- BUILD ---
+def _nome_com_hash(caminho, conteudo):
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}"
+
+
+def _gravar(destino, conteudo):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f"{destino}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(conteudo)
+    os.replace(temporario, destino)
+
+
+def _variantes(destino, conteudo):
+    """Grava ``.gz`` e ``.br`` quando compensam. Retorna as codificações geradas."""
+    geradas = []
+    if os.path.splitext(destino)[1] not in COMPRIMIVEIS or len(conteudo) < COMPRESSAO_MINIMA:
+        return geradas
+    comprimidos = {"gzip": gzip.compress(conteudo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        comprimidos["br"] = brotli.compress(conteudo, quality=11)
+    for codificacao, sufixo in CODIFICACOES:
+        dados = comprimidos.get(codificacao)
+        if dados is not None and len(dados) < len(conteudo):
+            _gravar(destino + sufixo, dados)
+            geradas.append(codificacao)
+    return geradas
+
+
+def _origens(static_folder):
+    for pasta, subpastas, arquivos in os.walk(static_folder):
+        if pasta == static_folder and PASTA_DIST in subpastas:
+            subpastas.remove(PASTA_DIST)
+        subpastas.sort()
+        for arquivo in sorted(arquivos):
+            caminho = os.path.join(pasta, arquivo)
+            yield os.path.relpath(caminho, static_folder).replace(os.sep, "/")
+
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")\s]+)\1\s*\)""")
+
+
+def _reescrever_urls(texto, caminho, arquivos):
+    # url(...) relativas ao próprio CSS passam a apontar para os nomes com hash
+    pasta = os.path.dirname(caminho)
+
+    def trocar(match):
+        url = match.group(2)
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        alvo = os.path.normpath(os.path.join(pasta, url.split("?")[0].split("#")[0])).replace(os.sep, "/")
+        if alvo not in arquivos:
+            return match.group(0)
+        return f"url({os.path.relpath(arquivos[alvo], pasta or '.').replace(os.sep, '/')})"
+
+    return _CSS_URL_RE.sub(trocar, texto)
+
+
+def build(static_folder, minificar=True, echo=print):
+    """Gera ``static/dist`` e o manifesto. Retorna o manifesto."""
+    dist = os.path.join(static_folder, PASTA_DIST)
+    manifesto = {"arquivos": {}, "codificacoes": {}}
+    arquivos = manifesto["arquivos"]
+    # CSS por último: as url(...) deles precisam dos nomes com hash das fontes e imagens
+    origens = sorted(_origens(static_folder), key=lambda caminho: caminho.endswith(".css"))
+    for caminho in origens:
+        with open(os.path.join(static_folder, caminho), "rb") as f:
+            conteudo = f.read()
+        extensao = os.path.splitext(caminho)[1]
+        if extensao in MINIFICADORES:
+            texto = conteudo.decode("utf-8")
+            if extensao == ".css":
+                texto = _reescrever_urls(texto, caminho, arquivos)
+            if minificar:
+                texto = MINIFICADORES[extensao](texto)
+            conteudo = texto.encode("utf-8")
+
+        nome = _nome_com_hash(caminho, conteudo)
+        destino = os.path.join(dist, nome)
+        if not os.path.exists(destino):
+            _gravar(destino, conteudo)
+        codificacoes = _variantes(destino, conteudo)
+        arquivos[caminho] = nome
+        if codificacoes:
+            manifesto["codificacoes"][nome] = codificacoes
+        echo(f"{caminho} -> {PASTA_DIST}/{nome} ({len(conteudo)} bytes"
+             + "".join(f", {c}" for c in codificacoes) + ")")
+
+    _gravar(os.path.join(dist, MANIFESTO), json.dumps(manifesto, indent=2, sort_keys=True).encode("utf-8"))
+    if brotli is None:
+        echo("Aviso: pacote brotli não instalado; apenas variantes gzip foram geradas.")
+    return manifesto
+
+
+# --- FONTES ---
+_FONT_FACE_RE = re.compile(r"/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*\{[^}]*\})")
+_FONT_SRC_RE = re.compile(r"url\((https://[^)]+)\)")
+_FONT_PESO_RE = re.compile(r"font-weight:\s*(\d+)")
+
+
+def download_fonts(static_folder, url=FONTES_URL, subconjunto=FONTES_SUBCONJUNTO, echo=print):
+    """Baixa as fontes do Google Fonts para ``static/fonts`` e escreve
+    ``static/css/fontes.css``. Retorna os arquivos baixados."""
+    import requests
+
+    resposta = requests.get(url, headers={"User-Agent": FONTES_USER_AGENT}, timeout=30)
+    resposta.raise_for_status()
+    blocos = []
+    baixados = []
+    for nome_subconjunto, bloco in _FONT_FACE_RE.findall(resposta.text):
+        if nome_subconjunto != subconjunto:
+            continue
+        origem = _FONT_SRC_RE.search(bloco).group(1)
+        arquivo = f"poppins-{_FONT_PESO_RE.search(bloco).group(1)}.woff2"
+        fonte = requests.get(origem, timeout=30)
+        fonte.raise_for_status()
+        _gravar(os.path.join(static_folder, "fonts", arquivo), fonte.content)
+        blocos.append(bloco.replace(f"url({origem})", f"url(../fonts/{arquivo})"))
+        baixados.append(arquivo)
+        echo(f"fonts/{arquivo} ({len(fonte.content)} bytes)")
+    if not blocos:
+        raise RuntimeError(f"Nenhuma fonte do subconjunto {subconjunto!r} em {url}")
+    _gravar(os.path.join(static_folder, "css", "fontes.css"), ("\n".join(blocos) + "\n").encode("utf-8"))
+    return baixados
+
+
+# --- INTEGRAÇÃO COM O FLASK ---
+class Assets:
+    def __init__(self, static_folder, max_age=MAX_AGE_IMUTAVEL):
+        self.static_folder = static_folder
+        self.max_age = max_age
+        self.arquivos = {}
+        self.codificacoes = {}
+        # Hash do manifesto em uso ("" sem static/dist): muda a cada build
+        self.digest = ""
+        self._send_static_file = None
+
+    def load(self):
+        caminho = os.path.join(self.static_folder, PASTA_DIST, MANIFESTO)
+        if not os.path.exists(caminho):
+            return False
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+        manifesto = json.loads(conteudo)
+        self.digest = hashlib.sha1(conteudo).hexdigest()
+        self.arquivos = manifesto["arquivos"]
+        self.codificacoes = manifesto["codificacoes"]
+        return True
+
+    def init_app(self, app, enabled=True):
+        app.add_template_global(self.exists, "static_exists")
+        if not enabled or not self.load():
+            return
+        self._send_static_file = app.send_static_file
+        app.url_defaults(self._url_defaults)
+        app.view_functions["static"] = self.send_static
+
+    def exists(self, filename):
+        return filename in self.arquivos or os.path.isfile(os.path.join(self.static_folder, filename))
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == "static":
+            nome = self.arquivos.get(values.get("filename"))
+            if nome is not None:
+                values["filename"] = f"{PASTA_DIST}/{nome}"
+
+    def send_static(self, filename):
+        nome = filename[len(PASTA_DIST) + 1:] if filename.startswith(f"{PASTA_DIST}/") else None
+        if nome is None or not os.path.exists(os.path.join(self.static_folder, PASTA_DIST, nome)):
+            return self._send_static_file(filename)
+
+        disponiveis = self.codificacoes.get(nome, ())
+        arquivo, codificacao = filename, None
+        for candidata, sufixo in CODIFICACOES:
+            if candidata in disponiveis and request.accept_encodings[candidata]:
+                arquivo, codificacao = filename + sufixo, candidata
+                break
+
+        response = send_from_directory(
+            self.static_folder, arquivo,
+            mimetype=mimetypes.guess_type(nome)[0] or "application/octet-stream",
+            max_age=self.max_age,
+        )
+        # O nome do arquivo .gz/.br não interessa ao navegador
+        response.headers.pop("Content-Disposition", None)
+        if codificacao:
+            response.content_encoding = codificacao
+        if disponiveis:
+            response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
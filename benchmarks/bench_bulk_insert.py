@@ -0,0 +1,71 @@
+"""Benchmark: INSERT registro a registro x ``repository.insert_rows`` em lote.
+
+Roda contra o banco de ``DATABASE_URL`` (PostgreSQL) ou, sem ela, contra um
+SQLite temporário, já migrado até a revisão atual. Os registros inseridos
+são removidos no final.
+
+Uso: python benchmarks/bench_bulk_insert.py [--rows 5000] [--batch 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import db  # noqa: E402
+import repository  # noqa: E402
+from models import conversas_chat, usuarios  # noqa: E402
+
+
+def registros(usuario_id, n):
+    agora = datetime.utcnow().replace(microsecond=0)
+    return [
+        {"usuario_id": usuario_id, "pergunta": f"pergunta {i}", "resposta": "resposta",
+         "data_conversa": agora}
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    url = db.database_url(os.path.join(tempfile.mkdtemp(), "bench.db"),
+                          os.environ.get("DATABASE_URL"))
+    db.upgrade_database(url)
+    database = db.Database(url, pool_size=1)
+
+    with database.connect() as conn:
+        usuario_id = repository.create_user(conn, "Bench", f"bench{time.time_ns()}@escola.br", "x")
+        conn.commit()
+
+        linhas = registros(usuario_id, args.rows)
+        started = time.perf_counter()
+        for linha in linhas:
+            repository.insert_rows(conn, "conversas_chat", [linha])
+            conn.commit()
+        um_a_um = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(0, len(linhas), args.batch):
+            repository.insert_rows(conn, "conversas_chat", linhas[i:i + args.batch])
+            conn.commit()
+        em_lote = time.perf_counter() - started
+
+        # Remove os registros do benchmark (os triggers ajustam os contadores)
+        conn.execute(conversas_chat.delete().where(conversas_chat.c.usuario_id == usuario_id))
+        conn.execute(usuarios.delete().where(usuarios.c.id == usuario_id))
+        conn.commit()
+
+    print(f"{database.backend}: {args.rows} registros")
+    print(f"  um por transação : {args.rows / um_a_um:10.0f} registros/s")
+    print(f"  lotes de {args.batch:<6}  : {args.rows / em_lote:10.0f} registros/s")
+
+
+if __name__ == "__main__":
+    main()
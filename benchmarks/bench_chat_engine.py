@@ -0,0 +1,79 @@
+"""Micro-benchmark: motor de intenções indexado x cadeia de ``if`` original.
+
+Compara o custo por pergunta com a base real e com bases sintéticas de
+centenas de tópicos, onde a cadeia linear de substrings cresce com o número
+de tópicos e o índice invertido não.
+
+Uso: python benchmarks/bench_chat_engine.py [--topics 10 100 500] [--repeat 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chat_engine import ChatEngine  # noqa: E402
+from content_store import load_content  # noqa: E402
+
+PERGUNTAS = [
+    "O que faz um UX designer?",
+    "Quero trabalhar com programação e código",
+    "Como começar na área de dados e estatística?",
+    "Qual a melhor carreira para mim?",
+]
+
+
+def legacy_chain(knowledge_base, pergunta):
+    # Reproduz a cadeia original: uma varredura de substring por palavra-chave
+    pergunta = pergunta.lower().strip()
+    for key, info in knowledge_base.items():
+        for palavra in [key] + info.get("palavras_chave", []):
+            if palavra in pergunta:
+                return info["resposta"]
+    return None
+
+
+def synthetic_kb(n_topics, keywords_per_topic=6, seed=42):
+    rng = random.Random(seed)
+    kb = {}
+    for i in range(n_topics):
+        kb[f"topico{i}"] = {
+            "resposta": f"Resposta do tópico {i}",
+            "palavras_chave": [f"termo{i}x{j}" for j in range(keywords_per_topic)],
+        }
+    # Perguntas que acertam tópicos do fim da lista (pior caso da cadeia)
+    perguntas = [f"me fale sobre termo{rng.randrange(n_topics)}x0 por favor" for _ in range(50)]
+    return kb, perguntas
+
+
+def bench(kb, perguntas, repeat):
+    engine = ChatEngine(kb, fallback="?")
+    n = repeat * len(perguntas)
+    t_legacy = timeit.timeit(lambda: [legacy_chain(kb, p) for p in perguntas], number=repeat)
+    t_engine = timeit.timeit(lambda: [engine.answer(p) for p in perguntas], number=repeat)
+    return t_legacy / n * 1e6, t_engine / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    raiz = os.path.join(os.path.dirname(__file__), "..", "content")
+    conteudo = load_content(os.path.join(raiz, "catalogo.json"),
+                            os.path.join(raiz, "catalogo.schema.json"))
+
+    print(f"{'base':>12} {'cadeia (us)':>12} {'índice (us)':>12}")
+    legacy, engine = bench(conteudo["chat"]["topicos"], PERGUNTAS, args.repeat)
+    print(f"{'real':>12} {legacy:12.2f} {engine:12.2f}")
+    for n_topics in args.topics:
+        kb, perguntas = synthetic_kb(n_topics)
+        legacy, engine = bench(kb, perguntas, max(1, args.repeat // 10))
+        print(f"{n_topics:>8} tóp {legacy:12.2f} {engine:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
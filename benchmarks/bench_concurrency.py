@@ -0,0 +1,103 @@
+"""Comparação entre workers ``sync`` e ``gthread`` do gunicorn sob concorrência.
+
+Sobe o mesmo app com ``gunicorn.conf.py`` nos dois modos, com o mesmo
+número de processos (``--workers``), e mede as rotas de ``bench_routes``
+(por padrão ``/chat`` e ``/feedback``, que gravam no banco, e
+``/dashboard``) em cada nível de ``--concorrencia``. Com ``--lentos N``,
+durante as medições ficam abertas N conexões que enviaram só parte dos
+cabeçalhos, como clientes móveis em rede ruim: no modo ``sync`` cada uma
+prende um processo inteiro; no ``gthread`` elas esperam no selector.
+
+Uso: python benchmarks/bench_concurrency.py [--escala 10k] [--concorrencia 1 8 32 64]
+         [--cenarios chat feedback dashboard] [--workers 1] [--threads 8] [--lentos 0]
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bench_routes  # noqa: E402
+import db  # noqa: E402
+import seed  # noqa: E402
+
+MODOS = ("sync", "gthread")
+
+
+@contextmanager
+def clientes_lentos(base_url, quantidade):
+    """Conexões com a requisição incompleta, abertas enquanto durar o bloco."""
+    destino = urlsplit(base_url)
+    conexoes = []
+    try:
+        for _ in range(quantidade):
+            conn = socket.create_connection((destino.hostname, destino.port))
+            conn.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\n")
+            conexoes.append(conn)
+        yield
+    finally:
+        for conn in conexoes:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escala", choices=sorted(seed.ESCALAS), default="10k")
+    parser.add_argument("--db", help="Arquivo SQLite (padrão: o de seed.py para a escala)")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--cenarios", nargs="+", choices=list(bench_routes.CENARIOS),
+                        default=["chat", "feedback", "dashboard"])
+    parser.add_argument("--concorrencia", nargs="+", type=int, default=[1, 8, 32, 64])
+    parser.add_argument("--duracao", type=float, default=3.0, help="Segundos por medição")
+    parser.add_argument("--workers", type=int, default=1, help="Processos do gunicorn")
+    parser.add_argument("--threads", type=int, default=8, help="Threads por processo (gthread)")
+    parser.add_argument("--lentos", type=int, default=0,
+                        help="Conexões lentas abertas durante as medições")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="Timeout de cada requisição do cliente, em segundos")
+    args = parser.parse_args()
+
+    usuarios, testes, conversas = seed.ESCALAS[args.escala]
+    url = db.database_url(args.db or seed.default_db(args.escala), os.environ.get("DATABASE_URL"))
+    contagens = seed.seed(url, usuarios, testes, conversas)
+    pasta = tempfile.mkdtemp(prefix="bench-concurrency-")
+    env = bench_routes.ambiente(url, pasta)
+
+    print(f"{url}: " + ", ".join(f"{t}={n}" for t, n in contagens.items()))
+    print(f"{args.workers} processo(s), {args.threads} threads no gthread, "
+          f"{args.lentos} conexões lentas, {args.duracao:g} s por medição")
+    print(f"{'modo':<8} {'clientes':>8} {'rota':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'erros':>6}")
+
+    resultados = {}
+    for modo in args.modos:
+        opcoes = bench_routes.opcoes_gunicorn(modo, args.threads)
+        with open(os.path.join(pasta, f"gunicorn-{modo}.log"), "w") as log, \
+                bench_routes.servidor_gunicorn(env, args.workers, log, opcoes) as base_url:
+            for concorrencia in args.concorrencia:
+                for nome in args.cenarios:
+                    with clientes_lentos(base_url, args.lentos):
+                        r = bench_routes.executar(
+                            lambda: bench_routes.HttpClient(base_url, timeout=args.timeout),
+                            nome, concorrencia, args.duracao, usuarios, espera_metricas=0)
+                    resultados[(modo, concorrencia, nome)] = r
+                    print(f"{modo:<8} {concorrencia:>8} {nome:<10} {r['req_s']:8.1f} "
+                          f"{r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+                          f"{r['erros']:>6}", flush=True)
+
+    if set(MODOS) <= set(args.modos):
+        print("\ngthread x sync (vazão, p95)")
+        for concorrencia in args.concorrencia:
+            for nome in args.cenarios:
+                s, t = resultados[("sync", concorrencia, nome)], resultados[("gthread", concorrencia, nome)]
+                vazao = f"{t['req_s'] / s['req_s']:6.2f}x" if s["req_s"] else f"{'-':>7}"
+                p95 = f"{t['p95_ms'] / s['p95_ms']:6.2f}x" if s["p95_ms"] else f"{'-':>7}"
+                print(f"{concorrencia:>8} {nome:<10} {vazao} {p95}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark de carga do /login: logins por segundo em um worker.
+
+Simula o pico de início de aula (muitos alunos logando juntos) com várias
+threads usando o test client do Flask contra um único processo, comparando
+o hash na própria thread (``--pool 0``) com pools de processos de tamanhos
+diferentes. Mostra vazão, latência p50/p95 e quantas requisições foram
+recusadas com 503 por saturação do pool.
+
+Uso: python benchmarks/bench_login.py [--pool 0 1 2 4] [--threads 8] [--logins 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+os.environ.setdefault("DB_NAME", os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ["RATELIMIT_ENABLED"] = "0"
+
+import app as app_module  # noqa: E402
+import repository  # noqa: E402
+from passwords import PasswordHasher  # noqa: E402
+
+SENHA = "senha-de-teste"
+
+
+def seed_users(n, senha_hash):
+    with app_module.app.app_context():
+        conn = app_module.get_db()
+        if repository.get_user_by_email(conn, "aluno0@escola.br") is not None:
+            return
+        repository.insert_rows(conn, "usuarios", [
+            {"nome": f"Aluno {i}", "email": f"aluno{i}@escola.br", "senha": senha_hash}
+            for i in range(n)
+        ])
+        conn.commit()
+
+
+def run(threads, logins):
+    latencias = []
+    recusados = []
+    lock = threading.Lock()
+
+    def cliente(idx):
+        client = app_module.app.test_client()
+        minhas, recusas = [], 0
+        for i in range(logins):
+            email = f"aluno{(idx * logins + i) % 1000}@escola.br"
+            started = time.perf_counter()
+            resp = client.post("/login", data={"email": email, "senha": SENHA})
+            minhas.append(time.perf_counter() - started)
+            recusas += resp.status_code == 503
+            client.get("/logout")
+        with lock:
+            latencias.extend(minhas)
+            recusados.append(recusas)
+
+    started = time.perf_counter()
+    ts = [threading.Thread(target=cliente, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    total = time.perf_counter() - started
+
+    latencias.sort()
+    p = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000  # noqa: E731
+    return len(latencias) / total, p(0.50), p(0.95), sum(recusados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pool", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=10)
+    parser.add_argument("--max-pending", type=int, default=8)
+    parser.add_argument("--method", default=app_module.app.config["PASSWORD_HASH_METHOD"])
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(method=args.method, workers=0)
+    seed_users(1000, hasher.hash(SENHA))
+
+    print(f"método {hasher.method}, {args.threads} threads x {args.logins} logins")
+    print(f"{'pool':>5} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'503':>5}")
+    for workers in args.pool:
+        app_module.password_hasher = PasswordHasher(
+            method=args.method, workers=workers, max_pending=args.max_pending
+        )
+        run(1, 1)  # aquece o pool de processos
+        vazao, p50, p95, recusados = run(args.threads, args.logins)
+        print(f"{workers:>5} {vazao:9.1f} {p50:8.1f} {p95:8.1f} {recusados:>5}")
+        app_module.password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark da storage de rate limit compartilhada (sqlite://).
+
+Sobe N processos (simulando workers do gunicorn) que fazem verificações de
+limite em paralelo sobre um conjunto de IPs, e mede o custo por verificação.
+Também confere que o limite é global: com todos os processos batendo na
+mesma chave, o total de requisições aceitas não passa do limite.
+
+Uso: python benchmarks/bench_rate_limit.py [--workers 1 2 4 8] [--checks 5000]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import FixedWindowRateLimiter  # noqa: E402
+
+import rate_limit_storage  # noqa: E402,F401  (registra sqlite://)
+
+
+def worker(uri, checks, n_ips, resultado):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    limite = parse("1000000 per hour")
+    started = time.perf_counter()
+    for i in range(checks):
+        limiter.hit(limite, f"10.0.{(i % n_ips) // 256}.{i % 256}", "/chat")
+    resultado.put(time.perf_counter() - started)
+
+
+def hammer(uri, limite_str, tentativas, resultado):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    limite = parse(limite_str)
+    resultado.put(sum(limiter.hit(limite, "1.2.3.4", "/login") for _ in range(tentativas)))
+
+
+def run(target, n_workers, *args):
+    resultado = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=target, args=(*args, resultado)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    valores = [resultado.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return valores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--checks", type=int, default=5000)
+    parser.add_argument("--ips", type=int, default=1000)
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+    print(f"{'storage':>10} {'workers':>8} {'us/verif.':>10} {'verif./s':>10}")
+    memoria = run(worker, 1, "memory://", args.checks, args.ips)[0]
+    print(f"{'memory':>10} {1:>8} {memoria / args.checks * 1e6:10.1f} {args.checks / memoria:10.0f}")
+    for n in args.workers:
+        uri = f"sqlite:///{os.path.join(pasta, f'bench_{n}.db')}"
+        tempos = run(worker, n, uri, args.checks, args.ips)
+        media = sum(tempos) / len(tempos)
+        total = n * args.checks / max(tempos)
+        print(f"{'sqlite':>10} {n:>8} {media / args.checks * 1e6:10.1f} {total:10.0f}")
+
+    n = max(args.workers)
+    uri = f"sqlite:///{os.path.join(pasta, 'global.db')}"
+    aceitas = sum(run(hammer, n, uri, "5 per minute", 20))
+    print(f"\nLimite global '5 per minute' com {n} workers x 20 tentativas: {aceitas} aceitas")
+
+
+if __name__ == "__main__":
+    main()
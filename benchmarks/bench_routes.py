@@ -0,0 +1,378 @@
+"""Benchmark das rotas principais, com comparação contra um baseline salvo.
+
+Popula (ou completa) o banco na escala pedida com ``benchmarks/seed.py`` e
+exercita ``/``, ``/login``, ``/dashboard``, ``/teste``, ``/chat``,
+``/feedback``, ``/api/stats`` e ``/api/chart/profile-distribution`` com clientes
+concorrentes, de dois jeitos:
+
+- ``test_client``: threads usando o test client do Flask num único processo
+  (sem rede nem servidor, mede o código da aplicação);
+- ``gunicorn``: um gunicorn local com ``--workers`` processos (do tipo
+  ``--worker-class``) e clientes HTTP.
+
+Para cada rota mostra vazão, latências p50/p95/p99, erros e o tempo médio
+de banco por requisição, lido de ``/metrics`` (``METRICS_ENABLED=1``). Com
+``--salvar-baseline`` grava os números num JSON; com ``--baseline``
+compara com um JSON salvo e termina com código 1 se alguma rota perdeu mais
+que ``--tolerancia`` de vazão ou de p95, para pegar regressões nos caminhos
+quentes. Compare sempre na mesma máquina, escala e banco.
+
+Uso: python benchmarks/bench_routes.py [--escala 10k] [--modo test_client gunicorn]
+         [--concorrencia 4] [--duracao 3] [--baseline benchmarks/baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import db  # noqa: E402
+import seed  # noqa: E402
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_METRICA_DB_RE = re.compile(
+    r'^trilhafuturo_db_time_per_request_seconds_(sum|count)\{endpoint="([^"]+)"\} (\S+)$', re.M)
+
+
+# --- CENÁRIOS ---
+def _index(cliente, rng, usuarios):
+    return cliente.get("/")
+
+
+def _login(cliente, rng, usuarios):
+    return cliente.post("/login", {"email": seed.email(rng.randrange(usuarios)), "senha": seed.SENHA})
+
+
+def _dashboard(cliente, rng, usuarios):
+    return cliente.get("/dashboard")
+
+
+def _teste(cliente, rng, usuarios):
+    opcoes = ("criativo", "analitico", "social", "organizado")
+    return cliente.post("/teste", {f"q{i}": rng.choice(opcoes) for i in range(1, 6)})
+
+
+def _chat(cliente, rng, usuarios):
+    return cliente.post("/chat", {"question": rng.choice(seed.PERGUNTAS)})
+
+
+def _feedback(cliente, rng, usuarios):
+    return cliente.post("/feedback", {"message": f"Feedback de carga {rng.randrange(10 ** 6)}"})
+
+
+def _api_stats(cliente, rng, usuarios):
+    return cliente.get("/api/stats")
+
+
+def _profile_distribution(cliente, rng, usuarios):
+    return cliente.get("/api/chart/profile-distribution")
+
+
+# nome -> (função, endpoint em /metrics, precisa de login, status esperado)
+CENARIOS = {
+    "index": (_index, "index", False, 200),
+    "login": (_login, "login", False, 302),
+    "dashboard": (_dashboard, "dashboard", True, 200),
+    "teste": (_teste, "teste", True, 302),
+    "chat": (_chat, "chat", True, 200),
+    "feedback": (_feedback, "feedback", True, 302),
+    "api_stats": (_api_stats, "api_stats", True, 200),
+    "profile_distribution": (_profile_distribution, "profile_distribution_chart", True, 200),
+}
+
+
+# --- CLIENTES ---
+class _FlaskClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def get(self, path):
+        return self._client.get(path).status_code
+
+    def post(self, path, data):
+        return self._client.post(path, data=data).status_code
+
+    def text(self, path):
+        return self._client.get(path).get_data(as_text=True)
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout=None):
+        import requests
+        self._session = requests.Session()
+        self._base_url = base_url
+        self._timeout = timeout
+
+    def get(self, path):
+        return self._session.get(self._base_url + path, allow_redirects=False,
+                                 timeout=self._timeout).status_code
+
+    def post(self, path, data):
+        return self._session.post(self._base_url + path, data=data, allow_redirects=False,
+                                  timeout=self._timeout).status_code
+
+    def text(self, path):
+        return self._session.get(self._base_url + path, timeout=self._timeout).text
+
+
+def _tempo_db(cliente):
+    """``{endpoint: [soma_segundos, requisicoes]}`` lidos de /metrics."""
+    valores = {}
+    try:
+        texto = cliente.text("/metrics")
+    except Exception:
+        # Servidor sem resposta (ex.: todos os workers presos); sem tempo de banco
+        return valores
+    for campo, endpoint, valor in _METRICA_DB_RE.findall(texto):
+        valores.setdefault(endpoint, [0.0, 0.0])[campo == "count"] = float(valor)
+    return valores
+
+
+def _percentil(ordenadas, q):
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000 if ordenadas else 0.0
+
+
+def executar(novo_cliente, nome, concorrencia, duracao, usuarios, espera_metricas):
+    funcao, endpoint, logado, esperado = CENARIOS[nome]
+    latencias, erros = [], []
+    lock = threading.Lock()
+    pronto = threading.Barrier(concorrencia + 1)
+
+    def worker(idx):
+        rng = random.Random(f"{nome}-{idx}")
+        cliente = novo_cliente()
+        if logado:
+            try:
+                _login(cliente, rng, usuarios)
+            except Exception:
+                pass  # sem login as requisições seguintes contam como erro
+        minhas, falhas = [], 0
+        pronto.wait()
+        fim = time.perf_counter() + duracao
+        while time.perf_counter() < fim:
+            started = time.perf_counter()
+            try:
+                falhas += funcao(cliente, rng, usuarios) != esperado
+            except Exception:
+                falhas += 1
+            minhas.append(time.perf_counter() - started)
+        with lock:
+            latencias.extend(minhas)
+            erros.append(falhas)
+
+    leitor = novo_cliente()
+    antes = _tempo_db(leitor)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concorrencia)]
+    for t in threads:
+        t.start()
+    pronto.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - started
+    time.sleep(espera_metricas)
+    depois = _tempo_db(leitor)
+
+    soma, contagem = (d - a for d, a in zip(depois.get(endpoint, [0, 0]), antes.get(endpoint, [0, 0])))
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "req_s": round(len(latencias) / total, 1),
+        "p50_ms": round(_percentil(latencias, 0.50), 2),
+        "p95_ms": round(_percentil(latencias, 0.95), 2),
+        "p99_ms": round(_percentil(latencias, 0.99), 2),
+        "db_ms": round(soma / contagem * 1000, 3) if contagem else None,
+        "erros": sum(erros),
+    }
+
+
+# --- MODOS ---
+def ambiente(url, pasta):
+    env = dict(os.environ)
+    env.update(
+        RATELIMIT_ENABLED="0",
+        METRICS_ENABLED="1",
+        METRICS_PATH=os.path.join(pasta, "metrics.db"),
+        METRICS_FLUSH_INTERVAL="0.05",
+        PASSWORD_HASH_MAX_PENDING="1000",
+    )
+    if url.startswith("sqlite"):
+        env["DB_NAME"] = url[len("sqlite:///"):]
+        env.pop("DATABASE_URL", None)
+    else:
+        env["DATABASE_URL"] = url
+    return env
+
+
+def modo_test_client(url, pasta, cenarios, concorrencia, duracao, usuarios, echo):
+    os.environ.update(ambiente(url, pasta))
+    import app as app_module
+    resultados = {}
+    for nome in cenarios:
+        resultados[nome] = executar(lambda: _FlaskClient(app_module.app), nome,
+                                    concorrencia, duracao, usuarios, espera_metricas=0)
+        echo("test_client", nome, resultados[nome])
+    return resultados
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def opcoes_gunicorn(worker_class, threads=8):
+    # --threads explícito: com mais de uma thread o gunicorn troca sync por gthread
+    return ["-k", worker_class, "--threads", str(threads if worker_class == "gthread" else 1)]
+
+
+@contextmanager
+def servidor_gunicorn(env, workers, log, opcoes=()):
+    """Sobe um gunicorn local com ``gunicorn.conf.py`` e ``opcoes`` extras;
+    produz a URL base."""
+    porta = _porta_livre()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-w", str(workers),
+         "-b", f"127.0.0.1:{porta}", *opcoes],
+        cwd=RAIZ, env=env, stdout=log, stderr=log,
+    )
+    base_url = f"http://127.0.0.1:{porta}"
+    try:
+        import requests
+        limite = time.monotonic() + 60
+        while True:
+            try:
+                requests.get(base_url + "/metrics", timeout=1)
+                break
+            except (requests.ConnectionError, requests.Timeout):
+                # Recusada, ou aceita enquanto o worker ainda importa o app
+                if proc.poll() is not None or time.monotonic() > limite:
+                    raise RuntimeError(f"gunicorn não subiu (veja {log.name})")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def modo_gunicorn(url, pasta, cenarios, concorrencia, duracao, usuarios, echo, workers=2,
+                  worker_class="sync"):
+    resultados = {}
+    with open(os.path.join(pasta, "gunicorn.log"), "w") as log, \
+            servidor_gunicorn(ambiente(url, pasta), workers, log,
+                              opcoes_gunicorn(worker_class)) as base_url:
+        for nome in cenarios:
+            resultados[nome] = executar(lambda: HttpClient(base_url), nome,
+                                        concorrencia, duracao, usuarios, espera_metricas=0.2)
+            echo("gunicorn", nome, resultados[nome])
+    return resultados
+
+
+# --- BASELINE ---
+def comparar(atual, baseline, tolerancia):
+    """Linhas ``(modo, cenario, delta_vazao, delta_p95, regrediu)`` das rotas presentes nos dois."""
+    linhas = []
+    for modo, cenarios in atual["resultados"].items():
+        for nome, r in cenarios.items():
+            b = baseline["resultados"].get(modo, {}).get(nome)
+            if not b or not b["req_s"] or not b["p95_ms"]:
+                continue
+            delta_vazao = r["req_s"] / b["req_s"] - 1
+            delta_p95 = r["p95_ms"] / b["p95_ms"] - 1
+            linhas.append((modo, nome, delta_vazao, delta_p95,
+                           delta_vazao < -tolerancia or delta_p95 > tolerancia))
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escala", choices=sorted(seed.ESCALAS), default="10k")
+    parser.add_argument("--db", help="Arquivo SQLite (padrão: o de seed.py para a escala)")
+    parser.add_argument("--modo", nargs="+", choices=("test_client", "gunicorn"),
+                        default=["test_client", "gunicorn"])
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--duracao", type=float, default=3.0, help="Segundos por rota")
+    parser.add_argument("--workers", type=int, default=2, help="Workers do gunicorn")
+    parser.add_argument("--worker-class", default="sync",
+                        help="Tipo de worker do gunicorn (o baseline versionado usa sync)")
+    parser.add_argument("--baseline", help="JSON de um resultado anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--salvar-baseline", help="Grava o resultado neste JSON")
+    args = parser.parse_args()
+
+    usuarios, testes, conversas = seed.ESCALAS[args.escala]
+    url = db.database_url(args.db or seed.default_db(args.escala), os.environ.get("DATABASE_URL"))
+    contagens = seed.seed(url, usuarios, testes, conversas)
+    pasta = tempfile.mkdtemp(prefix="bench-routes-")
+
+    print(f"{url}: " + ", ".join(f"{t}={n}" for t, n in contagens.items()))
+    print(f"{args.concorrencia} clientes x {args.duracao:g} s por rota")
+    print(f"{'modo':<12} {'rota':<21} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'db ms':>7} {'erros':>6}")
+
+    def echo(modo, nome, r):
+        db_ms = f"{r['db_ms']:7.2f}" if r["db_ms"] is not None else f"{'-':>7}"
+        print(f"{modo:<12} {nome:<21} {r['req_s']:8.1f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+              f"{r['p99_ms']:8.2f} {db_ms} {r['erros']:>6}", flush=True)
+
+    resultado = {
+        "meta": {
+            "data": datetime.utcnow().replace(microsecond=0).isoformat(),
+            "escala": args.escala,
+            "backend": url.split(":", 1)[0],
+            "contagens": contagens,
+            "concorrencia": args.concorrencia,
+            "duracao": args.duracao,
+            "workers": args.workers,
+            "worker_class": args.worker_class,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "resultados": {},
+    }
+    # O gunicorn roda antes: o modo test_client importa o app neste processo
+    if "gunicorn" in args.modo:
+        resultado["resultados"]["gunicorn"] = modo_gunicorn(
+            url, pasta, args.cenarios, args.concorrencia, args.duracao, usuarios, echo,
+            workers=args.workers, worker_class=args.worker_class)
+    if "test_client" in args.modo:
+        resultado["resultados"]["test_client"] = modo_test_client(
+            url, pasta, args.cenarios, args.concorrencia, args.duracao, usuarios, echo)
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Baseline salvo em {args.salvar_baseline}")
+
+    regressoes = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for chave in ("escala", "backend", "concorrencia", "workers", "cpus"):
+            if baseline["meta"].get(chave) != resultado["meta"][chave]:
+                print(f"Aviso: {chave} difere do baseline "
+                      f"({baseline['meta'].get(chave)} x {resultado['meta'][chave]})")
+        print(f"\nComparação com {args.baseline} (tolerância {args.tolerancia:.0%})")
+        for modo, nome, delta_vazao, delta_p95, regrediu in comparar(resultado, baseline, args.tolerancia):
+            regressoes += regrediu
+            print(f"{modo:<12} {nome:<21} vazão {delta_vazao:+7.1%}  p95 {delta_p95:+7.1%}"
+                  f"{'  REGRESSÃO' if regrediu else ''}")
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Subida e memória dos workers do gunicorn, com e sem ``--preload``.
+
+Para cada modo sobe o app com ``gunicorn.conf.py`` (``GUNICORN_PRELOAD=1``
+ou ``0``) e ``--workers`` processos e mede:
+
+- o tempo até a primeira resposta e até todos os workers responderem;
+- a memória de cada worker depois de exercitar ``/``, ``/dashboard``,
+  ``/teste`` e ``/chat``: RSS, PSS (páginas compartilhadas divididas entre
+  os processos que as usam) e USS (só as páginas exclusivas do worker), e o
+  PSS somado de mestre e workers, que é o custo real em memória;
+- o tempo até um worker novo (``SIGTTIN``, como num aumento de escala)
+  responder à primeira requisição.
+
+Workers ociosos disputam cada conexão e quase sempre o mesmo vence; para
+medir ou aquecer um worker específico os outros ficam parados
+(``SIGSTOP``) enquanto isso.
+
+Uso: python benchmarks/bench_startup.py [--escala 10k] [--workers 4]
+         [--modos preload sem-preload] [--salvar resultado.json]
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bench_routes  # noqa: E402
+import db  # noqa: E402
+import seed  # noqa: E402
+
+MODOS = {"preload": "1", "sem-preload": "0"}
+CENARIOS = ("index", "dashboard", "teste", "chat")
+
+
+# --- PROCESSOS ---
+def filhos(pid):
+    """Pids dos processos filhos diretos de ``pid``."""
+    pids = []
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat") as f:
+                # O nome do processo vem entre parênteses e pode ter espaços
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            pids.append(int(nome))
+    return pids
+
+
+def memoria(pid):
+    """``{"rss", "pss", "uss"}`` do processo, em MB (``/proc/<pid>/smaps_rollup``)."""
+    campos = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                campos[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    return {
+        "rss": campos["Rss"],
+        "pss": campos["Pss"],
+        "uss": campos["Private_Clean"] + campos["Private_Dirty"],
+    }
+
+
+def _pid_que_respondeu(base_url):
+    import requests
+    # Conexão nova a cada chamada: qualquer worker pode aceitá-la
+    try:
+        resposta = requests.get(base_url + "/api/db/pool-stats", timeout=1)
+    except (requests.ConnectionError, requests.Timeout):
+        return None
+    return resposta.json()["pid"] if resposta.status_code == 200 else None
+
+
+def _esperar(condicao, limite, mensagem):
+    fim = time.monotonic() + limite
+    while True:
+        valor = condicao()
+        if valor:
+            return valor
+        if time.monotonic() > fim:
+            raise RuntimeError(mensagem)
+        time.sleep(0.02)
+
+
+@contextmanager
+def parados(pids):
+    """Workers ``pids`` parados durante o bloco: só os outros aceitam conexões."""
+    for pid in pids:
+        os.kill(pid, signal.SIGSTOP)
+    try:
+        yield
+    finally:
+        for pid in pids:
+            os.kill(pid, signal.SIGCONT)
+
+
+# --- MEDIÇÃO ---
+def medir(env, workers, log, usuarios, aquecimento):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+    base_url = f"http://127.0.0.1:{porta}"
+    inicio = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-w", str(workers),
+         "-b", f"127.0.0.1:{porta}"],
+        cwd=bench_routes.RAIZ, env=env, stdout=log, stderr=log,
+    )
+    try:
+        _esperar(lambda: _pid_que_respondeu(base_url), 120, f"gunicorn não subiu (veja {log.name})")
+        t_primeira = time.perf_counter() - inicio
+        pids = _esperar(lambda: len(filhos(proc.pid)) >= workers and filhos(proc.pid), 120,
+                        "nem todos os workers foram criados")
+        for pid in pids:
+            with parados(set(pids) - {pid}):
+                _esperar(lambda: _pid_que_respondeu(base_url) == pid, 120,
+                         f"o worker {pid} não respondeu")
+        t_todos = time.perf_counter() - inicio
+
+        # Cada worker atende todas as rotas antes de a memória ser medida
+        for pid in pids:
+            with parados(set(pids) - {pid}):
+                for nome in CENARIOS:
+                    bench_routes.executar(lambda: bench_routes.HttpClient(base_url, timeout=30),
+                                          nome, 2, aquecimento, usuarios, espera_metricas=0)
+        por_worker = [memoria(pid) for pid in pids]
+        mestre = memoria(proc.pid)
+
+        # Aumento de escala: um worker a mais, o único aceitando conexões
+        with parados(pids):
+            proc.send_signal(signal.SIGTTIN)
+            inicio_novo = time.perf_counter()
+            novo = _esperar(lambda: set(filhos(proc.pid)) - set(pids), 30, "o worker novo não foi criado")
+            _esperar(lambda: _pid_que_respondeu(base_url) in novo, 120, "o worker novo não respondeu")
+            t_novo = time.perf_counter() - inicio_novo
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    def media(campo):
+        return sum(m[campo] for m in por_worker) / len(por_worker)
+
+    return {
+        "primeira_resposta_ms": round(t_primeira * 1000, 1),
+        "todos_workers_ms": round(t_todos * 1000, 1),
+        "worker_novo_ms": round(t_novo * 1000, 1),
+        "rss_worker_mb": round(media("rss"), 1),
+        "pss_worker_mb": round(media("pss"), 1),
+        "uss_worker_mb": round(media("uss"), 1),
+        "pss_total_mb": round(mestre["pss"] + sum(m["pss"] for m in por_worker), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escala", choices=sorted(seed.ESCALAS), default="10k")
+    parser.add_argument("--db", help="Arquivo SQLite (padrão: o de seed.py para a escala)")
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS))
+    parser.add_argument("--workers", type=int, default=4, help="Processos do gunicorn")
+    parser.add_argument("--aquecimento", type=float, default=1.0,
+                        help="Segundos de carga em cada rota antes de medir a memória")
+    parser.add_argument("--salvar", help="Grava o resultado neste JSON")
+    args = parser.parse_args()
+
+    usuarios, testes, conversas = seed.ESCALAS[args.escala]
+    url = db.database_url(args.db or seed.default_db(args.escala), os.environ.get("DATABASE_URL"))
+    contagens = seed.seed(url, usuarios, testes, conversas)
+    pasta = tempfile.mkdtemp(prefix="bench-startup-")
+
+    print(f"{url}: " + ", ".join(f"{t}={n}" for t, n in contagens.items()))
+    print(f"{args.workers} workers; memória depois de {args.aquecimento:g} s em cada rota "
+          f"({', '.join(CENARIOS)})")
+    print(f"{'modo':<12} {'1ª resp ms':>10} {'todos ms':>9} {'novo ms':>8} {'RSS MB':>7} "
+          f"{'PSS MB':>7} {'USS MB':>7} {'PSS total':>9}")
+
+    resultados = {}
+    for modo in args.modos:
+        # Timeout longo: os workers parados não mandam sinal de vida ao mestre
+        env = dict(bench_routes.ambiente(url, pasta), GUNICORN_PRELOAD=MODOS[modo],
+                   GUNICORN_TIMEOUT="120", DB_POOL_STATS="1")
+        with open(os.path.join(pasta, f"gunicorn-{modo}.log"), "w") as log:
+            r = medir(env, args.workers, log, usuarios, args.aquecimento)
+        resultados[modo] = r
+        print(f"{modo:<12} {r['primeira_resposta_ms']:10.0f} {r['todos_workers_ms']:9.0f} "
+              f"{r['worker_novo_ms']:8.0f} {r['rss_worker_mb']:7.1f} {r['pss_worker_mb']:7.1f} "
+              f"{r['uss_worker_mb']:7.1f} {r['pss_total_mb']:9.1f}", flush=True)
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "data": datetime.utcnow().replace(microsecond=0).isoformat(),
+                    "escala": args.escala,
+                    "backend": url.split(":", 1)[0],
+                    "workers": args.workers,
+                    "python": platform.python_version(),
+                    "cpus": os.cpu_count(),
+                },
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Resultado salvo em {args.salvar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Popula um banco com dados sintéticos para os benchmarks.
+
+Escalas prontas (``--escala``) ou contagens explícitas; os registros são
+gerados em blocos (memória constante) com uma semente fixa, então a mesma
+escala produz sempre os mesmos dados. Rodar de novo só completa o que falta,
+o que permite retomar uma carga grande interrompida.
+
+Todos os usuários têm a senha ``SENHA`` e o e-mail ``aluno<i>@bench.trilhafuturo``;
+testes e conversas são distribuídos entre eles ao longo dos últimos 365 dias.
+
+Uso: python benchmarks/seed.py [--escala 10k|100k|1m] [--db caminho.db]
+     (com DATABASE_URL definida, popula esse banco)
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import db  # noqa: E402
+import repository  # noqa: E402
+from chat_engine import ChatEngine  # noqa: E402
+from content_store import load_content  # noqa: E402
+from models import REGISTROS  # noqa: E402
+from passwords import PasswordHasher  # noqa: E402
+from scoring import Scorer  # noqa: E402
+
+RAIZ = os.path.join(os.path.dirname(__file__), "..")
+SENHA = "senha-de-teste"
+
+# escala -> (usuarios, resultados_teste, conversas_chat)
+ESCALAS = {
+    "10k": (10_000, 100_000, 100_000),
+    "100k": (100_000, 2_000_000, 2_000_000),
+    "1m": (1_000_000, 20_000_000, 20_000_000),
+}
+
+PERGUNTAS = (
+    "o que faz um ux designer?",
+    "quero trabalhar com dados",
+    "ciência de dados paga bem?",
+    "como começar em programação",
+    "programação é difícil?",
+    "tipos de carreiras",
+    "qual faculdade escolher",
+)
+
+
+def email(i):
+    return f"aluno{i}@bench.trilhafuturo"
+
+
+def default_db(escala):
+    return os.path.join(tempfile.gettempdir(), f"trilhafuturo-bench-{escala}.db")
+
+
+def _datas(n, dias=365):
+    # Crescentes com o id, como numa base real
+    inicio = datetime.utcnow().replace(microsecond=0) - timedelta(days=dias)
+    passo = dias * 86400 / max(n, 1)
+    return lambda i: inicio + timedelta(seconds=int(i * passo))
+
+
+def _usuarios(rng, inicio, fim, senha_hash):
+    data = _datas(fim)
+    for i in range(inicio, fim):
+        yield {"nome": f"Aluno {i}", "email": email(i), "senha": senha_hash, "data_criacao": data(i)}
+
+
+def _resultados(rng, inicio, fim, ids):
+    scorer = Scorer()
+    data = _datas(fim)
+    for i in range(inicio, fim):
+        folha = [rng.choice(scorer.respostas) for _ in range(5)]
+        perfil, pontuacao, contagens = scorer.score(folha)
+        yield {"usuario_id": rng.randint(*ids), "pontuacao": pontuacao, "perfil": perfil,
+               "respostas": json.dumps(scorer.counts_to_dict(contagens)), "data_teste": data(i)}
+
+
+def _conversas(rng, inicio, fim, ids):
+    conteudo = load_content(os.path.join(RAIZ, "content", "catalogo.json"),
+                            os.path.join(RAIZ, "content", "catalogo.schema.json"))
+    engine = ChatEngine(conteudo["chat"]["topicos"], conteudo["chat"]["fallback"], cache_size=0)
+    respostas = {p: engine.answer(p) for p in PERGUNTAS}
+    data = _datas(fim)
+    for i in range(inicio, fim):
+        pergunta = rng.choice(PERGUNTAS)
+        resposta, _, _, topico = respostas[pergunta]
+        yield {"usuario_id": rng.randint(*ids), "pergunta": pergunta, "resposta": resposta,
+               "data_conversa": data(i), "topico": topico or ""}
+
+
+def _inserir(conn, tabela, registros, lote):
+    buffer = []
+    total = 0
+    for registro in registros:
+        buffer.append(registro)
+        if len(buffer) >= lote:
+            total += repository.insert_rows(conn, tabela, buffer)
+            conn.commit()
+            buffer = []
+    total += repository.insert_rows(conn, tabela, buffer)
+    conn.commit()
+    return total
+
+
+def seed(url, usuarios, testes, conversas, lote=5000, semente=42, echo=print):
+    """Completa o banco até as contagens pedidas. Retorna as contagens finais."""
+    db.upgrade_database(url)
+    database = db.Database(url, pool_size=1)
+    with database.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            # Carga descartável: sem fsync a cada lote
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+        def contar(tabela):
+            return conn.execute(select(func.count()).select_from(REGISTROS[tabela])).scalar_one()
+
+        existentes = contar("usuarios")
+        if existentes < usuarios:
+            senha_hash = PasswordHasher(workers=0).hash(SENHA)
+            rng = random.Random(f"{semente}-usuarios-{existentes}")
+            _inserir(conn, "usuarios", _usuarios(rng, existentes, usuarios, senha_hash), lote)
+        ids = tuple(conn.execute(select(func.min(REGISTROS["usuarios"].c.id),
+                                        func.max(REGISTROS["usuarios"].c.id))).one())
+
+        for tabela, alvo, gerador in (("resultados_teste", testes, _resultados),
+                                      ("conversas_chat", conversas, _conversas)):
+            existentes = contar(tabela)
+            if existentes >= alvo:
+                continue
+            started = time.perf_counter()
+            rng = random.Random(f"{semente}-{tabela}-{existentes}")
+            inseridos = _inserir(conn, tabela, gerador(rng, existentes, alvo, ids), lote)
+            echo(f"{tabela}: {inseridos} registros em {time.perf_counter() - started:.1f} s")
+
+        contagens = {t: contar(t) for t in ("usuarios", "resultados_teste", "conversas_chat")}
+    database.engine.dispose()
+    return contagens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="10k")
+    parser.add_argument("--db", help="Arquivo SQLite (padrão: no diretório temporário)")
+    parser.add_argument("--usuarios", type=int)
+    parser.add_argument("--testes", type=int)
+    parser.add_argument("--conversas", type=int)
+    parser.add_argument("--lote", type=int, default=5000)
+    args = parser.parse_args()
+
+    usuarios, testes, conversas = ESCALAS[args.escala]
+    url = db.database_url(args.db or default_db(args.escala), os.environ.get("DATABASE_URL"))
+    contagens = seed(url, args.usuarios or usuarios, args.testes or testes,
+                     args.conversas or conversas, lote=args.lote)
+    print(f"{url}: " + ", ".join(f"{t}={n}" for t, n in contagens.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Perfil de inicialização: quanto custa importar (e preparar) o app.
+
+Importa ``app`` num processo novo com ``python -X importtime`` e resume o
+relatório: tempo próprio somado por pacote (os de terceiros e os módulos do
+projeto), tempo acumulado de cada import direto do ``app``, e o tempo de
+parede e o RSS máximo do processo. Com ``--create-app`` mede também
+``create_app(preload=True)``, o que o mestre do gunicorn faz com
+``--preload`` (migrações, conteúdo, numpy e templates).
+
+Uso: python benchmarks/startup_profile.py [--create-app] [--top 15] [--db arquivo.db]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# "import time: self [us] | cumulative | imported package"
+_LINHA_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+_MEDIR = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+if {create_app}:
+    app.create_app(preload=True)
+fim = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (importado - inicio) * 1000,
+    "create_app_ms": (fim - importado) * 1000,
+    "rss_max_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modulos": len(sys.modules),
+}}))
+"""
+
+
+def medir(env, create_app=False):
+    """``(resumo, linhas)``: números do processo e ``(self_us, acumulado_us,
+    profundidade, modulo)`` de cada linha do ``-X importtime``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _MEDIR.format(create_app=create_app)],
+        cwd=RAIZ, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr[-2000:])
+    linhas = []
+    for linha in proc.stderr.splitlines():
+        m = _LINHA_RE.match(linha)
+        if m:
+            linhas.append((int(m[1]), int(m[2]), len(m[3]) // 2, m[4]))
+    return json.loads(proc.stdout.splitlines()[-1]), linhas
+
+
+def modulos_do_projeto():
+    return {nome[:-3] for nome in os.listdir(RAIZ) if nome.endswith(".py")}
+
+
+def por_pacote(linhas):
+    """Tempo próprio somado por pacote de primeiro nível, em ms."""
+    total = defaultdict(float)
+    for proprio, _, _, modulo in linhas:
+        total[modulo.split(".")[0]] += proprio / 1000
+    return total
+
+
+def imports_diretos(linhas, alvo="app"):
+    """Tempo acumulado (ms) de cada módulo importado diretamente por ``alvo``.
+
+    O relatório lista cada módulo depois dos que ele importou, um nível de
+    indentação abaixo; os filhos de ``alvo`` são as linhas logo antes dele
+    com a profundidade seguinte."""
+    fim = next(i for i, (_, _, _, modulo) in enumerate(linhas) if modulo == alvo)
+    profundidade = linhas[fim][2]
+    diretos = {}
+    for _, acumulado, nivel, modulo in reversed(linhas[:fim]):
+        if nivel <= profundidade:
+            break
+        if nivel == profundidade + 1:
+            diretos[modulo] = acumulado / 1000
+    return diretos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--create-app", action="store_true",
+                        help="Mede também create_app(preload=True)")
+    parser.add_argument("--db", help="Arquivo SQLite para o --create-app (padrão: um temporário)")
+    parser.add_argument("--top", type=int, default=15, help="Linhas de cada tabela")
+    args = parser.parse_args()
+
+    env = dict(os.environ, RATELIMIT_STORAGE_URI="memory://")
+    if "DATABASE_URL" not in env:
+        env["DB_NAME"] = args.db or os.path.join(tempfile.mkdtemp(prefix="startup-profile-"), "app.db")
+    resumo, linhas = medir(env, args.create_app)
+
+    print(f"import app: {resumo['import_ms']:.0f} ms, {resumo['modulos']} módulos carregados")
+    if args.create_app:
+        print(f"create_app(preload=True): {resumo['create_app_ms']:.0f} ms")
+    print(f"RSS máximo: {resumo['rss_max_mb']:.1f} MB")
+
+    projeto = modulos_do_projeto()
+    pacotes = sorted(por_pacote(linhas).items(), key=lambda item: -item[1])
+    total = sum(ms for _, ms in pacotes) or 1
+    print(f"\n{'pacote (tempo próprio)':<32} {'ms':>8} {'%':>6}")
+    for nome, ms in pacotes[:args.top]:
+        marca = " *" if nome in projeto else ""
+        print(f"{nome + marca:<32} {ms:8.1f} {ms / total * 100:6.1f}")
+
+    print(f"\n{'importado por app (acumulado)':<32} {'ms':>8}")
+    for nome, ms in sorted(imports_diretos(linhas).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{nome:<32} {ms:8.1f}")
+    print("\n* módulo do projeto")
+
+
+if __name__ == "__main__":
+    main()
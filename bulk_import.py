@@ -0,0 +1,237 @@
+"""Importação de usuários em lote (cadastro de turmas inteiras pelas escolas).
+
+O arquivo (CSV com cabeçalho ou NDJSON) é lido e validado registro a
+registro, sem carregá-lo inteiro. Campos: ``nome``, ``email``, ``senha`` e,
+opcionalmente, ``respostas`` do teste vocacional (no CSV separadas por
+``;``, no NDJSON também como lista), que viram um resultado de teste
+pontuado como em ``/teste``.
+
+Os registros válidos são gravados em blocos de ``chunk_size``, cada bloco
+numa transação: os e-mails já cadastrados são descartados antes do hash,
+as senhas são calculadas em paralelo (``PasswordHasher.hash_many``) e
+usuários e resultados entram com um único comando por tabela. Um registro
+inválido (ou um bloco cujo hash ou gravação falhe) vira um erro no
+relatório, com o número da linha, e a importação continua.
+
+Um e-mail já cadastrado com ``respostas`` é um envio de teste em lote: o
+resultado entra para a conta existente (``nome`` e ``senha`` do arquivo são
+ignorados). Sem ``respostas``, é recusado como repetido.
+"""
+import csv
+import json
+
+from sqlalchemy.exc import SQLAlchemyError
+
+import repository
+
+# formato -> mimetype
+FORMATOS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+CAMPOS = ("nome", "email", "senha")
+CHUNK_SIZE = 500
+# Mesmo mínimo do formulário de /teste
+MIN_RESPOSTAS = 5
+# Erros listados no relatório (o total é sempre contado)
+MAX_ERROS = 1000
+
+ERRO_CADASTRADO = "E-mail já cadastrado"
+
+
+class BulkImportError(ValueError):
+    """Arquivo de importação inválido como um todo."""
+
+
+class _ErroRegistro(ValueError):
+    pass
+
+
+def format_for(nome_ou_mimetype):
+    """Formato pela extensão do arquivo ou pelo mimetype (``None`` se nenhum)."""
+    for formato, mimetype in FORMATOS.items():
+        if nome_ou_mimetype == mimetype or nome_ou_mimetype.endswith(f".{formato}"):
+            return formato
+    return None
+
+
+# --- LEITURA ---
+def iter_records(stream, formato):
+    """``(linha, registro, erro)`` de cada registro do arquivo, sob demanda."""
+    if formato == "csv":
+        leitor = csv.DictReader(stream)
+        faltando = [campo for campo in CAMPOS if campo not in (leitor.fieldnames or ())]
+        if faltando:
+            raise BulkImportError(f"Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}")
+        for registro in leitor:
+            # line_num conta o cabeçalho: é a linha do registro no arquivo
+            yield leitor.line_num, registro, None
+    elif formato == "ndjson":
+        for numero, linha in enumerate(stream, 1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                yield numero, None, "JSON inválido"
+                continue
+            if not isinstance(registro, dict):
+                yield numero, None, "Cada linha deve ser um objeto JSON"
+                continue
+            yield numero, registro, None
+    else:
+        raise BulkImportError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS)})")
+
+
+def _texto(registro, campo):
+    valor = registro.get(campo)
+    return valor.strip() if isinstance(valor, str) else ""
+
+
+def _respostas(valor, scorer):
+    if valor in (None, ""):
+        return None
+    if isinstance(valor, str):
+        valor = valor.split(";")
+    if not isinstance(valor, list) or not all(isinstance(r, str) for r in valor):
+        raise _ErroRegistro("respostas deve ser uma lista de textos")
+    respostas = [r.strip().lower() for r in valor if r.strip()]
+    desconhecidas = sorted(set(respostas) - set(scorer.respostas))
+    if desconhecidas:
+        raise _ErroRegistro(f"Resposta desconhecida: {', '.join(desconhecidas)} "
+                            f"(use {', '.join(scorer.respostas)})")
+    if len(respostas) < MIN_RESPOSTAS:
+        raise _ErroRegistro(f"São necessárias pelo menos {MIN_RESPOSTAS} respostas")
+    return respostas
+
+
+def _validar(registro, scorer, validate_email, validate_password):
+    nome = _texto(registro, "nome")
+    email = _texto(registro, "email").lower()
+    # A senha não passa por strip(), como no /register
+    senha = registro.get("senha") if isinstance(registro.get("senha"), str) else ""
+    if not all([nome, email, senha]):
+        raise _ErroRegistro("nome, email e senha são obrigatórios")
+    if not validate_email(email):
+        raise _ErroRegistro("E-mail inválido")
+    if not validate_password(senha):
+        raise _ErroRegistro("A senha deve ter pelo menos 6 caracteres")
+    return {"nome": nome, "email": email, "senha": senha,
+            "respostas": _respostas(registro.get("respostas"), scorer)}
+
+
+# --- GRAVAÇÃO ---
+def _erro(relatorio, linha, email, mensagem):
+    relatorio["total_erros"] += 1
+    if len(relatorio["erros"]) < MAX_ERROS:
+        relatorio["erros"].append({"linha": linha, "email": email or None, "erro": mensagem})
+
+
+def _erro_bloco(relatorio, itens, mensagem):
+    for linha, item in itens:
+        _erro(relatorio, linha, item["email"], mensagem)
+
+
+def _resultado(scorer, usuario_id, respostas, agora):
+    perfil, pontuacao, contagens = scorer.score(respostas)
+    return {
+        "usuario_id": usuario_id,
+        "pontuacao": pontuacao,
+        "perfil": perfil,
+        "respostas": json.dumps(scorer.counts_to_dict(contagens)),
+        "data_teste": agora,
+    }
+
+
+def _gravar(conn, lote, hasher, scorer, relatorio, dry_run, agora, on_written):
+    cadastrados = repository.existing_emails(conn, [item["email"] for _, item in lote])
+    novos = []
+    # Contas existentes com respostas: só o resultado do teste é gravado
+    testes_de_cadastrados = []
+    for linha, item in lote:
+        if item["email"] not in cadastrados:
+            novos.append((linha, item))
+        elif item["respostas"] is not None:
+            testes_de_cadastrados.append((linha, item))
+        else:
+            _erro(relatorio, linha, item["email"], ERRO_CADASTRADO)
+    if dry_run:
+        # Só conta o que seria importado
+        relatorio["importados"] += len(novos)
+        relatorio["testes"] += (sum(item["respostas"] is not None for _, item in novos)
+                                + len(testes_de_cadastrados))
+        relatorio["testes_de_cadastrados"] += len(testes_de_cadastrados)
+        return
+    if not novos and not testes_de_cadastrados:
+        return
+
+    hashes = []
+    if novos:
+        try:
+            hashes = hasher.hash_many([item["senha"] for _, item in novos])
+        except Exception as e:
+            # Pool de hash quebrado, tempo esgotado...: os usuários novos do bloco
+            # ficam de fora; os testes de contas existentes seguem
+            _erro_bloco(relatorio, novos, f"Erro ao calcular as senhas do bloco: {e.__class__.__name__}")
+            novos = []
+    try:
+        ids = repository.create_users(conn, [
+            {"nome": item["nome"], "email": item["email"], "senha": senha_hash, "data_criacao": agora}
+            for (_, item), senha_hash in zip(novos, hashes)
+        ])
+        resultados = []
+        for linha, item in novos:
+            if item["email"] not in ids:
+                # Cadastrado por outra via depois da verificação acima
+                _erro(relatorio, linha, item["email"], ERRO_CADASTRADO)
+            elif item["respostas"] is not None:
+                resultados.append(_resultado(scorer, ids[item["email"]], item["respostas"], agora))
+        for _, item in testes_de_cadastrados:
+            resultados.append(_resultado(scorer, cadastrados[item["email"]], item["respostas"], agora))
+        repository.insert_rows(conn, "resultados_teste", resultados)
+        conn.commit()
+    except SQLAlchemyError as e:
+        conn.rollback()
+        _erro_bloco(relatorio, novos + testes_de_cadastrados,
+                    f"Erro ao gravar o bloco: {e.__class__.__name__}")
+        return
+    relatorio["importados"] += len(ids)
+    relatorio["testes"] += len(resultados)
+    relatorio["testes_de_cadastrados"] += len(testes_de_cadastrados)
+    if on_written is not None and resultados:
+        on_written(resultados)
+
+
+def run(conn, stream, formato, hasher, scorer, validate_email, validate_password, agora,
+        chunk_size=CHUNK_SIZE, dry_run=False, on_written=None):
+    """Importa os usuários de ``stream`` (texto). Com ``dry_run`` só valida,
+    inclusive contra os e-mails já cadastrados. ``on_written`` recebe os
+    resultados de teste de cada bloco depois do commit. Retorna o relatório
+    ``{"registros", "importados", "testes", "testes_de_cadastrados",
+    "total_erros", "erros"}``."""
+    if chunk_size < 1:
+        raise BulkImportError("chunk_size deve ser positivo")
+    relatorio = {"registros": 0, "importados": 0, "testes": 0, "testes_de_cadastrados": 0,
+                 "total_erros": 0, "erros": []}
+    linhas_por_email = {}
+    lote = []
+    for linha, registro, erro in iter_records(stream, formato):
+        relatorio["registros"] += 1
+        email = _texto(registro or {}, "email").lower()
+        if erro is None:
+            try:
+                item = _validar(registro, scorer, validate_email, validate_password)
+            except _ErroRegistro as e:
+                erro = str(e)
+        if erro is None and email in linhas_por_email:
+            erro = f"E-mail repetido no arquivo (linha {linhas_por_email[email]})"
+        if erro is not None:
+            _erro(relatorio, linha, email, erro)
+            continue
+        linhas_por_email[email] = linha
+        lote.append((linha, item))
+        if len(lote) >= chunk_size:
+            _gravar(conn, lote, hasher, scorer, relatorio, dry_run, agora, on_written)
+            lote = []
+    if lote:
+        _gravar(conn, lote, hasher, scorer, relatorio, dry_run, agora, on_written)
+    # Erros de gravação chegam depois dos de validação do bloco seguinte
+    relatorio["erros"].sort(key=lambda erro: erro["linha"])
+    return relatorio
@@ -0,0 +1,95 @@
+"""Catálogo de perfis e trilhas (seção ``recomendacoes`` do conteúdo) com
+índices pré-calculados.
+
+O conteúdo é estático, então tudo o que depende só dele é feito uma vez:
+o índice ``id_trilha -> (trilha, perfil_key)``, um digest por perfil/trilha
+(base dos ETags), os fragmentos HTML de ``_trilha_conteudo.html`` e
+``_perfil_conteudo.html`` e os documentos JSON da API, gerados na primeira
+requisição e reutilizados.
+"""
+import hashlib
+import json
+import threading
+
+from flask import render_template
+from markupsafe import Markup
+
+
+def _digest(obj):
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+class Catalog:
+    def __init__(self, recomendacoes=None):
+        self._lock = threading.Lock()
+        self._fragments = {}
+        self._blobs = {}
+        self._state = ({}, {}, {})
+        self.load(recomendacoes or {})
+
+    def load(self, recomendacoes):
+        """Troca o conteúdo. Perfis que não mudaram reaproveitam índices,
+        digests e fragmentos já renderizados."""
+        anteriores, trilhas_anteriores, digests_anteriores = self._state
+        trilhas = {}
+        digests = {}
+        for perfil_key, perfil in recomendacoes.items():
+            if anteriores.get(perfil_key) == perfil:
+                digests[("perfil", perfil_key)] = digests_anteriores[("perfil", perfil_key)]
+                for trilha in perfil.get("trilhas", []):
+                    trilhas[trilha["id_trilha"]] = trilhas_anteriores[trilha["id_trilha"]]
+                    digests[("trilha", trilha["id_trilha"])] = digests_anteriores[("trilha", trilha["id_trilha"])]
+                continue
+            digests[("perfil", perfil_key)] = _digest(perfil)
+            for trilha in perfil.get("trilhas", []):
+                trilhas[trilha["id_trilha"]] = (trilha, perfil_key)
+                digests[("trilha", trilha["id_trilha"])] = _digest([perfil_key, trilha])
+        # Troca atômica do estado; fragmentos de digests antigos deixam de ser usados
+        self._state = (recomendacoes, trilhas, digests)
+        vigentes = set(digests.values())
+        with self._lock:
+            self._fragments = {
+                k: v for k, v in self._fragments.items() if k[2] in vigentes
+            }
+            self._blobs = {k: v for k, v in self._blobs.items() if k[2] in vigentes}
+
+    @property
+    def recomendacoes(self):
+        return self._state[0]
+
+    def get_perfil(self, perfil_key, default="humanas"):
+        """Retorna ``(perfil_key, perfil)``, caindo no perfil padrão."""
+        recomendacoes = self._state[0]
+        if perfil_key not in recomendacoes:
+            perfil_key = default
+        return perfil_key, recomendacoes[perfil_key]
+
+    def find_trilha(self, id_trilha):
+        """Retorna ``(trilha, perfil_key)`` ou ``(None, None)``."""
+        return self._state[1].get(id_trilha, (None, None))
+
+    def digest(self, kind, key):
+        return self._state[2][(kind, key)]
+
+    def fragment(self, kind, key, template, **context):
+        """HTML de ``template`` para o item, renderizado uma vez por versão."""
+        cache_key = (kind, key, self.digest(kind, key))
+        with self._lock:
+            html = self._fragments.get(cache_key)
+        if html is None:
+            html = Markup(render_template(template, **context))
+            with self._lock:
+                self._fragments[cache_key] = html
+        return html
+
+    def blob(self, kind, key, build):
+        """Resultado de ``build()`` para o item, gerado uma vez por versão."""
+        cache_key = (kind, key, self.digest(kind, key))
+        with self._lock:
+            valor = self._blobs.get(cache_key)
+        if valor is None:
+            valor = build()
+            with self._lock:
+                self._blobs[cache_key] = valor
+        return valor
@@ -0,0 +1,169 @@
+"""Motor de intenções do Chat Mentor.
+
+Construído a partir dos tópicos do chat (ver ``content/catalogo.json``) e
+reconstruído só quando eles mudam: cada entrada declara
+suas ``palavras_chave`` e o motor monta um índice invertido
+``termo normalizado -> [(tópico, peso)]``. Uma pergunta é tokenizada e
+normalizada (sem acentos, minúsculas, plural simples) e cada token custa
+uma consulta ao dicionário, então o tempo de resposta não cresce com o
+número de tópicos.
+
+As respostas ficam num cache LRU com TTL, chaveado pela pergunta
+normalizada, que é esvaziado sempre que a base é recarregada.
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from cachetools import TTLCache
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold_accents(text):
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _stem(token):
+    # Plural simples do português: "dados" -> "dado", "carreiras" -> "carreira"
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Tokens normalizados: minúsculos, sem acento e no singular."""
+    return [_stem(t) for t in _TOKEN_RE.findall(fold_accents(text.lower()))]
+
+
+def normalize_question(text):
+    return " ".join(tokenize(text))
+
+
+class _CountingCache(TTLCache):
+    # TTLCache (LRU + expiração) que conta remoções por falta de espaço
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize, ttl)
+        self.evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def clear(self):
+        # MutableMapping.clear() usa popitem(); invalidação não é remoção por LRU
+        evictions = self.evictions
+        super().clear()
+        self.evictions = evictions
+
+
+class ChatEngine:
+    def __init__(self, knowledge_base, fallback, cache_size=1024, cache_ttl=3600):
+        self.fallback = fallback
+        self._cache_lock = threading.Lock()
+        self._cache = _CountingCache(maxsize=cache_size, ttl=cache_ttl) if cache_size else None
+        self._hits = 0
+        self._misses = 0
+        self.build(knowledge_base)
+
+    def build(self, knowledge_base, fallback=None):
+        if fallback is not None:
+            self.fallback = fallback
+        index = defaultdict(list)
+        max_phrase = 1
+        topics = {}
+        for key, info in knowledge_base.items():
+            topics[key] = info
+            palavras = [key] + list(info.get("palavras_chave", []))
+            termos = {}
+            for palavra in palavras:
+                termo = tuple(tokenize(palavra))
+                if termo:
+                    # Expressões com mais palavras pesam mais
+                    termos[termo] = len(termo)
+            for termo, peso in termos.items():
+                index[termo].append((key, peso))
+                max_phrase = max(max_phrase, len(termo))
+        order = {key: i for i, key in enumerate(topics)}
+        # Troca atômica: requisições em andamento continuam no índice antigo
+        self._state = (topics, order, dict(index), max_phrase)
+        self.clear_cache()
+
+    @property
+    def topics(self):
+        return self._state[0]
+
+    def rank(self, pergunta):
+        """Tópicos com pontuação > 0, do mais para o menos relevante."""
+        return self._rank(self._state, pergunta)
+
+    def classify(self, pergunta):
+        """Chave do tópico mais relevante, ou ``None`` se nenhum casar."""
+        ranking = self._rank(self._state, pergunta)
+        return ranking[0][0] if ranking else None
+
+    def answer(self, pergunta):
+        """Retorna ``(resposta, carreiras, habilidades, topico)`` para a pergunta;
+        ``topico`` é ``None`` quando a resposta é o fallback."""
+        if self._cache is None:
+            return self._answer(self._state, pergunta)
+
+        state = self._state
+        key = normalize_question(pergunta)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._hits += 1
+                return cached
+            self._misses += 1
+        result = self._answer(state, pergunta)
+        with self._cache_lock:
+            # Não guarda respostas calculadas com uma base que já foi trocada
+            if state is self._state:
+                self._cache[key] = result
+        return result
+
+    def clear_cache(self):
+        if self._cache is not None:
+            with self._cache_lock:
+                self._cache.clear()
+
+    def cache_stats(self):
+        if self._cache is None:
+            return {"enabled": False}
+        with self._cache_lock:
+            self._cache.expire()
+            return {
+                "enabled": True,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._cache.evictions,
+            }
+
+    def _answer(self, state, pergunta):
+        ranking = self._rank(state, pergunta)
+        if not ranking:
+            return self.fallback, (), (), None
+        topico = ranking[0][0]
+        info = state[0][topico]
+        return (info["resposta"], tuple(info.get("carreiras", [])),
+                tuple(info.get("habilidades", [])), topico)
+
+    @staticmethod
+    def _rank(state, pergunta):
+        _, order, index, max_phrase = state
+        tokens = tokenize(pergunta)
+        scores = defaultdict(int)
+        for size in range(1, max_phrase + 1):
+            for i in range(len(tokens) - size + 1):
+                for key, peso in index.get(tuple(tokens[i:i + size]), ()):
+                    scores[key] += peso
+        # Empate: vale a ordem em que os tópicos foram declarados
+        return sorted(scores.items(), key=lambda item: (-item[1], order[item[0]]))
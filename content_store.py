@@ -0,0 +1,113 @@
+"""Armazenamento externo do conteúdo (perfis, trilhas e base do chat).
+
+O conteúdo fica em ``content/catalogo.json``, validado contra
+``content/catalogo.schema.json`` com jsonschema. O arquivo só é lido na
+primeira requisição e, depois disso, no máximo a cada ``check_interval``
+segundos é feito um ``stat``: se o arquivo mudou, a nova versão é validada e
+trocada de uma vez, e só os ouvintes das seções que mudaram são avisados
+para reconstruir seus índices. Uma versão inválida é ignorada e a anterior
+continua servindo.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class ContentError(ValueError):
+    """O arquivo de conteúdo não pôde ser lido ou não passou na validação."""
+
+
+def load_content(path, schema_path):
+    # O jsonschema (e suas dependências) só é importado ao validar um arquivo
+    from jsonschema import Draft202012Validator
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        with open(schema_path, encoding="utf-8") as f:
+            schema = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ContentError(f"Erro ao ler '{path}': {e}") from e
+
+    erros = sorted(Draft202012Validator(schema).iter_errors(data), key=lambda e: [str(p) for p in e.path])
+    if erros:
+        detalhes = "; ".join(
+            f"{'/'.join(str(p) for p in erro.path) or '(raiz)'}: {erro.message}" for erro in erros[:5]
+        )
+        raise ContentError(f"Conteúdo inválido em '{path}': {detalhes}")
+
+    ids = Counter(t["id_trilha"] for p in data["recomendacoes"].values() for t in p["trilhas"])
+    repetidos = {i for i, n in ids.items() if n > 1}
+    if repetidos:
+        raise ContentError(f"id_trilha repetido em '{path}': {', '.join(sorted(repetidos))}")
+    return data
+
+
+class ContentStore:
+    def __init__(self, path, schema_path, check_interval=2.0):
+        self.path = path
+        self.schema_path = schema_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._data = None
+        self._signature = None
+        self._next_check = 0.0
+        self._listeners = []
+        self.reloads = 0
+
+    def on_change(self, section, callback):
+        """Registra ``callback(valor_da_secao)`` para quando a seção mudar."""
+        self._listeners.append((section, callback))
+        if self._data is not None:
+            callback(self._data[section])
+
+    def _file_signature(self):
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self):
+        self.refresh()
+        return self._data
+
+    def refresh(self):
+        """Carrega na primeira chamada e recarrega se o arquivo mudou."""
+        now = time.monotonic()
+        if self._data is not None and now < self._next_check:
+            return False
+        with self._lock:
+            if self._data is not None and now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+            try:
+                signature = self._file_signature()
+            except OSError as e:
+                if self._data is None:
+                    raise ContentError(f"Arquivo de conteúdo não encontrado: {e}") from e
+                logger.warning("Conteúdo: mantendo a versão atual (%s)", e, exc_info=e)
+                return False
+            if signature == self._signature:
+                return False
+
+            try:
+                data = load_content(self.path, self.schema_path)
+            except ContentError as e:
+                if self._data is None:
+                    raise
+                # Pode ser uma gravação pela metade; tenta de novo no próximo intervalo
+                logger.warning("Conteúdo: nova versão ignorada, mantendo a atual. %s", e, exc_info=e)
+                return False
+
+            anterior = self._data
+            self._data = data
+            self._signature = signature
+            if anterior is not None:
+                self.reloads += 1
+            for section, callback in self._listeners:
+                if anterior is None or anterior[section] != data[section]:
+                    callback(data[section])
+            return True
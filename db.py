@@ -0,0 +1,274 @@
+"""Camada de conexão com o banco do Trilha Futuro.
+
+O banco é escolhido por ``DATABASE_URL``: sem ela continua o arquivo SQLite
+de ``DB_NAME``; com ``postgresql://...`` vários nós atrás de um balanceador
+de carga compartilham o mesmo banco. Cada processo (worker do gunicorn)
+mantém um engine SQLAlchemy com um pool limitado de conexões, reaproveitadas
+entre requisições através de ``flask.g`` e dos hooks de teardown.
+
+O schema é mantido pelas migrações Alembic em ``migrations/``, aplicadas uma
+vez por processo antes da primeira conexão (ou já em ``create_app``) e com
+``flask db-upgrade``. O alembic só é importado nessa hora: comandos e
+processos que não usam o banco não pagam por ele.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Chave do advisory lock que serializa as migrações no PostgreSQL
+MIGRATIONS_LOCK_ID = 20250917
+
+
+def database_url(db_name, url=None):
+    """URL do SQLAlchemy: ``DATABASE_URL`` se houver, senão o SQLite local."""
+    if not url:
+        return f"sqlite:///{db_name}"
+    if url.startswith("postgres://"):
+        # Formato antigo usado por alguns provedores; o SQLAlchemy só aceita postgresql://
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+# --- ENGINE ---
+def _sqlite_pragmas(mmap_size, cache_size):
+    def on_connect(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(cache_size)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    return on_connect
+
+
+def create_db_engine(url, pool_size=8, max_overflow=0, timeout=10.0, busy_timeout=5.0,
+                     mmap_size=64 * 1024 * 1024, cache_size=-16000, statement_cache=256):
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=timeout,
+            connect_args={
+                "timeout": busy_timeout,
+                "check_same_thread": False,
+                "cached_statements": statement_cache,
+            },
+        )
+        event.listen(engine, "connect", _sqlite_pragmas(mmap_size, cache_size))
+        return engine
+    # pre_ping descarta conexões derrubadas pelo servidor ou pelo balanceador
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=timeout,
+        pool_pre_ping=True,
+        client_encoding="utf8",
+    )
+
+
+class Database:
+    """Engine do processo com contadores de uso do pool.
+
+    O engine pertence ao processo que o criou: depois de um ``fork``
+    (gunicorn com ``--preload``) as conexões herdadas são abandonadas sem
+    fechar e o worker abre as suas próprias. Com ``migrate`` as migrações
+    pendentes são aplicadas antes da primeira conexão; um processo filho
+    herda o schema já verificado pelo pai.
+    """
+
+    def __init__(self, url, pool_size=8, max_overflow=0, timeout=10.0, migrate=False, **options):
+        self.url = url
+        self._schema_ok = not migrate
+        self.engine = create_db_engine(url, pool_size=pool_size, max_overflow=max_overflow,
+                                       timeout=timeout, **options)
+        self.max_size = pool_size + (max_overflow if not url.startswith("sqlite") else 0)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+        # Contadores expostos em stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._max_in_use = 0
+
+    @property
+    def backend(self):
+        return self.engine.dialect.name
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.engine.dispose(close=False)
+                    self._pid = os.getpid()
+
+    def after_fork(self):
+        """Descarta já as conexões herdadas do pai (hook ``post_fork`` do gunicorn)."""
+        self._check_fork()
+
+    def ensure_schema(self):
+        """Aplica as migrações pendentes, uma única vez por processo."""
+        if not self._schema_ok:
+            with self._lock:
+                if not self._schema_ok:
+                    upgrade_database(self.url)
+                    self._schema_ok = True
+
+    def connect(self):
+        """Empresta uma conexão do pool (devolvida com ``close()``)."""
+        self._check_fork()
+        self.ensure_schema()
+        pool = self.engine.pool
+        saturado = pool.checkedout() >= self.max_size
+        started = time.monotonic()
+        try:
+            conn = self.engine.connect()
+        except PoolTimeout:
+            with self._lock:
+                self._waits += 1
+                self._timeouts += 1
+                self._wait_time += time.monotonic() - started
+            raise
+        with self._lock:
+            self._checkouts += 1
+            if saturado:
+                self._waits += 1
+                self._wait_time += time.monotonic() - started
+            self._max_in_use = max(self._max_in_use, pool.checkedout())
+        return conn
+
+    def stats(self):
+        pool = self.engine.pool
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "max_size": self.max_size,
+                "open": pool.checkedin() + pool.checkedout(),
+                "idle": pool.checkedin(),
+                "in_use": pool.checkedout(),
+                "max_in_use": self._max_in_use,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_seconds": round(self._wait_time, 6),
+                "timeouts": self._timeouts,
+            }
+
+
+# --- MIGRAÇÕES (ALEMBIC) ---
+def _migration_engine(url):
+    if not url.startswith("sqlite"):
+        return create_engine(url, poolclass=NullPool)
+    engine = create_engine(url, poolclass=NullPool, connect_args={"timeout": 30})
+
+    # O driver sqlite3 não abre transação antes de DDL; aqui a migração
+    # inteira fica num BEGIN IMMEDIATE, que também serializa os workers.
+    @event.listens_for(engine, "connect")
+    def _autocommit_driver(dbapi_conn, connection_record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+@contextmanager
+def migration_connection(url):
+    """Conexão numa transação exclusiva entre processos, para migrações."""
+    engine = _migration_engine(url)
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:chave)"),
+                             {"chave": MIGRATIONS_LOCK_ID})
+            yield conn
+    finally:
+        engine.dispose()
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    cfg = Config(os.path.join(ROOT, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    cfg.attributes["connection"] = connection
+    return cfg
+
+
+def upgrade_database(url, revision="head"):
+    """Aplica as migrações pendentes. Seguro com vários workers subindo juntos."""
+    from alembic import command
+
+    with migration_connection(url) as conn:
+        command.upgrade(alembic_config(conn), revision)
+
+
+def execute_script(bind, script):
+    """Executa um script SQL do SQLite comando a comando, sem COMMIT implícito."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            bind.exec_driver_sql(statement)
+            statement = ""
+    if statement.strip():
+        bind.exec_driver_sql(statement)
+
+
+# --- INTEGRAÇÃO COM O FLASK ---
+_database = None
+
+
+def get_database():
+    return _database
+
+
+def connect():
+    """Conexão avulsa do pool, para CLI e threads fora de uma requisição."""
+    return _database.connect()
+
+
+def get_db():
+    # Uma conexão por requisição, devolvida ao pool no teardown
+    if "db_conn" not in g:
+        g.db_conn = _database.connect()
+    return g.db_conn
+
+
+def close_db(exception=None):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        # Transação não confirmada é desfeita antes de voltar ao pool
+        conn.close()
+
+
+def init_app(app):
+    global _database
+    url = database_url(app.config["DB_NAME"], app.config["DATABASE_URL"])
+    # O engine não abre conexão aqui; o schema é verificado na primeira
+    _database = Database(
+        url,
+        migrate=True,
+        pool_size=app.config["DB_POOL_SIZE"],
+        max_overflow=app.config["DB_POOL_MAX_OVERFLOW"],
+        timeout=app.config["DB_POOL_TIMEOUT"],
+        mmap_size=app.config["SQLITE_MMAP_SIZE"],
+        cache_size=app.config["SQLITE_CACHE_SIZE"],
+    )
+    app.teardown_appcontext(close_db)
+    return _database
@@ -0,0 +1,189 @@
+"""Exportação em streaming de ``resultados_teste`` e ``conversas_chat``.
+
+Os registros são lidos em blocos por um cursor no servidor (``yield_per``:
+cursor nomeado no PostgreSQL; no SQLite o cursor já é lido sob demanda) e
+cada bloco é convertido e entregue antes de o próximo ser lido, então a
+memória não cresce com o tamanho da tabela. Formatos: CSV, NDJSON e Parquet
+(um row group por bloco, via pyarrow).
+
+Cada exportação é limitada ao maior id existente no início (a *watermark*):
+a próxima exportação incremental usa ``desde_id=<watermark>`` e recebe só o
+que foi gravado depois. Também é possível filtrar por data (``desde``), o
+que percorre a tabela inteira.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, func, select
+
+from models import conversas_chat, resultados_teste
+
+CHUNK_SIZE = 5000
+
+TABELAS = {
+    "resultados_teste": (resultados_teste, "data_teste"),
+    "conversas_chat": (conversas_chat, "data_conversa"),
+}
+
+# formato -> (mimetype, extensão)
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ExportError(ValueError):
+    """Parâmetros de exportação inválidos."""
+
+
+def parse_desde(valor):
+    if valor in (None, ""):
+        return None
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        raise ExportError(f"Data inválida em 'desde': {valor!r} (use AAAA-MM-DD[THH:MM:SS])")
+
+
+def watermark(conn, tabela):
+    table, _ = TABELAS[tabela]
+    return conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar_one()
+
+
+def iter_chunks(conn, tabela, ate_id, desde_id=None, desde=None, chunk_size=CHUNK_SIZE):
+    """Blocos de até ``chunk_size`` linhas em ordem de id, com ``id <= ate_id``."""
+    table, coluna_data = TABELAS[tabela]
+    query = select(table).where(table.c.id <= ate_id).order_by(table.c.id)
+    if desde_id is not None:
+        query = query.where(table.c.id > desde_id)
+    if desde is not None:
+        query = query.where(table.c[coluna_data] >= desde)
+    result = conn.execution_options(yield_per=chunk_size).execute(query)
+    yield from result.partitions()
+
+
+# --- FORMATOS ---
+def _csv(table, chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(table.columns.keys())
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson(table, chunks):
+    colunas = table.columns.keys()
+    for rows in chunks:
+        linhas = (
+            json.dumps(dict(zip(colunas, row)), ensure_ascii=False, default=datetime.isoformat)
+            for row in rows
+        )
+        yield ("\n".join(linhas) + "\n").encode("utf-8")
+
+
+class _Sink:
+    """Destino de escrita do pyarrow que é esvaziado a cada bloco."""
+
+    closed = False
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._partes.append(data)
+        self._posicao += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._partes)
+        self._partes = []
+        return data
+
+
+def parquet_schema(table):
+    """Schema do pyarrow para as colunas de ``table``."""
+    # pyarrow só é importado quando alguém pede Parquet
+    import pyarrow as pa
+
+    def tipo(coluna):
+        if isinstance(coluna.type, Integer):
+            return pa.int64()
+        if isinstance(coluna.type, DateTime):
+            return pa.timestamp("s")
+        return pa.string()
+
+    return pa.schema([(c.name, tipo(c)) for c in table.columns])
+
+
+def parquet_table(schema, rows):
+    """Um bloco de linhas como ``pyarrow.Table``."""
+    import pyarrow as pa
+
+    colunas = list(zip(*rows))
+    return pa.Table.from_arrays(
+        [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, schema)],
+        schema=schema,
+    )
+
+
+def _parquet(table, chunks):
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(table)
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in chunks:
+            writer.write_table(parquet_table(schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+_ENCODERS = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}
+
+
+def prepare(connect, tabela, formato="csv", desde_id=None, desde=None, chunk_size=CHUNK_SIZE):
+    """Valida os parâmetros e fixa a watermark.
+
+    Retorna ``(watermark, gerador_de_bytes)``. O gerador abre a própria
+    conexão com ``connect()`` na primeira iteração e a devolve ao terminar,
+    então pode ser consumido depois do fim da requisição (resposta em
+    streaming).
+    """
+    if tabela not in TABELAS:
+        raise ExportError(f"Tabela não exportável: {tabela!r}")
+    if formato not in FORMATOS:
+        raise ExportError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS)})")
+    if chunk_size < 1:
+        raise ExportError("chunk_size deve ser positivo")
+    desde = parse_desde(desde) if isinstance(desde, str) else desde
+
+    with connect() as conn:
+        ate_id = watermark(conn, tabela)
+
+    def gerar():
+        table, _ = TABELAS[tabela]
+        with connect() as conn:
+            chunks = iter_chunks(conn, tabela, ate_id, desde_id=desde_id,
+                                 desde=desde, chunk_size=chunk_size)
+            yield from _ENCODERS[formato](table, chunks)
+
+    return ate_id, gerar()
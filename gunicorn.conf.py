@@ -0,0 +1,54 @@
+"""Configuração do gunicorn (``gunicorn -c gunicorn.conf.py``).
+
+Por padrão cada worker é um processo com ``GUNICORN_THREADS`` threads
+(``gthread``): enquanto uma requisição espera o banco (gravação do chat ou
+do feedback, lock do SQLite, rede até o PostgreSQL), as outras threads do
+mesmo processo continuam atendendo, e conexões keep-alive ociosas ficam
+num selector sem ocupar thread nenhuma. O estado compartilhado do app é
+seguro entre threads (pool de conexões do SQLAlchemy, caches com lock,
+conexões SQLite por thread nos contadores), e cada requisição usa a sua
+própria conexão do pool. ``GUNICORN_WORKER_CLASS=sync`` volta ao modelo de
+uma requisição por processo.
+
+Workers assíncronos (gevent, ASGI) não são usados: o acesso ao banco é
+síncrono (SQLAlchemy e sqlite3) e bloquearia o loop de eventos.
+
+Com ``GUNICORN_PRELOAD=1`` (padrão) o app é importado e preparado uma vez
+no processo mestre (``create_app(preload=True)``) e os workers são só um
+``fork``: sobem em milissegundos e dividem com o mestre a memória do código,
+do conteúdo e dos templates. Os objetos carregados até ali são congelados
+(``gc.freeze``) para a coleta de lixo dos workers não tocar nessas páginas,
+e cada worker descarta as conexões herdadas logo após o ``fork``. Código
+novo exige reiniciar o mestre (um HUP só recria os workers).
+"""
+import gc
+import os
+import sys
+
+# WEB_CONCURRENCY é também a variável que o gunicorn lê sozinho
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+# Com threads > 1 o gunicorn troca sync por gthread sozinho
+threads = int(os.environ.get("GUNICORN_THREADS", 8)) if worker_class == "gthread" else 1
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+wsgi_app = "app:create_app(preload=True)" if preload_app else "app:create_app()"
+
+# Pelo menos uma conexão do pool por thread, para nenhuma requisição
+# esperar por conexão; lido pelo app em cada worker
+if worker_class == "gthread":
+    os.environ.setdefault("DB_POOL_SIZE", str(max(threads, 8)))
+
+
+def when_ready(server):
+    # Mestre com o app já carregado, antes do primeiro fork
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Só há conexões herdadas se o app foi carregado no mestre
+    db = sys.modules.get("db")
+    if db is not None and db.get_database() is not None:
+        db.get_database().after_fork()
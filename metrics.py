@@ -0,0 +1,302 @@
+"""Métricas de requisições, banco e templates no formato do Prometheus.
+
+O que é medido, sempre em memória e por worker:
+
+- latência de cada endpoint (histograma) e requisições por método e status;
+- consultas SQL por requisição e o tempo gasto nelas, pelos eventos
+  ``before/after_cursor_execute`` do engine (consultas fora de requisição,
+  como as da fila write-behind, são contadas à parte);
+- tempo de renderização de cada template, pelos sinais do Flask;
+- rejeições do rate limiting e erros tratados.
+
+Agregação entre workers: no fim de uma requisição, no máximo a cada
+``flush_interval`` segundos, o worker soma os seus deltas num arquivo SQLite
+local compartilhado (de preferência em ``/dev/shm``, como o rate limiting)
+e zera os contadores em memória. ``/metrics`` lê a soma de todos os workers;
+o que um worker acumulou há menos de ``flush_interval`` ainda não aparece.
+Os contadores só crescem, inclusive entre reinícios: apague o arquivo para
+zerá-los.
+
+Com ``slow_request_ms`` as requisições mais lentas que isso são registradas
+no logger do app com o tempo de cada consulta, agrupado por comando.
+"""
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONSULTAS_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+TEMPLATE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# nome -> (tipo, descrição, buckets)
+METRICAS = {
+    "trilhafuturo_http_requests_total": (
+        "counter", "Requisições por endpoint, método e status.", None),
+    "trilhafuturo_http_request_duration_seconds": (
+        "histogram", "Latência das requisições por endpoint.", LATENCIA_BUCKETS),
+    "trilhafuturo_db_queries_per_request": (
+        "histogram", "Consultas SQL feitas em cada requisição.", CONSULTAS_BUCKETS),
+    "trilhafuturo_db_time_per_request_seconds": (
+        "histogram", "Tempo gasto em SQL em cada requisição.", LATENCIA_BUCKETS),
+    "trilhafuturo_db_background_queries_total": (
+        "counter", "Consultas SQL fora de requisições (write-behind, comandos).", None),
+    "trilhafuturo_db_background_seconds_total": (
+        "counter", "Tempo gasto nas consultas SQL fora de requisições.", None),
+    "trilhafuturo_template_render_seconds": (
+        "histogram", "Tempo de renderização por template.", TEMPLATE_BUCKETS),
+    "trilhafuturo_ratelimit_rejections_total": (
+        "counter", "Requisições recusadas pelo rate limiting, por endpoint.", None),
+    "trilhafuturo_handled_errors_total": (
+        "counter", "Erros tratados (e registrados no log) por endpoint.", None),
+}
+
+_LE_RE = re.compile(r'le="([^"]+)"')
+
+
+def default_metrics_path():
+    pasta = "/dev/shm" if os.path.isdir("/dev/shm") else os.path.abspath(".")
+    return os.path.join(pasta, "trilhafuturo_metrics.db")
+
+
+def _rotulos(pares):
+    def escapar(valor):
+        return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{chave}="{escapar(valor)}"' for chave, valor in pares)
+
+
+def _serie(nome, pares):
+    return f"{nome}{{{_rotulos(pares)}}}" if pares else nome
+
+
+def _formatar(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+class _Requisicao:
+    """Medições da requisição atual (guardada em ``g``)."""
+
+    __slots__ = ("inicio", "status", "consultas", "tempo_db", "tempo_templates", "templates", "comandos")
+
+    def __init__(self, detalhar):
+        self.inicio = time.perf_counter()
+        self.status = None
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_templates = 0.0
+        self.templates = []
+        self.comandos = [] if detalhar else None
+
+
+class Metrics:
+    def __init__(self, path=None, flush_interval=1.0, slow_request_ms=0, logger=None):
+        self.path = path or default_metrics_path()
+        self.flush_interval = flush_interval
+        self.slow_request_ms = slow_request_ms
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._pendentes = defaultdict(float)
+        self._series = {}
+        self._local = threading.local()
+        self._proximo_flush = 0.0
+        self._create_schema()
+        # Deltas herdados do processo pai já são dele
+        os.register_at_fork(after_in_child=self._descartar)
+        atexit.register(self.flush)
+
+    # --- ARMAZENAMENTO COMPARTILHADO ---
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS metricas (
+                serie TEXT PRIMARY KEY,
+                familia TEXT NOT NULL,
+                valor REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def _descartar(self):
+        self._lock = threading.Lock()
+        self._pendentes = defaultdict(float)
+
+    def flush(self):
+        """Soma os deltas deste worker no arquivo compartilhado."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, defaultdict(float)
+        if not pendentes:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("""
+                INSERT INTO metricas (serie, familia, valor) VALUES (?, ?, ?)
+                ON CONFLICT(serie) DO UPDATE SET valor = valor + excluded.valor
+            """, [(serie, familia, valor) for (serie, familia), valor in pendentes.items()])
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _maybe_flush(self, now):
+        if now >= self._proximo_flush:
+            self._proximo_flush = now + self.flush_interval
+            self.flush()
+
+    # --- COLETA ---
+    def inc(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        serie = self._series.get(chave)
+        if serie is None:
+            serie = self._series[chave] = (_serie(nome, chave[1]), nome)
+        with self._lock:
+            self._pendentes[serie] += valor
+
+    def observe(self, nome, valor, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        series = self._series.get(chave)
+        if series is None:
+            # Buckets cumulativos: uma observação soma 1 em todos os le >= valor
+            buckets = METRICAS[nome][2]
+            series = self._series[chave] = (
+                [(_serie(f"{nome}_bucket", chave[1] + (("le", _formatar(le)),)), nome)
+                 for le in buckets]
+                + [(_serie(f"{nome}_bucket", chave[1] + (("le", "+Inf"),)), nome)],
+                (_serie(f"{nome}_sum", chave[1]), nome),
+                (_serie(f"{nome}_count", chave[1]), nome),
+            )
+        buckets, soma, contagem = series
+        inicio = bisect_left(METRICAS[nome][2], valor)
+        with self._lock:
+            for serie in buckets[inicio:]:
+                self._pendentes[serie] += 1
+            self._pendentes[soma] += valor
+            self._pendentes[contagem] += 1
+
+    # --- EXPOSIÇÃO ---
+    def render(self):
+        """Texto no formato de exposição do Prometheus, somando todos os workers."""
+        self.flush()
+        rows = self._conn().execute("SELECT familia, serie, valor FROM metricas").fetchall()
+
+        def ordem(row):
+            familia, serie, _ = row
+            le = _LE_RE.search(serie)
+            limite = float(le.group(1)) if le else 0.0
+            return familia, _LE_RE.sub("", serie), limite
+
+        linhas = []
+        familia_atual = None
+        for familia, serie, valor in sorted(rows, key=ordem):
+            if familia != familia_atual:
+                tipo, descricao, _ = METRICAS.get(familia, ("untyped", "", None))
+                linhas.append(f"# HELP {familia} {descricao}")
+                linhas.append(f"# TYPE {familia} {tipo}")
+                familia_atual = familia
+            linhas.append(f"{serie} {_formatar(valor)}")
+        return "\n".join(linhas) + "\n"
+
+    # --- INTEGRAÇÃO COM O FLASK E O SQLALCHEMY ---
+    def init_app(self, app, engine):
+        if self.logger is None:
+            self.logger = app.logger
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app, weak=False)
+        template_rendered.connect(self._after_render, app, weak=False)
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_request(self):
+        g._metricas = _Requisicao(detalhar=bool(self.slow_request_ms))
+
+    def _after_request(self, response):
+        atual = g.get("_metricas")
+        if atual is not None:
+            atual.status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        # Roda sempre, inclusive quando a view levanta uma exceção não tratada
+        # (o after_request pode não rodar): essas requisições contam como 500
+        atual = g.pop("_metricas", None)
+        if atual is None:
+            return
+        status = 500 if exc is not None or atual.status is None else atual.status
+        duracao = time.perf_counter() - atual.inicio
+        endpoint = request.endpoint or "desconhecido"
+        self.inc("trilhafuturo_http_requests_total", endpoint=endpoint,
+                 method=request.method, status=status)
+        self.observe("trilhafuturo_http_request_duration_seconds", duracao, endpoint=endpoint)
+        self.observe("trilhafuturo_db_queries_per_request", atual.consultas, endpoint=endpoint)
+        self.observe("trilhafuturo_db_time_per_request_seconds", atual.tempo_db, endpoint=endpoint)
+        for nome, tempo in atual.templates:
+            self.observe("trilhafuturo_template_render_seconds", tempo, template=nome)
+
+        if self.slow_request_ms and duracao * 1000 >= self.slow_request_ms:
+            self._log_lenta(atual, duracao, status)
+        self._maybe_flush(time.monotonic())
+
+    def _log_lenta(self, atual, duracao, status):
+        por_comando = defaultdict(lambda: [0, 0.0])
+        for comando, tempo in atual.comandos:
+            por_comando[comando][0] += 1
+            por_comando[comando][1] += tempo
+        detalhes = "".join(
+            f"\n  {vezes:>4}x {tempo * 1000:9.2f} ms  {comando}"
+            for comando, (vezes, tempo) in sorted(por_comando.items(), key=lambda item: -item[1][1])
+        )
+        self.logger.warning(
+            "Requisição lenta: %s %s -> %s em %.1f ms (SQL: %d consultas, %.1f ms; "
+            "templates: %.1f ms)%s",
+            request.method, request.full_path.rstrip("?"), status, duracao * 1000,
+            atual.consultas, atual.tempo_db * 1000, atual.tempo_templates * 1000, detalhes,
+        )
+
+    def _before_render(self, sender, template, context, **extra):
+        atual = g.get("_metricas")
+        if atual is not None:
+            g.setdefault("_metricas_templates", []).append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        atual = g.get("_metricas")
+        inicios = g.get("_metricas_templates")
+        if atual is None or not inicios:
+            return
+        tempo = time.perf_counter() - inicios.pop()
+        atual.templates.append((template.name or "<string>", tempo))
+        if not inicios:
+            # Templates aninhados não contam duas vezes no total da requisição
+            atual.tempo_templates += tempo
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._metricas_inicio = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        tempo = time.perf_counter() - context._metricas_inicio
+        atual = g.get("_metricas") if has_request_context() else None
+        if atual is None:
+            self.inc("trilhafuturo_db_background_queries_total")
+            self.inc("trilhafuturo_db_background_seconds_total", tempo)
+            return
+        atual.consultas += 1
+        atual.tempo_db += tempo
+        if atual.comandos is not None:
+            atual.comandos.append((" ".join(statement.split())[:200], tempo))
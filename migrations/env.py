@@ -0,0 +1,56 @@
+"""Ambiente do Alembic para o Trilha Futuro.
+
+Chamado por ``db.upgrade_database`` (na inicialização e em ``flask
+db-upgrade``), que já entrega uma conexão dentro de uma transação exclusiva,
+ou direto pelo comando ``alembic``, que abre a sua a partir de
+``DATABASE_URL``/``DB_NAME``.
+"""
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from alembic.script import ScriptDirectory
+
+import db
+from models import metadata
+
+config = context.config
+
+# PRAGMA user_version dos bancos migrados pelo antigo db.MIGRATIONS ->
+# revisão equivalente, para que só o que falta seja aplicado
+LEGACY_REVISIONS = {1: "0002", 2: "0003", 3: "0004"}
+
+
+def _stamp_legacy(migration_context):
+    conn = migration_context.connection
+    if conn.dialect.name != "sqlite" or migration_context.get_current_revision() is not None:
+        return
+    versao = conn.exec_driver_sql("PRAGMA user_version").scalar()
+    if versao in LEGACY_REVISIONS:
+        migration_context.stamp(ScriptDirectory.from_config(config), LEGACY_REVISIONS[versao])
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        _stamp_legacy(context.get_context())
+        context.run_migrations()
+
+
+connection = config.attributes.get("connection")
+if connection is not None:
+    run_migrations(connection)
+elif context.is_offline_mode():
+    # As migrações inspecionam o banco (bancos SQLite antigos), então não geram SQL offline
+    raise SystemExit("Modo offline (--sql) não é suportado; rode contra o banco.")
+else:
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    url = db.database_url(os.environ.get("DB_NAME", "trilhafuturo.db"),
+                          os.environ.get("DATABASE_URL"))
+    with db.migration_connection(url) as conn:
+        run_migrations(conn)
@@ -0,0 +1,82 @@
+"""Schema inicial: usuários, feedbacks, resultados de teste e conversas do chat.
+
+Substitui o antigo ``db.init_db()``. Bancos SQLite criados por ele já têm as
+tabelas, que ficam como estão; as revisões seguintes completam o que faltar.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-09-17 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _agora():
+    # No SQLite o CURRENT_TIMESTAMP já é UTC; no PostgreSQL dependeria do fuso da sessão
+    if op.get_bind().dialect.name == "postgresql":
+        return sa.text("(now() AT TIME ZONE 'utc')")
+    return sa.text("CURRENT_TIMESTAMP")
+
+
+def _usuario_id():
+    return sa.Column("usuario_id", sa.Integer, sa.ForeignKey("usuarios.id", ondelete="CASCADE"))
+
+
+def upgrade():
+    existentes = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "usuarios" not in existentes:
+        op.create_table(
+            "usuarios",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("nome", sa.Text, nullable=False),
+            sa.Column("email", sa.Text, nullable=False, unique=True),
+            sa.Column("senha", sa.Text, nullable=False),
+            sa.Column("data_criacao", sa.TIMESTAMP, server_default=_agora()),
+            sqlite_autoincrement=True,
+        )
+        op.create_index("idx_usuarios_email", "usuarios", ["email"])
+
+    if "feedbacks" not in existentes:
+        op.create_table(
+            "feedbacks",
+            sa.Column("id", sa.Integer, primary_key=True),
+            _usuario_id(),
+            sa.Column("comentario", sa.Text, nullable=False),
+            sa.Column("data_criacao", sa.TIMESTAMP, server_default=_agora()),
+            sqlite_autoincrement=True,
+        )
+        op.create_index("idx_feedbacks_usuario", "feedbacks", ["usuario_id"])
+
+    if "resultados_teste" not in existentes:
+        op.create_table(
+            "resultados_teste",
+            sa.Column("id", sa.Integer, primary_key=True),
+            _usuario_id(),
+            sa.Column("pontuacao", sa.Integer),
+            sa.Column("perfil", sa.Text, nullable=False),
+            sa.Column("data_teste", sa.TIMESTAMP, server_default=_agora()),
+            sqlite_autoincrement=True,
+        )
+        op.create_index("idx_resultados_usuario", "resultados_teste", ["usuario_id"])
+
+    if "conversas_chat" not in existentes:
+        op.create_table(
+            "conversas_chat",
+            sa.Column("id", sa.Integer, primary_key=True),
+            _usuario_id(),
+            sa.Column("pergunta", sa.Text, nullable=False),
+            sa.Column("resposta", sa.Text, nullable=False),
+            sa.Column("data_conversa", sa.TIMESTAMP, server_default=_agora()),
+            sqlite_autoincrement=True,
+        )
+
+
+def downgrade():
+    for table in ("conversas_chat", "resultados_teste", "feedbacks", "usuarios"):
+        op.drop_table(table)
@@ -0,0 +1,214 @@
+"""Contadores materializados para a página inicial e o gráfico de perfis.
+
+``estatisticas_globais`` e ``distribuicao_perfis`` são mantidas por triggers
+a cada INSERT/DELETE. No PostgreSQL os triggers são por comando (com
+transition tables), então um INSERT em lote atualiza cada contador uma vez.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-09-17 10:00:01
+"""
+from alembic import op
+
+import db
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+SQLITE = """
+    CREATE TABLE IF NOT EXISTS estatisticas_globais (
+        chave TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS distribuicao_perfis (
+        perfil TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0
+    );
+
+    INSERT OR REPLACE INTO estatisticas_globais (chave, valor)
+        SELECT 'total_usuarios', COUNT(id) FROM usuarios;
+    INSERT OR REPLACE INTO estatisticas_globais (chave, valor)
+        SELECT 'total_testes', COUNT(id) FROM resultados_teste;
+    INSERT OR REPLACE INTO estatisticas_globais (chave, valor) VALUES ('versao_perfis', 1);
+    INSERT OR REPLACE INTO estatisticas_globais (chave, valor)
+        VALUES ('perfis_atualizado_em', CAST(strftime('%s', 'now') AS INTEGER));
+    DELETE FROM distribuicao_perfis;
+    INSERT INTO distribuicao_perfis (perfil, total)
+        SELECT perfil, COUNT(id) FROM resultados_teste
+        WHERE perfil IS NOT NULL GROUP BY perfil;
+
+    CREATE TRIGGER IF NOT EXISTS trg_usuarios_insert_contador
+    AFTER INSERT ON usuarios BEGIN
+        UPDATE estatisticas_globais SET valor = valor + 1 WHERE chave = 'total_usuarios';
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_usuarios_delete_contador
+    AFTER DELETE ON usuarios BEGIN
+        UPDATE estatisticas_globais SET valor = valor - 1 WHERE chave = 'total_usuarios';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_resultados_insert_contador
+    AFTER INSERT ON resultados_teste BEGIN
+        UPDATE estatisticas_globais SET valor = valor + 1
+            WHERE chave IN ('total_testes', 'versao_perfis');
+        UPDATE estatisticas_globais SET valor = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE chave = 'perfis_atualizado_em';
+        INSERT INTO distribuicao_perfis (perfil, total)
+            SELECT NEW.perfil, 1 WHERE NEW.perfil IS NOT NULL
+            ON CONFLICT(perfil) DO UPDATE SET total = total + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_resultados_delete_contador
+    AFTER DELETE ON resultados_teste BEGIN
+        UPDATE estatisticas_globais SET valor = valor - 1 WHERE chave = 'total_testes';
+        UPDATE estatisticas_globais SET valor = valor + 1 WHERE chave = 'versao_perfis';
+        UPDATE estatisticas_globais SET valor = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE chave = 'perfis_atualizado_em';
+        UPDATE distribuicao_perfis SET total = total - 1 WHERE perfil = OLD.perfil;
+    END;
+"""
+
+AGORA_PG = "EXTRACT(EPOCH FROM now())::bigint"
+
+POSTGRESQL = [
+    """
+    CREATE TABLE IF NOT EXISTS estatisticas_globais (
+        chave TEXT PRIMARY KEY,
+        valor BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS distribuicao_perfis (
+        perfil TEXT PRIMARY KEY,
+        total BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    f"""
+    INSERT INTO estatisticas_globais (chave, valor)
+        SELECT 'total_usuarios', COUNT(id) FROM usuarios
+        UNION ALL SELECT 'total_testes', COUNT(id) FROM resultados_teste
+        UNION ALL SELECT 'versao_perfis', 1
+        UNION ALL SELECT 'perfis_atualizado_em', {AGORA_PG}
+    ON CONFLICT (chave) DO UPDATE SET valor = EXCLUDED.valor
+    """,
+    "DELETE FROM distribuicao_perfis",
+    """
+    INSERT INTO distribuicao_perfis (perfil, total)
+        SELECT perfil, COUNT(id) FROM resultados_teste
+        WHERE perfil IS NOT NULL GROUP BY perfil
+    """,
+
+    """
+    CREATE OR REPLACE FUNCTION trg_usuarios_insert_contador() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE estatisticas_globais SET valor = valor + (SELECT COUNT(*) FROM novos)
+            WHERE chave = 'total_usuarios';
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER trg_usuarios_insert_contador AFTER INSERT ON usuarios
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT
+    EXECUTE FUNCTION trg_usuarios_insert_contador()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION trg_usuarios_delete_contador() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE estatisticas_globais SET valor = valor - (SELECT COUNT(*) FROM velhos)
+            WHERE chave = 'total_usuarios';
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER trg_usuarios_delete_contador AFTER DELETE ON usuarios
+    REFERENCING OLD TABLE AS velhos FOR EACH STATEMENT
+    EXECUTE FUNCTION trg_usuarios_delete_contador()
+    """,
+
+    f"""
+    CREATE OR REPLACE FUNCTION trg_resultados_insert_contador() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        linhas BIGINT;
+    BEGIN
+        SELECT COUNT(*) INTO linhas FROM novos;
+        IF linhas = 0 THEN
+            RETURN NULL;
+        END IF;
+        UPDATE estatisticas_globais SET valor = valor + linhas
+            WHERE chave IN ('total_testes', 'versao_perfis');
+        UPDATE estatisticas_globais SET valor = {AGORA_PG}
+            WHERE chave = 'perfis_atualizado_em';
+        INSERT INTO distribuicao_perfis AS d (perfil, total)
+            SELECT perfil, COUNT(*) FROM novos
+            WHERE perfil IS NOT NULL GROUP BY perfil ORDER BY perfil
+            ON CONFLICT (perfil) DO UPDATE SET total = d.total + EXCLUDED.total;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER trg_resultados_insert_contador AFTER INSERT ON resultados_teste
+    REFERENCING NEW TABLE AS novos FOR EACH STATEMENT
+    EXECUTE FUNCTION trg_resultados_insert_contador()
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION trg_resultados_delete_contador() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        linhas BIGINT;
+    BEGIN
+        SELECT COUNT(*) INTO linhas FROM velhos;
+        IF linhas = 0 THEN
+            RETURN NULL;
+        END IF;
+        UPDATE estatisticas_globais SET valor = valor - linhas WHERE chave = 'total_testes';
+        UPDATE estatisticas_globais SET valor = valor + linhas WHERE chave = 'versao_perfis';
+        UPDATE estatisticas_globais SET valor = {AGORA_PG}
+            WHERE chave = 'perfis_atualizado_em';
+        UPDATE distribuicao_perfis d SET total = d.total - v.removidos
+            FROM (SELECT perfil, COUNT(*) AS removidos FROM velhos GROUP BY perfil) v
+            WHERE d.perfil = v.perfil;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER trg_resultados_delete_contador AFTER DELETE ON resultados_teste
+    REFERENCING OLD TABLE AS velhos FOR EACH STATEMENT
+    EXECUTE FUNCTION trg_resultados_delete_contador()
+    """,
+]
+
+TRIGGERS = [
+    ("trg_usuarios_insert_contador", "usuarios"),
+    ("trg_usuarios_delete_contador", "usuarios"),
+    ("trg_resultados_insert_contador", "resultados_teste"),
+    ("trg_resultados_delete_contador", "resultados_teste"),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        db.execute_script(bind, SQLITE)
+    else:
+        for statement in POSTGRESQL:
+            bind.exec_driver_sql(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for trigger, table in TRIGGERS:
+        if bind.dialect.name == "sqlite":
+            bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        else:
+            bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+            bind.exec_driver_sql(f"DROP FUNCTION IF EXISTS {trigger}()")
+    op.drop_table("distribuicao_perfis")
+    op.drop_table("estatisticas_globais")
@@ -0,0 +1,178 @@
+"""Índices compostos do histórico e totais por usuário (``estatisticas_usuario``).
+
+Índices (usuario_id, data_*): histórico ordenado sem sort e, no caso de
+resultados_teste, sem acessar a tabela (índice de cobertura). Os índices
+antigos só em usuario_id viram prefixos redundantes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-09-17 10:00:02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import db
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+CONTADORES = (
+    ("resultados_teste", "total_testes"),
+    ("feedbacks", "total_feedbacks"),
+    ("conversas_chat", "total_conversas"),
+)
+
+INDICES = """
+    CREATE INDEX IF NOT EXISTS idx_resultados_usuario_data
+        ON resultados_teste(usuario_id, data_teste, id, perfil);
+    CREATE INDEX IF NOT EXISTS idx_feedbacks_usuario_data
+        ON feedbacks(usuario_id, data_criacao);
+    CREATE INDEX IF NOT EXISTS idx_conversas_usuario_data
+        ON conversas_chat(usuario_id, data_conversa);
+    DROP INDEX IF EXISTS idx_resultados_usuario;
+    DROP INDEX IF EXISTS idx_feedbacks_usuario;
+"""
+
+ESTATISTICAS = """
+    CREATE TABLE IF NOT EXISTS estatisticas_usuario (
+        usuario_id INTEGER PRIMARY KEY,
+        total_testes {inteiro} NOT NULL DEFAULT 0,
+        total_feedbacks {inteiro} NOT NULL DEFAULT 0,
+        total_conversas {inteiro} NOT NULL DEFAULT 0
+    );
+    DELETE FROM estatisticas_usuario;
+    INSERT INTO estatisticas_usuario (usuario_id, total_testes, total_feedbacks, total_conversas)
+        SELECT u.id,
+               (SELECT COUNT(id) FROM resultados_teste WHERE usuario_id = u.id),
+               (SELECT COUNT(id) FROM feedbacks WHERE usuario_id = u.id),
+               (SELECT COUNT(id) FROM conversas_chat WHERE usuario_id = u.id)
+        FROM usuarios u;
+"""
+
+
+def _upgrade_sqlite(bind):
+    # Bancos antigos não têm data_criacao em usuarios/feedbacks. ADD COLUMN não
+    # aceita DEFAULT CURRENT_TIMESTAMP, então um trigger preenche os novos registros.
+    for table in ("usuarios", "feedbacks"):
+        colunas = {c["name"] for c in sa.inspect(bind).get_columns(table)}
+        if "data_criacao" not in colunas:
+            bind.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN data_criacao TIMESTAMP")
+            bind.exec_driver_sql(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_data_criacao
+                AFTER INSERT ON {table} WHEN NEW.data_criacao IS NULL BEGIN
+                    UPDATE {table} SET data_criacao = CURRENT_TIMESTAMP WHERE id = NEW.id;
+                END
+            """)
+
+    db.execute_script(bind, INDICES)
+    db.execute_script(bind, ESTATISTICAS.format(inteiro="INTEGER"))
+
+    for table, coluna in CONTADORES:
+        db.execute_script(bind, f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_usuario
+            AFTER INSERT ON {table} WHEN NEW.usuario_id IS NOT NULL BEGIN
+                INSERT INTO estatisticas_usuario (usuario_id, {coluna}) VALUES (NEW.usuario_id, 1)
+                    ON CONFLICT(usuario_id) DO UPDATE SET {coluna} = {coluna} + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_usuario
+            AFTER DELETE ON {table} WHEN OLD.usuario_id IS NOT NULL BEGIN
+                UPDATE estatisticas_usuario SET {coluna} = {coluna} - 1
+                    WHERE usuario_id = OLD.usuario_id;
+            END;
+        """)
+    db.execute_script(bind, """
+        CREATE TRIGGER IF NOT EXISTS trg_usuarios_delete_estatisticas
+        AFTER DELETE ON usuarios BEGIN
+            DELETE FROM estatisticas_usuario WHERE usuario_id = OLD.id;
+        END;
+    """)
+
+
+def _upgrade_postgresql(bind):
+    for script in (INDICES, ESTATISTICAS.format(inteiro="BIGINT")):
+        for statement in script.split(";"):
+            if statement.strip():
+                bind.exec_driver_sql(statement)
+
+    # Triggers por comando: um INSERT em lote faz um upsert por usuário
+    for table, coluna in CONTADORES:
+        bind.exec_driver_sql(f"""
+            CREATE OR REPLACE FUNCTION trg_{table}_insert_usuario() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                INSERT INTO estatisticas_usuario AS e (usuario_id, {coluna})
+                    SELECT usuario_id, COUNT(*) FROM novos
+                    WHERE usuario_id IS NOT NULL GROUP BY usuario_id ORDER BY usuario_id
+                    ON CONFLICT (usuario_id) DO UPDATE SET {coluna} = e.{coluna} + EXCLUDED.{coluna};
+                RETURN NULL;
+            END
+            $$
+        """)
+        bind.exec_driver_sql(f"""
+            CREATE TRIGGER trg_{table}_insert_usuario AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS novos FOR EACH STATEMENT
+            EXECUTE FUNCTION trg_{table}_insert_usuario()
+        """)
+        bind.exec_driver_sql(f"""
+            CREATE OR REPLACE FUNCTION trg_{table}_delete_usuario() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                UPDATE estatisticas_usuario e SET {coluna} = e.{coluna} - v.removidos
+                    FROM (SELECT usuario_id, COUNT(*) AS removidos FROM velhos
+                          WHERE usuario_id IS NOT NULL GROUP BY usuario_id) v
+                    WHERE e.usuario_id = v.usuario_id;
+                RETURN NULL;
+            END
+            $$
+        """)
+        bind.exec_driver_sql(f"""
+            CREATE TRIGGER trg_{table}_delete_usuario AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS velhos FOR EACH STATEMENT
+            EXECUTE FUNCTION trg_{table}_delete_usuario()
+        """)
+    bind.exec_driver_sql("""
+        CREATE OR REPLACE FUNCTION trg_usuarios_delete_estatisticas() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            DELETE FROM estatisticas_usuario WHERE usuario_id IN (SELECT id FROM velhos);
+            RETURN NULL;
+        END
+        $$
+    """)
+    bind.exec_driver_sql("""
+        CREATE TRIGGER trg_usuarios_delete_estatisticas AFTER DELETE ON usuarios
+        REFERENCING OLD TABLE AS velhos FOR EACH STATEMENT
+        EXECUTE FUNCTION trg_usuarios_delete_estatisticas()
+    """)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        _upgrade_sqlite(bind)
+    else:
+        _upgrade_postgresql(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    triggers = [(f"trg_{table}_{evento}_usuario", table)
+                for table, _ in CONTADORES for evento in ("insert", "delete")]
+    triggers.append(("trg_usuarios_delete_estatisticas", "usuarios"))
+    for trigger, table in triggers:
+        if bind.dialect.name == "sqlite":
+            bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        else:
+            bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+            bind.exec_driver_sql(f"DROP FUNCTION IF EXISTS {trigger}()")
+    op.drop_table("estatisticas_usuario")
+    for statement in (
+        "DROP INDEX IF EXISTS idx_resultados_usuario_data",
+        "DROP INDEX IF EXISTS idx_feedbacks_usuario_data",
+        "DROP INDEX IF EXISTS idx_conversas_usuario_data",
+        "CREATE INDEX IF NOT EXISTS idx_resultados_usuario ON resultados_teste(usuario_id)",
+        "CREATE INDEX IF NOT EXISTS idx_feedbacks_usuario ON feedbacks(usuario_id)",
+    ):
+        bind.exec_driver_sql(statement)
@@ -0,0 +1,90 @@
+"""Respostas de cada teste, para recalcular o perfil quando os pesos mudarem.
+
+Guarda as contagens de cada resposta em ``resultados_teste.respostas`` (ver
+``scoring.rescore_results``) e mantém os contadores materializados quando o
+perfil de um resultado é alterado.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-09-17 10:00:03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import db
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+SQLITE = """
+    CREATE TRIGGER IF NOT EXISTS trg_resultados_update_perfil
+    AFTER UPDATE OF perfil ON resultados_teste
+    WHEN OLD.perfil IS NOT NEW.perfil BEGIN
+        UPDATE distribuicao_perfis SET total = total - 1 WHERE perfil = OLD.perfil;
+        INSERT INTO distribuicao_perfis (perfil, total)
+            SELECT NEW.perfil, 1 WHERE NEW.perfil IS NOT NULL
+            ON CONFLICT(perfil) DO UPDATE SET total = total + 1;
+        UPDATE estatisticas_globais SET valor = valor + 1 WHERE chave = 'versao_perfis';
+        UPDATE estatisticas_globais SET valor = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE chave = 'perfis_atualizado_em';
+    END;
+"""
+
+# Transition tables não aceitam "UPDATE OF perfil"; a função filtra as linhas
+# em que o perfil realmente mudou.
+POSTGRESQL = [
+    """
+    CREATE OR REPLACE FUNCTION trg_resultados_update_perfil() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM velhos v JOIN novos n ON n.id = v.id
+                       WHERE v.perfil IS DISTINCT FROM n.perfil) THEN
+            RETURN NULL;
+        END IF;
+        UPDATE distribuicao_perfis d SET total = d.total - m.saidas
+            FROM (SELECT v.perfil, COUNT(*) AS saidas
+                  FROM velhos v JOIN novos n ON n.id = v.id
+                  WHERE v.perfil IS DISTINCT FROM n.perfil GROUP BY v.perfil) m
+            WHERE d.perfil = m.perfil;
+        INSERT INTO distribuicao_perfis AS d (perfil, total)
+            SELECT n.perfil, COUNT(*) FROM velhos v JOIN novos n ON n.id = v.id
+            WHERE v.perfil IS DISTINCT FROM n.perfil AND n.perfil IS NOT NULL
+            GROUP BY n.perfil ORDER BY n.perfil
+            ON CONFLICT (perfil) DO UPDATE SET total = d.total + EXCLUDED.total;
+        UPDATE estatisticas_globais SET valor = valor + 1 WHERE chave = 'versao_perfis';
+        UPDATE estatisticas_globais SET valor = EXTRACT(EPOCH FROM now())::bigint
+            WHERE chave = 'perfis_atualizado_em';
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER trg_resultados_update_perfil AFTER UPDATE ON resultados_teste
+    REFERENCING OLD TABLE AS velhos NEW TABLE AS novos FOR EACH STATEMENT
+    EXECUTE FUNCTION trg_resultados_update_perfil()
+    """,
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    colunas = {c["name"] for c in sa.inspect(bind).get_columns("resultados_teste")}
+    if "respostas" not in colunas:
+        op.add_column("resultados_teste", sa.Column("respostas", sa.Text))
+    if bind.dialect.name == "sqlite":
+        db.execute_script(bind, SQLITE)
+    else:
+        for statement in POSTGRESQL:
+            bind.exec_driver_sql(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        bind.exec_driver_sql("DROP TRIGGER IF EXISTS trg_resultados_update_perfil")
+    else:
+        bind.exec_driver_sql("DROP TRIGGER IF EXISTS trg_resultados_update_perfil ON resultados_teste")
+        bind.exec_driver_sql("DROP FUNCTION IF EXISTS trg_resultados_update_perfil()")
+    op.drop_column("resultados_teste", "respostas")
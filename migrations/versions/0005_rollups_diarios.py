@@ -0,0 +1,182 @@
+"""Rollups diários para os gráficos de tendência (ver ``rollups.py``).
+
+``rollup_testes_dia`` conta testes por (dia, perfil) e ``rollup_chat_dia``
+conversas por (dia, tópico). Ambos são mantidos por triggers a cada
+INSERT/DELETE/UPDATE, no mesmo padrão dos contadores globais; semanas e
+meses são somados a partir dos dias na leitura. ``conversas_chat`` ganha a
+coluna ``topico`` (chave do tópico respondido, ``''`` para o fallback e
+NULL nos registros anteriores a esta revisão, até ``flask rollups-backfill``).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-09-17 10:00:04
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import db
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+TABELAS = """
+    CREATE TABLE IF NOT EXISTS rollup_testes_dia (
+        dia DATE NOT NULL,
+        perfil TEXT NOT NULL,
+        total {inteiro} NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, perfil)
+    );
+    CREATE TABLE IF NOT EXISTS rollup_chat_dia (
+        dia DATE NOT NULL,
+        topico TEXT NOT NULL,
+        total {inteiro} NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, topico)
+    );
+    DELETE FROM rollup_testes_dia;
+    INSERT INTO rollup_testes_dia (dia, perfil, total)
+        SELECT {dia_teste}, perfil, COUNT(id) FROM resultados_teste
+        WHERE data_teste IS NOT NULL AND perfil IS NOT NULL GROUP BY 1, 2;
+    DELETE FROM rollup_chat_dia;
+    INSERT INTO rollup_chat_dia (dia, topico, total)
+        SELECT {dia_conversa}, COALESCE(topico, ''), COUNT(id) FROM conversas_chat
+        WHERE data_conversa IS NOT NULL GROUP BY 1, 2;
+"""
+
+SQLITE = """
+    CREATE TRIGGER IF NOT EXISTS trg_resultados_insert_rollup
+    AFTER INSERT ON resultados_teste
+    WHEN NEW.data_teste IS NOT NULL AND NEW.perfil IS NOT NULL BEGIN
+        INSERT INTO rollup_testes_dia (dia, perfil, total)
+            VALUES (date(NEW.data_teste), NEW.perfil, 1)
+            ON CONFLICT(dia, perfil) DO UPDATE SET total = total + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_resultados_delete_rollup
+    AFTER DELETE ON resultados_teste WHEN OLD.data_teste IS NOT NULL BEGIN
+        UPDATE rollup_testes_dia SET total = total - 1
+            WHERE dia = date(OLD.data_teste) AND perfil = OLD.perfil;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_resultados_update_rollup
+    AFTER UPDATE OF perfil, data_teste ON resultados_teste
+    WHEN OLD.perfil IS NOT NEW.perfil OR OLD.data_teste IS NOT NEW.data_teste BEGIN
+        UPDATE rollup_testes_dia SET total = total - 1
+            WHERE dia = date(OLD.data_teste) AND perfil = OLD.perfil;
+        INSERT INTO rollup_testes_dia (dia, perfil, total)
+            SELECT date(NEW.data_teste), NEW.perfil, 1
+            WHERE NEW.data_teste IS NOT NULL AND NEW.perfil IS NOT NULL
+            ON CONFLICT(dia, perfil) DO UPDATE SET total = total + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_conversas_insert_rollup
+    AFTER INSERT ON conversas_chat WHEN NEW.data_conversa IS NOT NULL BEGIN
+        INSERT INTO rollup_chat_dia (dia, topico, total)
+            VALUES (date(NEW.data_conversa), COALESCE(NEW.topico, ''), 1)
+            ON CONFLICT(dia, topico) DO UPDATE SET total = total + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_conversas_delete_rollup
+    AFTER DELETE ON conversas_chat WHEN OLD.data_conversa IS NOT NULL BEGIN
+        UPDATE rollup_chat_dia SET total = total - 1
+            WHERE dia = date(OLD.data_conversa) AND topico = COALESCE(OLD.topico, '');
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_conversas_update_rollup
+    AFTER UPDATE OF topico, data_conversa ON conversas_chat
+    WHEN COALESCE(OLD.topico, '') IS NOT COALESCE(NEW.topico, '')
+      OR OLD.data_conversa IS NOT NEW.data_conversa BEGIN
+        UPDATE rollup_chat_dia SET total = total - 1
+            WHERE dia = date(OLD.data_conversa) AND topico = COALESCE(OLD.topico, '');
+        INSERT INTO rollup_chat_dia (dia, topico, total)
+            SELECT date(NEW.data_conversa), COALESCE(NEW.topico, ''), 1
+            WHERE NEW.data_conversa IS NOT NULL
+            ON CONFLICT(dia, topico) DO UPDATE SET total = total + 1;
+    END;
+"""
+
+# prefixo dos triggers -> (tabela, rollup, coluna do rollup, chave, coluna de data);
+# ``chave`` recebe o alias da linha ("v.", "n." ou "")
+ROLLUPS = {
+    "resultados": ("resultados_teste", "rollup_testes_dia", "perfil", "{t}perfil", "data_teste"),
+    "conversas": ("conversas_chat", "rollup_chat_dia", "topico", "COALESCE({t}topico, '')",
+                  "data_conversa"),
+}
+
+
+def _postgresql_triggers(nome, tabela, rollup, coluna, chave, data):
+    """Triggers por comando: um INSERT em lote faz um upsert por (dia, chave)."""
+
+    def agrupa(fonte, t="", filtro="TRUE"):
+        return f"""SELECT {t}{data}::date AS dia, {chave.format(t=t)} AS chave, COUNT(*) AS linhas
+                   FROM {fonte} WHERE {t}{data} IS NOT NULL AND {chave.format(t=t)} IS NOT NULL
+                   AND {filtro} GROUP BY 1, 2"""
+
+    def soma(selecao):
+        return f"""INSERT INTO {rollup} AS r (dia, {coluna}, total)
+                SELECT dia, chave, linhas FROM ({selecao}) a ORDER BY 1, 2
+                ON CONFLICT (dia, {coluna}) DO UPDATE SET total = r.total + EXCLUDED.total;"""
+
+    def subtrai(selecao):
+        return f"""UPDATE {rollup} r SET total = r.total - a.linhas
+                FROM ({selecao}) a WHERE r.dia = a.dia AND r.{coluna} = a.chave;"""
+
+    # No UPDATE só as linhas cuja data ou chave mudou trocam de balde
+    mudou = (f"v.{data} IS DISTINCT FROM n.{data} "
+             f"OR {chave.format(t='v.')} IS DISTINCT FROM {chave.format(t='n.')}")
+    pares = "velhos v JOIN novos n ON n.id = v.id"
+    funcoes = {
+        "insert": ("NEW TABLE AS novos", soma(agrupa("novos"))),
+        "delete": ("OLD TABLE AS velhos", subtrai(agrupa("velhos"))),
+        "update": ("OLD TABLE AS velhos NEW TABLE AS novos",
+                   subtrai(agrupa(pares, "v.", mudou)) + soma(agrupa(pares, "n.", mudou))),
+    }
+    statements = []
+    for evento, (referencing, corpo) in funcoes.items():
+        statements.append(f"""
+            CREATE OR REPLACE FUNCTION trg_{nome}_{evento}_rollup() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {corpo}
+                RETURN NULL;
+            END
+            $$
+        """)
+        statements.append(f"""
+            CREATE TRIGGER trg_{nome}_{evento}_rollup AFTER {evento.upper()} ON {tabela}
+            REFERENCING {referencing} FOR EACH STATEMENT
+            EXECUTE FUNCTION trg_{nome}_{evento}_rollup()
+        """)
+    return statements
+
+
+def upgrade():
+    bind = op.get_bind()
+    colunas = {c["name"] for c in sa.inspect(bind).get_columns("conversas_chat")}
+    if "topico" not in colunas:
+        op.add_column("conversas_chat", sa.Column("topico", sa.Text))
+    if bind.dialect.name == "sqlite":
+        db.execute_script(bind, TABELAS.format(
+            inteiro="INTEGER", dia_teste="date(data_teste)", dia_conversa="date(data_conversa)"))
+        db.execute_script(bind, SQLITE)
+    else:
+        script = TABELAS.format(
+            inteiro="BIGINT", dia_teste="data_teste::date", dia_conversa="data_conversa::date")
+        for statement in script.split(";"):
+            if statement.strip():
+                bind.exec_driver_sql(statement)
+        for nome, definicao in ROLLUPS.items():
+            for statement in _postgresql_triggers(nome, *definicao):
+                bind.exec_driver_sql(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for nome, (tabela, *_) in ROLLUPS.items():
+        for evento in ("insert", "delete", "update"):
+            trigger = f"trg_{nome}_{evento}_rollup"
+            if bind.dialect.name == "sqlite":
+                bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            else:
+                bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger} ON {tabela}")
+                bind.exec_driver_sql(f"DROP FUNCTION IF EXISTS {trigger}()")
+    op.drop_table("rollup_chat_dia")
+    op.drop_table("rollup_testes_dia")
+    op.drop_column("conversas_chat", "topico")
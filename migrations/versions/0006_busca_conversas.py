@@ -0,0 +1,82 @@
+"""Índice de busca textual nas conversas do chat (ver ``search.py``).
+
+No SQLite, ``conversas_chat_fts`` é uma tabela FTS5 sem conteúdo próprio
+(``content=''``): guarda só o índice invertido, com o id da conversa como
+rowid. Os textos continuam em ``conversas_chat``. A coluna ``dono``
+(``'u<usuario_id>'``) restringe a busca às conversas do usuário dentro do
+próprio índice. A tokenização ignora acentos e há índices de prefixo de 2
+e 3 letras. Triggers mantêm o índice a cada INSERT/DELETE/UPDATE.
+
+No PostgreSQL, um índice GIN sobre ``to_tsvector('simple', ...)`` do texto
+em minúsculas e sem acentos (``translate``) faz o mesmo papel.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-09-17 10:00:05
+"""
+from alembic import op
+
+import db
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+SQLITE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversas_chat_fts USING fts5(
+        dono, pergunta, resposta,
+        content = '',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    );
+    INSERT INTO conversas_chat_fts (rowid, dono, pergunta, resposta)
+        SELECT id, 'u' || usuario_id, pergunta, resposta FROM conversas_chat
+        WHERE usuario_id IS NOT NULL;
+
+    CREATE TRIGGER IF NOT EXISTS trg_conversas_insert_busca
+    AFTER INSERT ON conversas_chat WHEN NEW.usuario_id IS NOT NULL BEGIN
+        INSERT INTO conversas_chat_fts (rowid, dono, pergunta, resposta)
+            VALUES (NEW.id, 'u' || NEW.usuario_id, NEW.pergunta, NEW.resposta);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_conversas_delete_busca
+    AFTER DELETE ON conversas_chat WHEN OLD.usuario_id IS NOT NULL BEGIN
+        INSERT INTO conversas_chat_fts (conversas_chat_fts, rowid, dono, pergunta, resposta)
+            VALUES ('delete', OLD.id, 'u' || OLD.usuario_id, OLD.pergunta, OLD.resposta);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_conversas_update_busca
+    AFTER UPDATE OF usuario_id, pergunta, resposta ON conversas_chat BEGIN
+        INSERT INTO conversas_chat_fts (conversas_chat_fts, rowid, dono, pergunta, resposta)
+            SELECT 'delete', OLD.id, 'u' || OLD.usuario_id, OLD.pergunta, OLD.resposta
+            WHERE OLD.usuario_id IS NOT NULL;
+        INSERT INTO conversas_chat_fts (rowid, dono, pergunta, resposta)
+            SELECT NEW.id, 'u' || NEW.usuario_id, NEW.pergunta, NEW.resposta
+            WHERE NEW.usuario_id IS NOT NULL;
+    END;
+"""
+
+# Mesma expressão usada nas consultas de search.py, para o índice ser usado
+POSTGRESQL = """
+    CREATE INDEX IF NOT EXISTS idx_conversas_chat_busca ON conversas_chat USING gin (
+        to_tsvector('simple'::regconfig, translate(lower(pergunta || ' ' || resposta),
+            'áàâãäéèêëíìîïóòôõöúùûüçñ', 'aaaaaeeeeiiiiooooouuuucn'))
+    )
+"""
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        db.execute_script(bind, SQLITE)
+    else:
+        bind.exec_driver_sql(POSTGRESQL)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for evento in ("insert", "delete", "update"):
+            bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS trg_conversas_{evento}_busca")
+        bind.exec_driver_sql("DROP TABLE IF EXISTS conversas_chat_fts")
+    else:
+        bind.exec_driver_sql("DROP INDEX IF EXISTS idx_conversas_chat_busca")
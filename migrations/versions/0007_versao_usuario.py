@@ -0,0 +1,124 @@
+"""Versão dos dados de cada usuário, base dos ETags da API (ver ``api.py``).
+
+``estatisticas_usuario.versao`` aumenta a cada INSERT/DELETE do usuário em
+``resultados_teste``, ``feedbacks`` e ``conversas_chat`` e a cada UPDATE
+que muda o que o dashboard mostra (perfil e data dos testes, texto e data
+dos feedbacks). Enquanto a versão não muda, o dashboard do usuário é o
+mesmo e a API pode responder 304 sem consultá-lo.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-09-17 10:00:06
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import db
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# tabela -> colunas cujo UPDATE muda o dashboard (None = só INSERT/DELETE)
+TABELAS = {
+    "resultados_teste": ("perfil", "data_teste"),
+    "feedbacks": ("comentario", "data_criacao"),
+    "conversas_chat": None,
+}
+
+# No INSERT, upsert (o trigger dos totais da 0003 pode rodar antes ou depois
+# deste). No DELETE/UPDATE só UPDATE: a linha já existe e, se o usuário foi
+# excluído, não deve voltar.
+INSERT_SQLITE = """
+    INSERT INTO estatisticas_usuario (usuario_id, versao) VALUES (NEW.usuario_id, 1)
+        ON CONFLICT(usuario_id) DO UPDATE SET versao = versao + 1;
+"""
+UPDATE_SQLITE = """
+    UPDATE estatisticas_usuario SET versao = versao + 1 WHERE usuario_id = {linha}.usuario_id;
+"""
+
+INSERT_POSTGRESQL = """
+    INSERT INTO estatisticas_usuario AS e (usuario_id, versao)
+        SELECT usuario_id, 1 FROM ({linhas}) a
+        WHERE usuario_id IS NOT NULL GROUP BY usuario_id ORDER BY usuario_id
+        ON CONFLICT (usuario_id) DO UPDATE SET versao = e.versao + 1;
+"""
+UPDATE_POSTGRESQL = """
+    UPDATE estatisticas_usuario e SET versao = e.versao + 1
+        WHERE e.usuario_id IN ({linhas});
+"""
+
+
+def _triggers_sqlite(tabela, colunas):
+    triggers = {
+        "insert": ("AFTER INSERT", "NEW.usuario_id IS NOT NULL", INSERT_SQLITE),
+        "delete": ("AFTER DELETE", "OLD.usuario_id IS NOT NULL", UPDATE_SQLITE.format(linha="OLD")),
+    }
+    if colunas:
+        mudou = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in colunas)
+        triggers["update"] = (f"AFTER UPDATE OF {', '.join(colunas)}",
+                              f"NEW.usuario_id IS NOT NULL AND ({mudou})",
+                              UPDATE_SQLITE.format(linha="NEW"))
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{evento}_versao
+            {momento} ON {tabela} WHEN {condicao} BEGIN {corpo} END;"""
+        for evento, (momento, condicao, corpo) in triggers.items()
+    ]
+
+
+def _triggers_postgresql(tabela, colunas):
+    funcoes = {
+        "insert": ("NEW TABLE AS novos", INSERT_POSTGRESQL.format(linhas="SELECT usuario_id FROM novos")),
+        "delete": ("OLD TABLE AS velhos", UPDATE_POSTGRESQL.format(linhas="SELECT usuario_id FROM velhos")),
+    }
+    if colunas:
+        mudou = " OR ".join(f"v.{c} IS DISTINCT FROM n.{c}" for c in colunas)
+        funcoes["update"] = ("OLD TABLE AS velhos NEW TABLE AS novos", UPDATE_POSTGRESQL.format(
+            linhas=f"SELECT n.usuario_id FROM velhos v JOIN novos n ON n.id = v.id WHERE {mudou}"))
+    statements = []
+    for evento, (referencing, corpo) in funcoes.items():
+        statements.append(f"""
+            CREATE OR REPLACE FUNCTION trg_{tabela}_{evento}_versao() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {corpo}
+                RETURN NULL;
+            END
+            $$
+        """)
+        statements.append(f"""
+            CREATE TRIGGER trg_{tabela}_{evento}_versao AFTER {evento.upper()} ON {tabela}
+            REFERENCING {referencing} FOR EACH STATEMENT
+            EXECUTE FUNCTION trg_{tabela}_{evento}_versao()
+        """)
+    return statements
+
+
+def upgrade():
+    bind = op.get_bind()
+    colunas = {c["name"] for c in sa.inspect(bind).get_columns("estatisticas_usuario")}
+    if "versao" not in colunas:
+        op.add_column("estatisticas_usuario",
+                      sa.Column("versao", sa.BigInteger, nullable=False, server_default="0"))
+    for tabela, colunas_update in TABELAS.items():
+        if bind.dialect.name == "sqlite":
+            db.execute_script(bind, "\n".join(_triggers_sqlite(tabela, colunas_update)))
+        else:
+            for statement in _triggers_postgresql(tabela, colunas_update):
+                bind.exec_driver_sql(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for tabela, colunas_update in TABELAS.items():
+        for evento in ("insert", "delete", "update") if colunas_update else ("insert", "delete"):
+            trigger = f"trg_{tabela}_{evento}_versao"
+            if bind.dialect.name == "sqlite":
+                bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            else:
+                bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger} ON {tabela}")
+                bind.exec_driver_sql(f"DROP FUNCTION IF EXISTS {trigger}()")
+    # DROP COLUMN direto (SQLite >= 3.35): o batch do alembic recria a tabela e
+    # quebra os triggers da 0003 que a referenciam
+    bind.exec_driver_sql("ALTER TABLE estatisticas_usuario DROP COLUMN versao")
@@ -0,0 +1,54 @@
+"""Conversas arquivadas pela retenção, por (dia, tópico): ``rollup_chat_arquivado``.
+
+A manutenção (``retention.py``) apaga conversas antigas e devolve as
+contagens delas a ``rollup_chat_dia``. Guardadas também nesta tabela, elas
+sobrevivem a ``flask rollups-backfill``, que recalcula ``rollup_chat_dia``
+a partir de ``conversas_chat`` e soma o arquivado por cima. Em bancos já
+podados, o arquivado é o que o rollup conta a mais que as conversas que
+restaram.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-09-17 10:00:07
+"""
+from alembic import op
+
+import db
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+TABELA = """
+    CREATE TABLE IF NOT EXISTS rollup_chat_arquivado (
+        dia DATE NOT NULL,
+        topico TEXT NOT NULL,
+        total {inteiro} NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, topico)
+    );
+    DELETE FROM rollup_chat_arquivado;
+    INSERT INTO rollup_chat_arquivado (dia, topico, total)
+        SELECT r.dia, r.topico, r.total - COALESCE(c.total, 0)
+        FROM rollup_chat_dia r LEFT JOIN (
+            SELECT {dia_conversa} AS dia, COALESCE(topico, '') AS topico, COUNT(id) AS total
+            FROM conversas_chat WHERE data_conversa IS NOT NULL GROUP BY 1, 2
+        ) c ON c.dia = r.dia AND c.topico = r.topico
+        WHERE r.total > COALESCE(c.total, 0);
+"""
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        db.execute_script(bind, TABELA.format(inteiro="INTEGER", dia_conversa="date(data_conversa)"))
+    else:
+        script = TABELA.format(inteiro="BIGINT", dia_conversa="data_conversa::date")
+        for statement in script.split(";"):
+            if statement.strip():
+                bind.exec_driver_sql(statement)
+
+
+def downgrade():
+    # rollup_chat_dia já inclui o arquivado
+    op.drop_table("rollup_chat_arquivado")
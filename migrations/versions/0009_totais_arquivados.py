@@ -0,0 +1,34 @@
+"""Feedbacks e conversas arquivados por usuário, somados aos totais do dashboard.
+
+A manutenção (``retention.py``) apaga registros antigos e os triggers da
+0003 descontam cada um de ``estatisticas_usuario``. ``feedbacks_arquivados``
+e ``conversas_arquivadas`` guardam o que foi apagado assim, para os totais
+(``queries.get_user_summary``) continuarem contando o histórico inteiro.
+Arquivamentos anteriores a esta revisão não são recontados.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-09-17 10:00:08
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+COLUNAS = ("feedbacks_arquivados", "conversas_arquivadas")
+
+
+def upgrade():
+    existentes = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("estatisticas_usuario")}
+    for coluna in COLUNAS:
+        if coluna not in existentes:
+            op.add_column("estatisticas_usuario",
+                          sa.Column(coluna, sa.BigInteger, nullable=False, server_default="0"))
+
+
+def downgrade():
+    for coluna in COLUNAS:
+        op.drop_column("estatisticas_usuario", coluna)
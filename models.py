@@ -0,0 +1,128 @@
+"""Tabelas do Trilha Futuro em SQLAlchemy Core, comuns a SQLite e PostgreSQL.
+
+O schema em si é criado e alterado pelas migrações Alembic em
+``migrations/``; estas definições são as usadas pela camada de acesso
+(``queries.py``, ``repository.py``, ``stats.py``) para montar as consultas
+no dialeto de cada banco.
+"""
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+)
+from sqlalchemy.dialects import sqlite
+
+metadata = MetaData()
+
+# No SQLite as datas continuam no formato do CURRENT_TIMESTAMP ('YYYY-MM-DD
+# HH:MM:SS'), o mesmo dos registros antigos, para que comparações e
+# ordenações por texto sigam valendo.
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d "
+                       "%(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+usuarios = Table(
+    "usuarios", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("nome", Text, nullable=False),
+    Column("email", Text, nullable=False, unique=True),
+    Column("senha", Text, nullable=False),
+    Column("data_criacao", Timestamp),
+    sqlite_autoincrement=True,
+)
+
+feedbacks = Table(
+    "feedbacks", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("usuario_id", Integer, ForeignKey("usuarios.id", ondelete="CASCADE")),
+    Column("comentario", Text, nullable=False),
+    Column("data_criacao", Timestamp),
+    sqlite_autoincrement=True,
+)
+
+resultados_teste = Table(
+    "resultados_teste", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("usuario_id", Integer, ForeignKey("usuarios.id", ondelete="CASCADE")),
+    Column("pontuacao", Integer),
+    Column("perfil", Text, nullable=False),
+    Column("data_teste", Timestamp),
+    Column("respostas", Text),
+    sqlite_autoincrement=True,
+)
+
+conversas_chat = Table(
+    "conversas_chat", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("usuario_id", Integer, ForeignKey("usuarios.id", ondelete="CASCADE")),
+    Column("pergunta", Text, nullable=False),
+    Column("resposta", Text, nullable=False),
+    Column("data_conversa", Timestamp),
+    Column("topico", Text),
+    sqlite_autoincrement=True,
+)
+
+# --- AGREGADOS MANTIDOS POR TRIGGERS ---
+estatisticas_globais = Table(
+    "estatisticas_globais", metadata,
+    Column("chave", Text, primary_key=True),
+    Column("valor", BigInteger, nullable=False, server_default="0"),
+)
+
+distribuicao_perfis = Table(
+    "distribuicao_perfis", metadata,
+    Column("perfil", Text, primary_key=True),
+    Column("total", BigInteger, nullable=False, server_default="0"),
+)
+
+estatisticas_usuario = Table(
+    "estatisticas_usuario", metadata,
+    Column("usuario_id", Integer, primary_key=True),
+    Column("total_testes", BigInteger, nullable=False, server_default="0"),
+    Column("total_feedbacks", BigInteger, nullable=False, server_default="0"),
+    Column("total_conversas", BigInteger, nullable=False, server_default="0"),
+    # Aumenta a cada mudança nos dados do usuário (ETag da API, migração 0007)
+    Column("versao", BigInteger, nullable=False, server_default="0"),
+    # Apagados pela retenção, ainda contados nos totais (migração 0009)
+    Column("feedbacks_arquivados", BigInteger, nullable=False, server_default="0"),
+    Column("conversas_arquivadas", BigInteger, nullable=False, server_default="0"),
+)
+
+# Rollups diários (dia em UTC); semanas e meses são somados na leitura
+rollup_testes_dia = Table(
+    "rollup_testes_dia", metadata,
+    Column("dia", Date, primary_key=True),
+    Column("perfil", Text, primary_key=True),
+    Column("total", BigInteger, nullable=False, server_default="0"),
+)
+
+rollup_chat_dia = Table(
+    "rollup_chat_dia", metadata,
+    Column("dia", Date, primary_key=True),
+    Column("topico", Text, primary_key=True),
+    Column("total", BigInteger, nullable=False, server_default="0"),
+)
+
+# Conversas apagadas pela retenção (migração 0008), somadas de volta em
+# rollup_chat_dia quando ele é recalculado
+rollup_chat_arquivado = Table(
+    "rollup_chat_arquivado", metadata,
+    Column("dia", Date, primary_key=True),
+    Column("topico", Text, primary_key=True),
+    Column("total", BigInteger, nullable=False, server_default="0"),
+)
+
+# Tabelas que aceitam gravação em lote (write-behind e importações)
+REGISTROS = {
+    t.name: t for t in (usuarios, feedbacks, resultados_teste, conversas_chat)
+}
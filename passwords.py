@@ -0,0 +1,130 @@
+"""Hash de senhas fora da thread da requisição.
+
+``generate_password_hash``/``check_password_hash`` custam centenas de
+milissegundos de CPU. Aqui eles rodam num pool de processos limitado: há um
+teto de operações pendentes por worker e, quando ele é atingido, a chamada
+falha na hora com ``HasherBusy`` em vez de enfileirar logins indefinidamente.
+O método e o custo são configuráveis, e ``needs_rehash`` indica hashes
+gerados com parâmetros antigos para serem refeitos no próximo login.
+``hash_many`` divide um lote (importação de usuários) entre os processos.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+
+# Os workers do gunicorn têm threads (gthread, fila write-behind): um fork
+# copiaria travas seguradas por elas. O pool sobe os processos de um servidor
+# de fork limpo (ou do zero, onde ele não existe).
+MP_CONTEXT = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+              else "spawn")
+
+
+class HasherBusy(RuntimeError):
+    """O pool de hash está saturado; a requisição deve ser recusada."""
+
+
+def normalize_method(method):
+    # Mesmo formato do prefixo que o werkzeug grava no hash
+    partes = method.split(":")
+    if partes[0] == "scrypt":
+        # n, r, p; os que faltarem ficam com o padrão do werkzeug
+        params = partes[1:4] + ["32768", "8", "1"][len(partes[1:4]):]
+        return "scrypt:" + ":".join(params)
+    if partes[0] == "pbkdf2":
+        hash_name = partes[1] if len(partes) > 1 else "sha256"
+        iterations = partes[2] if len(partes) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Método de hash não suportado: {method!r}")
+
+
+class PasswordHasher:
+    def __init__(self, method="scrypt", workers=2, max_pending=8, timeout=10.0):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Pool criado sob demanda em cada processo (seguro após fork)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(MP_CONTEXT))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _submit(self, fn, *args):
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            return self._get_executor().submit(fn, *args)
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy("Muitas operações de senha em andamento")
+        try:
+            future = self._submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A vaga só volta quando o processo termina, mesmo depois do timeout:
+        # o teto vale para o trabalho de fato em andamento no pool
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HasherBusy("Tempo esgotado aguardando o pool de hash")
+
+    def hash(self, senha):
+        return self._run(generate_password_hash, senha, self.method)
+
+    def hash_many(self, senhas):
+        """Hashes de um lote, em blocos distribuídos por todos os processos.
+        Não passa pelo teto de pendentes: use um ``PasswordHasher`` próprio,
+        para não disputar o pool dos logins."""
+        if not self.workers:
+            return [generate_password_hash(senha, self.method) for senha in senhas]
+        # Alguns blocos por processo: menos idas e voltas, carga ainda equilibrada
+        chunksize = max(1, len(senhas) // (self.workers * 4))
+        try:
+            return list(self._get_executor().map(generate_password_hash, senhas, repeat(self.method),
+                                                 chunksize=chunksize))
+        except BrokenProcessPool:
+            # O próximo lote sobe um pool novo
+            with self._lock:
+                self._executor = None
+            raise
+
+    def verify(self, senha_hash, senha):
+        return self._run(check_password_hash, senha_hash, senha)
+
+    def needs_rehash(self, senha_hash):
+        return senha_hash.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
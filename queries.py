@@ -0,0 +1,103 @@
+"""Consultas por usuário usadas pelo dashboard e pela API.
+
+Os totais vêm de ``estatisticas_usuario`` (mantida por triggers) e o
+histórico de testes é paginado por keyset sobre o índice
+``idx_resultados_usuario_data``, então o custo não cresce com o tamanho do
+histórico. As consultas valem para SQLite e PostgreSQL; só a agregação dos
+últimos feedbacks em JSON muda de função conforme o dialeto.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import Text, cast, func, literal, select, text
+
+from models import Timestamp, estatisticas_usuario, feedbacks
+
+HISTORICO_PAGE_SIZE = 20
+
+
+def _json_feedbacks(dialeto, ultimos):
+    if dialeto == "postgresql":
+        agregado = func.json_agg(func.json_build_object(
+            "comentario", ultimos.c.comentario, "data_criacao", ultimos.c.data_criacao))
+        return func.coalesce(cast(agregado, Text), "[]")
+    return func.json_group_array(func.json_object(
+        "comentario", ultimos.c.comentario, "data_criacao", ultimos.c.data_criacao))
+
+
+def _parse_data(valor):
+    # SQLite devolve 'YYYY-MM-DD HH:MM:SS' e o PostgreSQL o formato ISO com 'T'
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def get_user_summary(conn, usuario_id):
+    """Totais do usuário e os três últimos feedbacks numa única consulta."""
+    ultimos = (
+        select(feedbacks.c.comentario, feedbacks.c.data_criacao)
+        .where(feedbacks.c.usuario_id == usuario_id)
+        .order_by(feedbacks.c.data_criacao.desc(), feedbacks.c.id.desc())
+        .limit(3)
+        .subquery()
+    )
+    u = select(literal(usuario_id).label("usuario_id")).subquery("u")
+    s = estatisticas_usuario
+    row = conn.execute(
+        select(
+            func.coalesce(s.c.total_testes, 0).label("total_testes"),
+            # Registros já arquivados pela retenção continuam nos totais
+            func.coalesce(s.c.total_feedbacks + s.c.feedbacks_arquivados, 0).label("total_feedbacks"),
+            func.coalesce(s.c.total_conversas + s.c.conversas_arquivadas, 0).label("total_conversas"),
+            select(_json_feedbacks(conn.dialect.name, ultimos))
+            .scalar_subquery().label("ultimos_feedbacks"),
+        )
+        .select_from(u.outerjoin(s, s.c.usuario_id == u.c.usuario_id))
+    ).one()
+    return {
+        "total_testes": row.total_testes,
+        "total_feedbacks": row.total_feedbacks,
+        "total_conversas": row.total_conversas,
+        "ultimos_feedbacks": [
+            {"comentario": f["comentario"], "data_criacao": _parse_data(f["data_criacao"])}
+            for f in json.loads(row.ultimos_feedbacks)
+        ],
+    }
+
+
+def get_user_version(conn, usuario_id):
+    """Versão dos dados do usuário (``0`` se ele ainda não gravou nada)."""
+    versao = conn.execute(
+        select(estatisticas_usuario.c.versao).where(estatisticas_usuario.c.usuario_id == usuario_id)
+    ).scalar()
+    return versao or 0
+
+
+# Row values funcionam igual no SQLite (>= 3.15) e no PostgreSQL
+_HISTORICO = text("""
+    SELECT id, perfil, data_teste FROM resultados_teste
+    WHERE usuario_id = :usuario_id
+    ORDER BY data_teste DESC, id DESC LIMIT :limite
+""").columns(data_teste=Timestamp)
+
+_HISTORICO_ANTES = text("""
+    SELECT id, perfil, data_teste FROM resultados_teste
+    WHERE usuario_id = :usuario_id
+      AND (data_teste, id) < (SELECT data_teste, id FROM resultados_teste
+                              WHERE id = :antes AND usuario_id = :usuario_id)
+    ORDER BY data_teste DESC, id DESC LIMIT :limite
+""").columns(data_teste=Timestamp)
+
+
+def get_test_history(conn, usuario_id, antes=None, limite=HISTORICO_PAGE_SIZE):
+    """Uma página do histórico de testes, do mais recente para o mais antigo.
+
+    ``antes`` é o id do último resultado da página anterior. Retorna
+    ``(resultados, proximo_cursor)``; o cursor é ``None`` na última página.
+    """
+    params = {"usuario_id": usuario_id, "limite": limite + 1}
+    if antes is None:
+        rows = conn.execute(_HISTORICO, params).mappings().all()
+    else:
+        rows = conn.execute(_HISTORICO_ANTES, {**params, "antes": antes}).mappings().all()
+
+    proximo = rows[limite - 1]["id"] if len(rows) > limite else None
+    return rows[:limite], proximo
@@ -0,0 +1,176 @@
+"""Armazenamento do rate limiting compartilhado entre os workers do gunicorn.
+
+Com ``memory://`` cada worker tem os próprios contadores, e os limites de
+``/login``, ``/register`` e ``/chat`` acabam multiplicados pelo número de
+workers. Esta storage guarda os contadores num arquivo SQLite local (de
+preferência em ``/dev/shm``), sem serviço externo: cada verificação é um
+único ``INSERT ... ON CONFLICT ... RETURNING`` atômico, e chaves expiradas
+são removidas periodicamente em lotes pequenos.
+
+Registrada no ``limits`` pelo esquema ``sqlite://`` ao importar o módulo:
+``sqlite:///relativo.db`` ou ``sqlite:////caminho/absoluto.db``.
+"""
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+
+def default_storage_uri():
+    pasta = "/dev/shm" if os.path.isdir("/dev/shm") else os.path.abspath(".")
+    return f"sqlite:///{os.path.join(pasta, 'trilhafuturo_ratelimit.db')}"
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, compaction_interval=60.0,
+                 compaction_batch=1000, **options):
+        self.path = uri[len("sqlite:///"):] if uri else default_storage_uri()[len("sqlite:///"):]
+        self.compaction_interval = compaction_interval
+        self.compaction_batch = compaction_batch
+        self._local = threading.local()
+        self._next_compaction = 0.0
+        self._compaction_lock = threading.Lock()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._create_schema()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self):
+        # Uma conexão por thread e por processo (seguro após fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Contadores de rate limit não precisam sobreviver a uma queda do SO
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS limites (
+                chave TEXT PRIMARY KEY,
+                contador INTEGER NOT NULL,
+                expira_em REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_limites_expira ON limites(expira_em)")
+
+    def _maybe_compact(self, now):
+        if now < self._next_compaction or not self._compaction_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_compaction = now + self.compaction_interval
+            self.compact(now)
+        finally:
+            self._compaction_lock.release()
+
+    def compact(self, now=None):
+        """Remove chaves expiradas em lotes, sem segurar o lock de escrita."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        removidas = 0
+        while True:
+            cursor = conn.execute("""
+                DELETE FROM limites WHERE chave IN (
+                    SELECT chave FROM limites WHERE expira_em <= ? LIMIT ?
+                )
+            """, (now, self.compaction_batch))
+            removidas += cursor.rowcount
+            if cursor.rowcount < self.compaction_batch:
+                return removidas
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        self._maybe_compact(now)
+        row = self._conn().execute("""
+            INSERT INTO limites (chave, contador, expira_em) VALUES (:chave, :qtd, :expira)
+            ON CONFLICT(chave) DO UPDATE SET
+                contador = CASE WHEN expira_em <= :agora THEN :qtd ELSE contador + :qtd END,
+                expira_em = CASE WHEN expira_em <= :agora THEN :expira ELSE expira_em END
+            RETURNING contador
+        """, {"chave": key, "qtd": amount, "expira": now + expiry, "agora": now}).fetchone()
+        return row[0]
+
+    def decr(self, key, amount=1):
+        row = self._conn().execute("""
+            UPDATE limites SET contador = MAX(contador - ?, 0)
+            WHERE chave = ? AND expira_em > ? RETURNING contador
+        """, (amount, key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT contador FROM limites WHERE chave = ? AND expira_em > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._conn().execute(
+            "SELECT expira_em FROM limites WHERE chave = ? AND expira_em > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._conn().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conn().execute("DELETE FROM limites").rowcount
+
+    def clear(self, key):
+        self._conn().execute("DELETE FROM limites WHERE chave = ?", (key,))
+
+    # --- Janela deslizante (mesma lógica da MemoryStorage do limits) ---
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, previous_ttl, current_count, _ = self._sliding_window_info(
+            previous_key, current_key, expiry, now
+        )
+        if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+            return False
+        current_count = self.incr(current_key, 2 * expiry, amount=amount)
+        if floor(previous_count * previous_ttl / expiry + current_count) > limit:
+            # Outro worker ganhou a corrida: desfaz o incremento
+            self.decr(current_key, amount)
+            return False
+        return True
+
+    def _sliding_window_info(self, previous_key, current_key, expiry, now):
+        previous_count = self.get(previous_key)
+        current_count = self.get(current_key)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window_info(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
@@ -0,0 +1,131 @@
+"""Gravações e leituras de usuários e registros, independentes do banco.
+
+Todas as funções recebem uma ``Connection`` do SQLAlchemy (``db.get_db()``
+nas rotas, ``db.connect()`` fora delas) e não fazem commit: quem chamou
+decide o limite da transação.
+"""
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import REGISTROS, conversas_chat, estatisticas_usuario, resultados_teste, usuarios
+
+
+def create_user(conn, nome, email, senha_hash):
+    """Insere o usuário; e-mail repetido levanta ``sqlalchemy.exc.IntegrityError``."""
+    return conn.execute(
+        usuarios.insert().values(nome=nome, email=email, senha=senha_hash)
+    ).inserted_primary_key[0]
+
+
+def create_users(conn, registros):
+    """Insere vários usuários num único comando; e-mails já cadastrados são
+    ignorados (sem erro). Retorna ``{email: id}`` dos que foram inseridos."""
+    if not registros:
+        return {}
+    dialeto = postgresql if conn.dialect.name == "postgresql" else sqlite
+    stmt = (
+        dialeto.insert(usuarios)
+        .on_conflict_do_nothing(index_elements=[usuarios.c.email])
+        .returning(usuarios.c.id, usuarios.c.email)
+    )
+    return {row.email: row.id for row in conn.execute(stmt, registros)}
+
+
+def existing_emails(conn, emails):
+    """``{email: id}`` dos ``emails`` que já estão cadastrados."""
+    return {row.email: row.id for row in conn.execute(
+        select(usuarios.c.email, usuarios.c.id).where(usuarios.c.email.in_(list(emails)))
+    )}
+
+
+def get_user_by_email(conn, email):
+    return conn.execute(
+        select(usuarios).where(usuarios.c.email == email)
+    ).mappings().first()
+
+
+def update_password_hash(conn, usuario_id, senha_antiga, senha_nova):
+    # Só troca se ninguém trocou antes (dois logins simultâneos)
+    return conn.execute(
+        update(usuarios)
+        .where(usuarios.c.id == usuario_id, usuarios.c.senha == senha_antiga)
+        .values(senha=senha_nova)
+    ).rowcount
+
+
+def insert_rows(conn, tabela, registros):
+    """INSERT em lote de uma lista de dicts na tabela ``tabela``.
+
+    Vira um ``executemany`` no SQLite e INSERTs de várias linhas por comando
+    no PostgreSQL (insertmanyvalues do SQLAlchemy).
+    """
+    if registros:
+        conn.execute(REGISTROS[tabela].insert(), registros)
+    return len(registros)
+
+
+def iter_scored_results(conn, chunk_size):
+    """Resultados com respostas salvas, em blocos por keyset no id."""
+    ultimo_id = 0
+    while True:
+        rows = conn.execute(
+            select(resultados_teste.c.id, resultados_teste.c.perfil,
+                   resultados_teste.c.pontuacao, resultados_teste.c.respostas)
+            .where(resultados_teste.c.id > ultimo_id,
+                   resultados_teste.c.respostas.is_not(None))
+            .order_by(resultados_teste.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        ultimo_id = rows[-1].id
+        yield rows
+
+
+def update_scores(conn, alterados):
+    """Grava ``(perfil, pontuacao, id)`` num único executemany."""
+    conn.execute(
+        update(resultados_teste)
+        .where(resultados_teste.c.id == bindparam("b_id"))
+        .values(perfil=bindparam("b_perfil"), pontuacao=bindparam("b_pontuacao")),
+        [{"b_perfil": p, "b_pontuacao": s, "b_id": i} for p, s, i in alterados],
+    )
+
+
+def iter_unclassified_chats(conn, chunk_size):
+    """Conversas ainda sem tópico (anteriores à coluna), em blocos por keyset no id."""
+    ultimo_id = 0
+    while True:
+        rows = conn.execute(
+            select(conversas_chat.c.id, conversas_chat.c.pergunta)
+            .where(conversas_chat.c.id > ultimo_id, conversas_chat.c.topico.is_(None))
+            .order_by(conversas_chat.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        ultimo_id = rows[-1].id
+        yield rows
+
+
+def update_chat_topics(conn, topicos):
+    """Grava ``(topico, id)`` num único executemany."""
+    conn.execute(
+        update(conversas_chat)
+        .where(conversas_chat.c.id == bindparam("b_id"))
+        .values(topico=bindparam("b_topico")),
+        [{"b_topico": t, "b_id": i} for t, i in topicos],
+    )
+
+
+def add_archived_totals(conn, coluna, contagens):
+    """Soma ``[(usuario_id, total)]`` à coluna ``coluna`` (``feedbacks_arquivados``
+    ou ``conversas_arquivadas``) de ``estatisticas_usuario``."""
+    if not contagens:
+        return
+    conn.execute(
+        update(estatisticas_usuario)
+        .where(estatisticas_usuario.c.usuario_id == bindparam("b_usuario_id"))
+        .values({coluna: estatisticas_usuario.c[coluna] + bindparam("b_total")}),
+        [{"b_usuario_id": u, "b_total": n} for u, n in contagens],
+    )
@@ -0,0 +1,281 @@
+"""Retenção, arquivamento e compactação de ``conversas_chat`` e ``feedbacks``.
+
+``run`` (usado por ``flask maintenance``) faz, para cada tabela com prazo de
+retenção:
+
+1. Arquiva os registros mais antigos que o prazo em arquivos por mês,
+   ``<pasta>/<tabela>/<AAAA-MM>/<tabela>-<AAAA-MM>-<primeiro id>-<último id>``,
+   em Parquet (compressão zstd) ou NDJSON com gzip. Cada arquivo é escrito
+   com outro nome e renomeado só quando completo. Registros sem data
+   (feedbacks anteriores à coluna ``data_criacao``) contam como antigos e
+   vão para ``<pasta>/<tabela>/sem-data/``. Se a execução falhar antes de
+   apagar, a próxima regrava o mesmo arquivo; se falhar no meio da
+   exclusão, os registros restantes vão também para um arquivo novo (os
+   ids repetidos identificam as cópias).
+2. Apaga do banco exatamente os registros arquivados (até o maior id lido no
+   início), em lotes pequenos com commit a cada lote, para nenhuma
+   transação segurar a trava de escrita do SQLite por muito tempo. As
+   conversas apagadas são devolvidas a ``rollup_chat_dia`` (e guardadas em
+   ``rollup_chat_arquivado``, que o backfill dos rollups preserva) para os
+   gráficos de tendência não perderem o histórico, e os apagados de cada
+   usuário somados a ``estatisticas_usuario`` (``*_arquivados``), para os
+   totais do dashboard também não.
+3. Compacta o banco. No SQLite com ``auto_vacuum=INCREMENTAL`` usa
+   ``incremental_vacuum`` em passos, depois ``PRAGMA optimize`` e um
+   checkpoint do WAL. A conversão para o modo incremental exige um VACUUM
+   completo, feito uma única vez com ``vacuum_completo=True``. No
+   PostgreSQL roda ``VACUUM (ANALYZE)`` nas tabelas.
+"""
+import fcntl
+import gzip
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, or_, select, text
+
+import export
+import repository
+import rollups
+from models import conversas_chat, feedbacks
+
+TABELAS = {
+    "conversas_chat": (conversas_chat, "data_conversa"),
+    "feedbacks": (feedbacks, "data_criacao"),
+}
+
+# Coluna de estatisticas_usuario que guarda os apagados de cada tabela
+TOTAIS_ARQUIVADOS = {
+    "conversas_chat": "conversas_arquivadas",
+    "feedbacks": "feedbacks_arquivados",
+}
+
+# Pasta (no lugar do mês) dos registros sem data
+SEM_DATA = "sem-data"
+
+# formato -> extensão
+FORMATOS = {"parquet": ".parquet", "ndjson": ".ndjson.gz"}
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 5000
+# Páginas liberadas por passo do incremental_vacuum
+VACUUM_PASSO = 2000
+
+
+class RetentionError(ValueError):
+    """Parâmetros de retenção inválidos."""
+
+
+# --- ARQUIVAMENTO ---
+class _Arquivo:
+    """Um arquivo mensal em escrita, com nome final definido ao fechar."""
+
+    def __init__(self, pasta, tabela, mes, formato, table):
+        self.pasta = os.path.join(pasta, tabela, mes)
+        self.prefixo = f"{tabela}-{mes}"
+        self.extensao = FORMATOS[formato]
+        self.colunas = table.columns.keys()
+        self.primeiro = None
+        self.ultimo = None
+        self.linhas = 0
+        os.makedirs(self.pasta, exist_ok=True)
+        self.temporario = os.path.join(self.pasta, f".{self.prefixo}-{os.getpid()}.parcial")
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+
+            self.schema = export.parquet_schema(table)
+            self._parquet = pq.ParquetWriter(self.temporario, self.schema, compression="zstd")
+            self._ndjson = None
+        else:
+            self._parquet = None
+            self._ndjson = gzip.open(self.temporario, "wt", encoding="utf-8")
+
+    def write(self, rows):
+        if self._parquet is not None:
+            self._parquet.write_table(export.parquet_table(self.schema, rows))
+        else:
+            for row in rows:
+                self._ndjson.write(json.dumps(dict(zip(self.colunas, row)), ensure_ascii=False,
+                                              default=datetime.isoformat) + "\n")
+        if self.primeiro is None:
+            self.primeiro = rows[0].id
+        self.ultimo = rows[-1].id
+        self.linhas += len(rows)
+
+    def close(self):
+        (self._parquet or self._ndjson).close()
+        with open(self.temporario, "rb") as f:
+            os.fsync(f.fileno())
+        destino = os.path.join(self.pasta, f"{self.prefixo}-{self.primeiro}-{self.ultimo}{self.extensao}")
+        os.replace(self.temporario, destino)
+        return destino
+
+    def abort(self):
+        try:
+            (self._parquet or self._ndjson).close()
+        finally:
+            if os.path.exists(self.temporario):
+                os.remove(self.temporario)
+
+
+def _antigos(table, coluna, corte, ate_id):
+    return (table.c.id <= ate_id, or_(table.c[coluna].is_(None), table.c[coluna] < corte))
+
+
+def _mes(data):
+    return data.strftime("%Y-%m") if data is not None else SEM_DATA
+
+
+def archive(conn, tabela, corte, ate_id, pasta, formato="parquet", chunk_size=CHUNK_SIZE):
+    """Grava os registros anteriores a ``corte`` (com ``id <= ate_id``) em
+    arquivos mensais. Retorna ``[(caminho, linhas)]``."""
+    table, coluna = TABELAS[tabela]
+    query = select(table).where(*_antigos(table, coluna, corte, ate_id)).order_by(table.c.id)
+    arquivos = {}
+    try:
+        # yield_per na consulta, não na conexão (que segue para os DELETEs)
+        result = conn.execute(query.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            por_mes = defaultdict(list)
+            for row in rows:
+                por_mes[_mes(getattr(row, coluna))].append(row)
+            for mes, linhas in por_mes.items():
+                if mes not in arquivos:
+                    arquivos[mes] = _Arquivo(pasta, tabela, mes, formato, table)
+                arquivos[mes].write(linhas)
+    except BaseException:
+        for arquivo in arquivos.values():
+            arquivo.abort()
+        raise
+    return [(arquivo.close(), arquivo.linhas) for _, arquivo in sorted(arquivos.items())]
+
+
+def purge(conn, tabela, corte, ate_id, batch_size=BATCH_SIZE, pausa=0.0):
+    """Apaga os mesmos registros de ``archive`` em lotes, com commit a cada
+    lote. Retorna quantos foram apagados."""
+    table, coluna = TABELAS[tabela]
+    total = 0
+    while True:
+        ids = conn.execute(
+            select(table.c.id).where(*_antigos(table, coluna, corte, ate_id))
+            .order_by(table.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return total
+        contagens = rollups.chat_counts(conn, ids) if table is conversas_chat else None
+        por_usuario = conn.execute(
+            select(table.c.usuario_id, func.count())
+            .where(table.c.id.in_(ids), table.c.usuario_id.is_not(None))
+            .group_by(table.c.usuario_id)
+        ).all()
+        total += conn.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+        # Os triggers tiram as conversas do rollup e os registros dos totais do
+        # usuário; eles continuam nos gráficos e no dashboard
+        rollups.add_chat_counts(conn, contagens)
+        repository.add_archived_totals(conn, TOTAIS_ARQUIVADOS[tabela], por_usuario)
+        conn.commit()
+        if pausa:
+            time.sleep(pausa)
+
+
+# --- COMPACTAÇÃO ---
+def database_size(conn):
+    """``(bytes ocupados pelo banco, bytes livres reaproveitáveis)``."""
+    if conn.dialect.name == "sqlite":
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        paginas = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        livres = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        return paginas * page_size, livres * page_size
+    return conn.execute(text("SELECT pg_database_size(current_database())")).scalar(), None
+
+
+def compact(engine, vacuum_completo=False, passo=VACUUM_PASSO, echo=print):
+    """Devolve espaço ao sistema e atualiza as estatísticas do planejador.
+
+    Retorna ``{"antes", "depois", "livres_antes", "livres_depois", "modo"}``.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        antes, livres_antes = database_size(conn)
+        if conn.dialect.name == "sqlite":
+            auto_vacuum = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+            if vacuum_completo and auto_vacuum != 2:
+                # Uma vez só: converte o arquivo para o modo incremental
+                conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.exec_driver_sql("VACUUM")
+                modo = "vacuum"
+            elif auto_vacuum == 2:
+                # Passos curtos: cada um segura a trava de escrita só um instante
+                livres = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                while livres:
+                    conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(passo)})")
+                    restantes = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                    if restantes >= livres:
+                        break
+                    livres = restantes
+                modo = "incremental"
+            else:
+                modo = "nenhum"
+                echo("Aviso: auto_vacuum não é INCREMENTAL; o espaço livre fica para "
+                     "novas gravações (use --vacuum-completo uma vez para converter).")
+            conn.exec_driver_sql("PRAGMA optimize")
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        else:
+            for tabela in TABELAS:
+                conn.exec_driver_sql(f"VACUUM (ANALYZE) {tabela}")
+            modo = "vacuum-analyze"
+        depois, livres_depois = database_size(conn)
+    return {"antes": antes, "depois": depois, "livres_antes": livres_antes,
+            "livres_depois": livres_depois, "modo": modo}
+
+
+# --- EXECUÇÃO ---
+@contextmanager
+def exclusive(pasta):
+    """Impede duas manutenções simultâneas sobre a mesma pasta de arquivos."""
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, ".lock"), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RetentionError(f"Outra manutenção já está em execução em {pasta}")
+        yield
+
+
+def run(database, pasta, retencao, formato="parquet", batch_size=BATCH_SIZE, pausa=0.0,
+        vacuum_completo=False, agora=None, echo=print):
+    """Arquiva e apaga o que passou de ``retencao = {tabela: dias}`` (``0`` =
+    mantém tudo) e compacta o banco. Retorna o relatório por tabela e o da
+    compactação."""
+    if formato not in FORMATOS:
+        raise RetentionError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS)})")
+    desconhecidas = set(retencao) - set(TABELAS)
+    if desconhecidas:
+        raise RetentionError(f"Tabelas sem retenção: {', '.join(sorted(desconhecidas))}")
+    if batch_size < 1:
+        raise RetentionError("batch_size deve ser positivo")
+
+    agora = agora or datetime.utcnow()
+    relatorio = {}
+    for tabela, dias in retencao.items():
+        if not dias:
+            continue
+        table, _ = TABELAS[tabela]
+        corte = agora.replace(microsecond=0) - timedelta(days=dias)
+        with database.connect() as conn:
+            ate_id = conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar_one()
+            arquivos = archive(conn, tabela, corte, ate_id, pasta, formato=formato)
+            conn.rollback()
+            arquivados = sum(linhas for _, linhas in arquivos)
+            for caminho, linhas in arquivos:
+                echo(f"{tabela}: {linhas} registros em {caminho}")
+            apagados = purge(conn, tabela, corte, ate_id, batch_size=batch_size, pausa=pausa)
+        if apagados != arquivados:
+            # Registros apagados por outra via entre as duas etapas
+            echo(f"Aviso: {tabela}: {arquivados} arquivados, {apagados} apagados")
+        echo(f"{tabela}: {apagados} registros anteriores a {corte:%Y-%m-%d} removidos")
+        relatorio[tabela] = {"corte": corte.isoformat(), "arquivados": arquivados,
+                             "apagados": apagados, "arquivos": [c for c, _ in arquivos]}
+    return relatorio, compact(database.engine, vacuum_completo=vacuum_completo, echo=echo)
@@ -0,0 +1,253 @@
+"""Séries temporais dos gráficos de tendência, lidas só dos rollups diários.
+
+``rollup_testes_dia`` (dia, perfil) e ``rollup_chat_dia`` (dia, tópico) são
+mantidos por triggers a cada gravação (ver
+``migrations/versions/0005_rollups_diarios.py``). Uma consulta percorre a
+chave primária só no intervalo pedido e as semanas (começando na segunda)
+e os meses são somados aqui a partir dos dias, então o custo depende do
+tamanho do período e não do número de registros. Baldes sem dados aparecem
+com zero, para o eixo do gráfico ser contínuo.
+
+``rebuild`` recalcula os rollups a partir dos registros e
+``classify_chats`` preenche o tópico das conversas antigas; ambos são
+usados por ``flask rollups-backfill``. ``chat_counts``/``add_chat_counts``
+deixam a manutenção (``retention.py``) apagar conversas arquivadas sem
+tirá-las dos gráficos: as contagens vão para ``rollup_chat_dia`` e também
+para ``rollup_chat_arquivado``, que ``rebuild`` soma de volta.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import Date, cast, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+import repository
+from models import (
+    conversas_chat,
+    resultados_teste,
+    rollup_chat_arquivado,
+    rollup_chat_dia,
+    rollup_testes_dia,
+)
+
+GRANULARIDADES = ("dia", "semana", "mes")
+
+# Quantos baldes mostrar quando o início não é informado
+BALDES_PADRAO = {"dia": 30, "semana": 12, "mes": 12}
+MAX_BALDES = 400
+
+# Conversas respondidas pelo fallback ficam com topico = '' no banco
+SEM_TOPICO = ""
+ROTULO_SEM_TOPICO = "sem_topico"
+
+
+class RollupError(ValueError):
+    """Período ou granularidade inválidos."""
+
+
+# --- BALDES ---
+def inicio_do_balde(dia, granularidade):
+    if granularidade == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == "mes":
+        return dia.replace(day=1)
+    return dia
+
+
+def _somar_baldes(balde, granularidade, n):
+    if granularidade == "dia":
+        return balde + timedelta(days=n)
+    if granularidade == "semana":
+        return balde + timedelta(weeks=n)
+    meses = balde.year * 12 + balde.month - 1 + n
+    return date(meses // 12, meses % 12 + 1, 1)
+
+
+def baldes(inicio, fim, granularidade):
+    """Início de cada balde entre ``inicio`` e ``fim`` (inclusive)."""
+    resultado = []
+    balde = inicio_do_balde(inicio, granularidade)
+    while balde <= fim:
+        resultado.append(balde)
+        balde = _somar_baldes(balde, granularidade, 1)
+    return resultado
+
+
+def _parse_dia(valor, nome):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise RollupError(f"Data inválida em '{nome}': {valor!r} (use AAAA-MM-DD)")
+
+
+def parse_periodo(granularidade="dia", inicio=None, fim=None, hoje=None):
+    """Valida os parâmetros e retorna ``(granularidade, inicio, fim)`` como datas.
+
+    Sem ``fim`` usa hoje (UTC); sem ``inicio``, os últimos ``BALDES_PADRAO``
+    baldes. O início é alinhado ao começo do seu balde.
+    """
+    if granularidade not in GRANULARIDADES:
+        raise RollupError(f"Granularidade desconhecida: {granularidade!r} "
+                          f"(use {', '.join(GRANULARIDADES)})")
+    fim = _parse_dia(fim, "fim") if fim else (hoje or datetime.utcnow().date())
+    if inicio:
+        inicio = inicio_do_balde(_parse_dia(inicio, "inicio"), granularidade)
+    else:
+        inicio = _somar_baldes(inicio_do_balde(fim, granularidade), granularidade,
+                               1 - BALDES_PADRAO[granularidade])
+    if inicio > fim:
+        raise RollupError("'inicio' deve ser anterior a 'fim'")
+    if len(baldes(inicio, fim, granularidade)) > MAX_BALDES:
+        raise RollupError(f"Período longo demais: no máximo {MAX_BALDES} baldes "
+                          f"por consulta (use uma granularidade maior)")
+    return granularidade, inicio, fim
+
+
+# --- CONSULTAS ---
+def _series(conn, tabela, coluna, granularidade, inicio, fim):
+    rows = conn.execute(
+        select(tabela.c.dia, tabela.c[coluna], tabela.c.total)
+        .where(tabela.c.dia.between(inicio, fim))
+    )
+    labels = baldes(inicio, fim, granularidade)
+    posicao = {balde: i for i, balde in enumerate(labels)}
+    series = defaultdict(lambda: [0] * len(labels))
+    for dia, chave, total in rows:
+        if total:
+            series[chave][posicao[inicio_do_balde(dia, granularidade)]] += total
+    return labels, dict(sorted(series.items()))
+
+
+def _payload(granularidade, inicio, fim, labels, **dados):
+    return {
+        "granularidade": granularidade,
+        "inicio": inicio.isoformat(),
+        "fim": fim.isoformat(),
+        "labels": [balde.isoformat() for balde in labels],
+        **dados,
+    }
+
+
+def profile_trend(conn, granularidade, inicio, fim):
+    """Testes por perfil em cada balde: ``series = {perfil: [totais]}``."""
+    labels, series = _series(conn, rollup_testes_dia, "perfil", granularidade, inicio, fim)
+    return _payload(granularidade, inicio, fim, labels, series=series)
+
+
+def test_volume(conn, granularidade, inicio, fim):
+    """Total de testes em cada balde: ``values = [totais]``."""
+    labels, series = _series(conn, rollup_testes_dia, "perfil", granularidade, inicio, fim)
+    values = [sum(totais) for totais in zip(*series.values())] or [0] * len(labels)
+    return _payload(granularidade, inicio, fim, labels, values=values)
+
+
+def chat_topics(conn, granularidade, inicio, fim):
+    """Conversas por tópico em cada balde: ``series = {topico: [totais]}``."""
+    labels, series = _series(conn, rollup_chat_dia, "topico", granularidade, inicio, fim)
+    if SEM_TOPICO in series:
+        series[ROTULO_SEM_TOPICO] = series.pop(SEM_TOPICO)
+    return _payload(granularidade, inicio, fim, labels, series=series)
+
+
+# --- BACKFILL ---
+def _dia(conn, coluna):
+    # date() do SQLite devolve 'AAAA-MM-DD', o mesmo formato gravado pelos triggers
+    if conn.dialect.name == "sqlite":
+        return func.date(coluna)
+    return cast(coluna, Date)
+
+
+def rebuild(conn, desde=None, ate=None):
+    """Recalcula os rollups a partir dos registros, no período ``[desde, ate]``
+    (datas; ``None`` = sem limite). Não faz commit.
+
+    Gravações concorrentes ficam bloqueadas até o commit: no SQLite pela
+    trava de escrita, no PostgreSQL por um LOCK em modo SHARE.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("LOCK TABLE resultados_teste, conversas_chat IN SHARE MODE")
+
+    origens = (
+        (rollup_testes_dia, "perfil", resultados_teste.c.data_teste, resultados_teste.c.perfil),
+        (rollup_chat_dia, "topico", conversas_chat.c.data_conversa,
+         func.coalesce(conversas_chat.c.topico, SEM_TOPICO)),
+    )
+    linhas = {}
+    for rollup, coluna, data, chave in origens:
+        periodo = []
+        filtros = [data.is_not(None), chave.is_not(None)]
+        if desde is not None:
+            periodo.append(rollup.c.dia >= desde)
+            filtros.append(data >= datetime.combine(desde, time()))
+        if ate is not None:
+            periodo.append(rollup.c.dia <= ate)
+            filtros.append(data < datetime.combine(ate + timedelta(days=1), time()))
+
+        conn.execute(rollup.delete().where(*periodo))
+        dia = _dia(conn, data)
+        result = conn.execute(rollup.insert().from_select(
+            [rollup.c.dia, rollup.c[coluna], rollup.c.total],
+            select(dia, chave, func.count()).where(*filtros).group_by(dia, chave),
+        ))
+        linhas[rollup.name] = result.rowcount
+
+    # Conversas já apagadas pela retenção não estão mais em conversas_chat
+    periodo = []
+    if desde is not None:
+        periodo.append(rollup_chat_arquivado.c.dia >= desde)
+    if ate is not None:
+        periodo.append(rollup_chat_arquivado.c.dia <= ate)
+    arquivadas = conn.execute(
+        select(rollup_chat_arquivado.c.dia, rollup_chat_arquivado.c.topico,
+               rollup_chat_arquivado.c.total).where(*periodo)
+    ).all()
+    _somar(conn, rollup_chat_dia, arquivadas)
+    return linhas
+
+
+def classify_chats(conn, classify, chunk_size=5000):
+    """Preenche o tópico das conversas sem tópico com ``classify(pergunta)``.
+
+    Faz commit a cada bloco; os triggers movem cada conversa do balde
+    ``''`` para o do seu tópico. Retorna quantas conversas foram classificadas.
+    """
+    total = 0
+    for rows in repository.iter_unclassified_chats(conn, chunk_size):
+        repository.update_chat_topics(
+            conn, [(classify(row.pergunta) or SEM_TOPICO, row.id) for row in rows])
+        conn.commit()
+        total += len(rows)
+    return total
+
+
+# --- CONVERSAS ARQUIVADAS ---
+def chat_counts(conn, ids):
+    """``[(dia, topico, total)]`` das conversas ``ids``, como no rollup."""
+    dia = _dia(conn, conversas_chat.c.data_conversa)
+    topico = func.coalesce(conversas_chat.c.topico, SEM_TOPICO)
+    rows = conn.execute(
+        select(dia, topico, func.count())
+        .where(conversas_chat.c.id.in_(ids), conversas_chat.c.data_conversa.is_not(None))
+        .group_by(dia, topico)
+    )
+    return [(date.fromisoformat(d) if isinstance(d, str) else d, t, n) for d, t, n in rows]
+
+
+def _somar(conn, rollup, contagens):
+    if not contagens:
+        return
+    insert = (sqlite if conn.dialect.name == "sqlite" else postgresql).insert(rollup)
+    conn.execute(
+        insert.on_conflict_do_update(
+            index_elements=[rollup.c.dia, rollup.c.topico],
+            set_={"total": rollup.c.total + insert.excluded.total},
+        ),
+        [{"dia": d, "topico": t, "total": n} for d, t, n in contagens],
+    )
+
+
+def add_chat_counts(conn, contagens):
+    """Soma ``contagens`` em ``rollup_chat_dia`` (devolve o que um DELETE tirou)
+    e em ``rollup_chat_arquivado``, que ``rebuild`` preserva."""
+    _somar(conn, rollup_chat_dia, contagens)
+    _somar(conn, rollup_chat_arquivado, contagens)
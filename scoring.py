@@ -0,0 +1,140 @@
+"""Pontuação do teste vocacional.
+
+Os pesos são uma matriz declarativa ``resposta x área`` carregada uma vez;
+pontuar uma folha de respostas é o produto do vetor de contagens de cada
+resposta por essa matriz. ``Scorer.score_counts`` faz o mesmo para milhões
+de folhas de uma vez (uma linha por folha), o que permite recalcular o
+histórico de ``resultados_teste`` ou simular novos pesos sem passar por HTTP.
+
+O numpy só é importado na primeira pontuação (ou em ``create_app`` com
+``--preload``, para ficar na memória compartilhada pelos workers).
+"""
+import json
+
+import repository
+
+# Em caso de empate vence a área que aparece primeiro
+AREAS = ("exatas", "biologicas", "humanas")
+
+PESOS_PADRAO = {
+    "criativo":   {"humanas": 2, "biologicas": 1},
+    "analitico":  {"exatas": 2, "biologicas": 1},
+    "social":     {"humanas": 2, "biologicas": 1},
+    "organizado": {"exatas": 1, "humanas": 1},
+}
+
+
+class Scorer:
+    def __init__(self, pesos=PESOS_PADRAO, areas=AREAS):
+        self.areas = tuple(areas)
+        self.respostas = tuple(pesos)
+        self._resposta_idx = {r: i for i, r in enumerate(self.respostas)}
+        area_idx = {a: j for j, a in enumerate(self.areas)}
+        # (linha, coluna, peso) de cada célula não nula da matriz
+        self._celulas = []
+        for i, resposta in enumerate(self.respostas):
+            for area, peso in pesos[resposta].items():
+                if area not in area_idx:
+                    raise ValueError(f"Área desconhecida nos pesos: {area!r}")
+                self._celulas.append((i, area_idx[area], peso))
+        self._matrix = None
+
+    @property
+    def matrix(self):
+        """Matriz ``resposta x área`` dos pesos, montada no primeiro uso."""
+        if self._matrix is None:
+            self.warm()
+        return self._matrix
+
+    def warm(self):
+        """Monta a matriz (e importa o numpy) agora, se ainda não foi montada:
+        no mestre do gunicorn, antes do fork."""
+        if self._matrix is None:
+            import numpy as np
+
+            matrix = np.zeros((len(self.respostas), len(self.areas)), dtype=np.int64)
+            for i, j, peso in self._celulas:
+                matrix[i, j] = peso
+            self._matrix = matrix
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["pesos"], data.get("areas", AREAS))
+
+    def count(self, respostas):
+        """Vetor de contagens de cada resposta conhecida numa folha."""
+        import numpy as np
+
+        idx = [self._resposta_idx[r] for r in respostas if r in self._resposta_idx]
+        return np.bincount(idx, minlength=len(self.respostas))
+
+    def counts_to_dict(self, counts):
+        return {r: int(n) for r, n in zip(self.respostas, counts) if n}
+
+    def counts_from_dict(self, contagens):
+        import numpy as np
+
+        return np.array([contagens.get(r, 0) for r in self.respostas], dtype=np.int64)
+
+    def score(self, respostas):
+        """Pontua uma folha. Retorna ``(perfil, pontuacao_total, contagens)``."""
+        import numpy as np
+
+        counts = self.count(respostas)
+        pontos = counts @ self.matrix
+        melhor = int(np.argmax(pontos))
+        return self.areas[melhor], int(pontos[melhor]), counts
+
+    def score_counts(self, counts):
+        """Pontua várias folhas: ``counts`` tem uma linha por folha e uma
+        coluna por resposta. Retorna ``(perfis, pontuacoes)`` como arrays."""
+        import numpy as np
+
+        pontos = np.asarray(counts, dtype=np.int64) @ self.matrix
+        melhor = np.argmax(pontos, axis=1)
+        perfis = np.asarray(self.areas, dtype=object)[melhor]
+        return perfis, pontos[np.arange(len(pontos)), melhor]
+
+    def score_codes(self, codes):
+        """Pontua folhas codificadas como matriz ``folhas x perguntas`` de
+        índices de resposta (valores negativos = sem resposta)."""
+        import numpy as np
+
+        codes = np.asarray(codes)
+        counts = np.stack(
+            [(codes == i).sum(axis=1) for i in range(len(self.respostas))], axis=1
+        )
+        return self.score_counts(counts)
+
+
+def rescore_results(conn, scorer, chunk_size=50000, dry_run=False):
+    """Recalcula ``resultados_teste`` que guardaram as respostas.
+
+    Lê em blocos por keyset no id, pontua cada bloco com uma única
+    multiplicação de matrizes e grava só as linhas cujo perfil ou pontuação
+    mudou. Retorna um resumo com as distribuições antes e depois.
+    """
+    import numpy as np
+
+    resumo = {"analisados": 0, "alterados": 0, "antes": {}, "depois": {}}
+    for rows in repository.iter_scored_results(conn, chunk_size):
+        counts = np.array(
+            [scorer.counts_from_dict(json.loads(row.respostas)) for row in rows], dtype=np.int64
+        )
+        perfis, pontuacoes = scorer.score_counts(counts)
+
+        alterados = []
+        for row, perfil, pontuacao in zip(rows, perfis, pontuacoes):
+            resumo["antes"][row.perfil] = resumo["antes"].get(row.perfil, 0) + 1
+            resumo["depois"][perfil] = resumo["depois"].get(perfil, 0) + 1
+            if perfil != row.perfil or int(pontuacao) != row.pontuacao:
+                alterados.append((perfil, int(pontuacao), row.id))
+
+        resumo["analisados"] += len(rows)
+        resumo["alterados"] += len(alterados)
+        if alterados and not dry_run:
+            repository.update_scores(conn, alterados)
+            conn.commit()
+    return resumo
@@ -0,0 +1,146 @@
+"""Busca textual no catálogo de carreiras e no histórico de chat do usuário.
+
+Os termos são normalizados (minúsculas, sem acentos, só letras e dígitos) e
+todos precisam aparecer; o último vale como prefixo, para a busca funcionar
+enquanto se digita (``"programacao dif"`` encontra "Programação é
+difícil?"). Os resultados vêm ordenados por BM25. Só o último termo é
+prefixo porque um prefixo longo no FTS5 junta as listas de todos os termos
+que o completam, sem poder pular linhas, e fica caro em tabelas grandes.
+
+- Catálogo: perfis, carreiras, cursos recomendados, trilhas e módulos ficam
+  num índice FTS5 em memória em cada worker. Ele é reconstruído quando a
+  seção ``recomendacoes`` do conteúdo muda, como o ``Catalog``.
+- Conversas: no SQLite, pelo índice FTS5 ``conversas_chat_fts`` mantido por
+  triggers (ver ``migrations/versions/0006_busca_conversas.py``). O filtro
+  por usuário é um termo do próprio índice, então o custo depende das
+  conversas do usuário que casam, não do tamanho da tabela. No PostgreSQL,
+  pelo índice GIN de ``to_tsvector``, com ``ts_rank`` no lugar do BM25.
+"""
+import re
+import sqlite3
+import threading
+import unicodedata
+
+from sqlalchemy import text
+
+from models import conversas_chat
+
+ESCOPOS = ("tudo", "catalogo", "conversas")
+MAX_TERMOS = 8
+LIMITE_PADRAO = 10
+MAX_LIMITE = 50
+
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+PREFIXOS = "2 3"
+
+_TERMO_RE = re.compile(r"\w+")
+
+# Mesma expressão do índice idx_conversas_chat_busca (migração 0006)
+_PG_VETOR = ("to_tsvector('simple'::regconfig, translate(lower(pergunta || ' ' || resposta), "
+             "'áàâãäéèêëíìîïóòôõöúùûüçñ', 'aaaaaeeeeiiiiooooouuuucn'))")
+
+
+def normalize(texto):
+    sem_acentos = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in sem_acentos if not unicodedata.combining(c)).lower()
+
+
+def parse_query(texto):
+    """Termos de busca normalizados (no máximo ``MAX_TERMOS``)."""
+    return _TERMO_RE.findall(normalize(texto or ""))[:MAX_TERMOS]
+
+
+def _fts_query(termos):
+    # Cada termo entre aspas (nada vira operador do FTS5); o último como prefixo
+    return " AND ".join([*(f'"{termo}"' for termo in termos[:-1]), f'"{termos[-1]}"*'])
+
+
+# --- CATÁLOGO ---
+def _documentos(recomendacoes):
+    """``(tipo, perfil, chave, link, titulo, texto)`` de cada item do catálogo."""
+    for perfil_key, perfil in recomendacoes.items():
+        nome = perfil.get("nome", perfil_key)
+        carreiras = perfil.get("carreiras", [])
+        cursos = perfil.get("cursos_recomendados", [])
+        yield ("perfil", perfil_key, perfil_key, None, nome,
+               " ".join([perfil.get("descricao", ""), *carreiras, *cursos]))
+        for carreira in carreiras:
+            yield ("carreira", perfil_key, perfil_key, None, carreira, nome)
+        for curso in cursos:
+            yield ("curso", perfil_key, perfil_key, None, curso, nome)
+        for trilha in perfil.get("trilhas", []):
+            modulos = trilha.get("modulos", [])
+            yield ("trilha", perfil_key, trilha["id_trilha"], None, trilha["titulo"],
+                   " ".join([nome, *(modulo["nome"] for modulo in modulos)]))
+            for modulo in modulos:
+                yield ("modulo", perfil_key, trilha["id_trilha"], modulo.get("link"),
+                       modulo["nome"], trilha["titulo"])
+
+
+class CatalogIndex:
+    def __init__(self, recomendacoes=None):
+        self._lock = threading.Lock()
+        self._conn = None
+        self.load(recomendacoes or {})
+
+    def load(self, recomendacoes):
+        """Monta um índice novo e troca pelo atual."""
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE catalogo USING fts5(
+                tipo UNINDEXED, perfil UNINDEXED, chave UNINDEXED, link UNINDEXED,
+                titulo, texto, tokenize = '{TOKENIZADOR}', prefix = '{PREFIXOS}'
+            )
+        """)
+        conn.executemany("INSERT INTO catalogo VALUES (?, ?, ?, ?, ?, ?)", _documentos(recomendacoes))
+        with self._lock:
+            self._conn = conn
+
+    def search(self, termos, limite=LIMITE_PADRAO):
+        # Título pesa mais que o texto de apoio
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT tipo, perfil, chave, link, titulo,
+                       snippet(catalogo, 5, '', '', '…', 12), bm25(catalogo, 3.0, 1.0) AS score
+                FROM catalogo WHERE catalogo MATCH ? ORDER BY score LIMIT ?
+            """, (_fts_query(termos), limite)).fetchall()
+        return [
+            {"tipo": tipo, "perfil": perfil, "chave": chave, "link": link, "titulo": titulo,
+             "trecho": trecho, "score": round(-score, 4)}
+            for tipo, perfil, chave, link, titulo, trecho, score in rows
+        ]
+
+
+# --- CONVERSAS ---
+def search_chats(conn, usuario_id, termos, limite=LIMITE_PADRAO):
+    """Conversas do usuário que contêm todos os termos, das mais relevantes."""
+    # Tipos das colunas da tabela (data_conversa vira datetime nos dois bancos)
+    colunas = (conversas_chat.c.id, conversas_chat.c.pergunta, conversas_chat.c.resposta,
+               conversas_chat.c.data_conversa)
+    if conn.dialect.name == "sqlite":
+        consulta = text("""
+            SELECT c.id, c.pergunta, c.resposta, c.data_conversa,
+                   -bm25(conversas_chat_fts, 0.0, 2.0, 1.0) AS score
+            FROM conversas_chat_fts JOIN conversas_chat c ON c.id = conversas_chat_fts.rowid
+            WHERE conversas_chat_fts MATCH :consulta
+            ORDER BY bm25(conversas_chat_fts, 0.0, 2.0, 1.0) LIMIT :limite
+        """)
+        # Os termos só valem para o texto: "u1*" não pode casar com o dono "u12"
+        parametros = {"consulta": f'dono : "u{int(usuario_id)}" '
+                                  f'AND {{pergunta resposta}} : ({_fts_query(termos)})'}
+    else:
+        consulta = text(f"""
+            SELECT id, pergunta, resposta, data_conversa, ts_rank({_PG_VETOR}, consulta) AS score
+            FROM conversas_chat, to_tsquery('simple', :consulta) AS consulta
+            WHERE usuario_id = :usuario_id AND {_PG_VETOR} @@ consulta
+            ORDER BY score DESC, id DESC LIMIT :limite
+        """)
+        parametros = {"consulta": " & ".join([*termos[:-1], f"{termos[-1]}:*"]),
+                      "usuario_id": usuario_id}
+    rows = conn.execute(consulta.columns(*colunas), {**parametros, "limite": limite})
+    return [
+        {"id": row.id, "pergunta": row.pergunta, "resposta": row.resposta,
+         "data_conversa": row.data_conversa.isoformat() if row.data_conversa else None,
+         "score": round(float(row.score), 4)}
+        for row in rows
+    ]
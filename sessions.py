@@ -0,0 +1,248 @@
+"""Sessões no servidor, num SQLite local compartilhado pelos workers.
+
+Com a sessão padrão do Flask, o conteúdo inteiro (usuário, nome, e-mail e
+mensagens flash) vai assinado no cookie e é verificado e reserializado a cada
+requisição. Aqui o cookie leva só um id opaco e aleatório; o conteúdo fica
+num arquivo SQLite (de preferência em ``/dev/shm``, como o rate limiting),
+sem serviço externo. O banco guarda apenas o SHA-256 do id.
+
+- Carga preguiçosa: abrir a sessão só lê o cookie; o SELECT acontece no
+  primeiro acesso ao conteúdo, então rotas que não usam ``session`` não
+  tocam o banco.
+- Gravação só quando a sessão muda (ou quando passou da metade da validade,
+  para renová-la); o cookie só é enviado quando o id muda.
+- O id é trocado quando o usuário da sessão muda (login/logout), contra
+  fixação de sessão.
+- Sessões expiradas são removidas periodicamente em lotes pequenos.
+- ``SessionStore.revoke_user`` encerra todas as sessões de um usuário.
+
+Como o arquivo é local, todos os workers precisam estar na mesma máquina.
+"""
+import hashlib
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+
+
+def default_store_path():
+    pasta = "/dev/shm" if os.path.isdir("/dev/shm") else os.path.abspath(".")
+    return os.path.join(pasta, "trilhafuturo_sessions.db")
+
+
+def _chave(sid):
+    return hashlib.sha256(sid.encode("utf-8")).digest()
+
+
+class SessionStore:
+    def __init__(self, path=None, cleanup_interval=60.0, cleanup_batch=1000):
+        self.path = path or default_store_path()
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch = cleanup_batch
+        self.serializer = TaggedJSONSerializer()
+        self._local = threading.local()
+        self._next_cleanup = 0.0
+        self._cleanup_lock = threading.Lock()
+        self._create_schema()
+
+    def _conn(self):
+        # Uma conexão por thread e por processo (seguro após fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessoes (
+                chave BLOB PRIMARY KEY,
+                usuario_id INTEGER,
+                dados TEXT NOT NULL,
+                expira_em REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_usuario ON sessoes(usuario_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_expira ON sessoes(expira_em)")
+
+    @staticmethod
+    def new_id():
+        return secrets.token_urlsafe(32)
+
+    def load(self, sid):
+        """``(dados, expira_em)`` da sessão, ou ``None`` se não existe ou expirou."""
+        row = self._conn().execute(
+            "SELECT dados, expira_em FROM sessoes WHERE chave = ? AND expira_em > ?",
+            (_chave(sid), time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return self.serializer.loads(row[0]), row[1]
+
+    def save(self, sid, dados, expira_em):
+        self._maybe_cleanup(time.time())
+        self._conn().execute("""
+            INSERT INTO sessoes (chave, usuario_id, dados, expira_em) VALUES (?, ?, ?, ?)
+            ON CONFLICT(chave) DO UPDATE SET
+                usuario_id = excluded.usuario_id, dados = excluded.dados, expira_em = excluded.expira_em
+        """, (_chave(sid), dados.get("usuario_id"), self.serializer.dumps(dict(dados)), expira_em))
+
+    def touch(self, sid, expira_em):
+        self._conn().execute("UPDATE sessoes SET expira_em = ? WHERE chave = ?", (expira_em, _chave(sid)))
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessoes WHERE chave = ?", (_chave(sid),))
+
+    def revoke_user(self, usuario_id):
+        """Encerra todas as sessões do usuário. Retorna quantas foram removidas."""
+        return self._conn().execute("DELETE FROM sessoes WHERE usuario_id = ?", (usuario_id,)).rowcount
+
+    def count(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessoes WHERE expira_em > ?", (time.time(),)).fetchone()[0]
+
+    def _maybe_cleanup(self, now):
+        if now < self._next_cleanup or not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_cleanup = now + self.cleanup_interval
+            self.cleanup(now)
+        finally:
+            self._cleanup_lock.release()
+
+    def cleanup(self, now=None):
+        """Remove sessões expiradas em lotes, sem segurar o lock de escrita."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        removidas = 0
+        while True:
+            cursor = conn.execute("""
+                DELETE FROM sessoes WHERE chave IN (
+                    SELECT chave FROM sessoes WHERE expira_em <= ? LIMIT ?
+                )
+            """, (now, self.cleanup_batch))
+            removidas += cursor.rowcount
+            if cursor.rowcount < self.cleanup_batch:
+                return removidas
+
+
+class ServerSession(SessionMixin):
+    """Sessão carregada do store só no primeiro acesso ao conteúdo."""
+
+    def __init__(self, store, sid=None):
+        self._store = store
+        self.sid = sid
+        self.cookie_sid = sid
+        self.expira_em = None
+        self.usuario_original = None
+        self._dados = None
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False
+
+    @property
+    def loaded(self):
+        return self._dados is not None
+
+    def _carregar(self):
+        if self._dados is None:
+            self.accessed = True
+            registro = self._store.load(self.sid) if self.sid else None
+            if registro is None:
+                self.sid = None
+                self._dados = {}
+            else:
+                self._dados, self.expira_em = registro
+                self.usuario_original = self._dados.get("usuario_id")
+        return self._dados
+
+    def __getitem__(self, key):
+        return self._carregar()[key]
+
+    def __setitem__(self, key, value):
+        self._carregar()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._carregar()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._carregar())
+
+    def __len__(self):
+        return len(self._carregar())
+
+    def __contains__(self, key):
+        return key in self._carregar()
+
+    def get(self, key, default=None):
+        return self._carregar().get(key, default)
+
+    def clear(self):
+        if self._carregar():
+            self._dados.clear()
+            self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        # Só o cookie; o store é consultado no primeiro acesso (ver ServerSession)
+        return ServerSession(self.store, request.cookies.get(self.get_cookie_name(app)) or None)
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            return
+        response.vary.add("Cookie")
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            # Sessão esvaziada (logout) ou cookie de uma sessão que já não existe
+            if session.sid:
+                self.store.delete(session.sid)
+            if session.cookie_sid:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        agora = time.time()
+        validade = app.permanent_session_lifetime.total_seconds()
+        if not session.modified:
+            if session.expira_em is not None and session.expira_em - agora < validade / 2:
+                session.expira_em = agora + validade
+                self.store.touch(session.sid, session.expira_em)
+            return
+
+        if session.sid is None or session.get("usuario_id") != session.usuario_original:
+            # Sessão nova ou troca de usuário: id novo, e o antigo deixa de valer
+            if session.sid:
+                self.store.delete(session.sid)
+            session.sid = self.store.new_id()
+        session.expira_em = agora + validade
+        self.store.save(session.sid, session, session.expira_em)
+
+        if session.sid != session.cookie_sid:
+            response.set_cookie(
+                name, session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain, path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
@@ -0,0 +1,62 @@
+"""Agregados globais da plataforma (usuários, testes e distribuição de perfis).
+
+Os valores vêm das tabelas materializadas ``estatisticas_globais`` e
+``distribuicao_perfis``, mantidas por triggers (ver ``migrations/``), e
+ficam num cache em memória com TTL curto, invalidado pelo próprio worker
+sempre que ele grava um usuário ou resultado de teste.
+"""
+import threading
+from datetime import datetime, timezone
+
+from cachetools import TTLCache
+from sqlalchemy import select
+
+from models import distribuicao_perfis, estatisticas_globais
+
+_lock = threading.Lock()
+_cache = TTLCache(maxsize=1, ttl=5)
+
+
+def configure(ttl):
+    global _cache
+    with _lock:
+        _cache = TTLCache(maxsize=1, ttl=ttl)
+
+
+def invalidate():
+    with _lock:
+        _cache.clear()
+
+
+def _load(conn):
+    contadores = dict(conn.execute(
+        select(estatisticas_globais.c.chave, estatisticas_globais.c.valor)
+    ).all())
+    distribuicao = conn.execute(
+        select(distribuicao_perfis.c.perfil, distribuicao_perfis.c.total)
+        .where(distribuicao_perfis.c.total > 0)
+        .order_by(distribuicao_perfis.c.perfil)
+    ).all()
+    return {
+        "total_users": contadores.get("total_usuarios", 0),
+        "total_tests": contadores.get("total_testes", 0),
+        "chart": {
+            "labels": [row.perfil.capitalize() for row in distribuicao],
+            "values": [row.total for row in distribuicao],
+        },
+        "version": contadores.get("versao_perfis", 0),
+        "last_modified": datetime.fromtimestamp(
+            contadores.get("perfis_atualizado_em", 0), tz=timezone.utc
+        ),
+    }
+
+
+def get_global_stats(conn):
+    with _lock:
+        cached = _cache.get("global")
+    if cached is not None:
+        return cached
+    stats = _load(conn)
+    with _lock:
+        _cache["global"] = stats
+    return stats
@@ -0,0 +1,95 @@
+"""Fixtures da suíte: bancos SQLite temporários, um PostgreSQL opcional e o app.
+
+Os testes de PostgreSQL rodam contra ``TEST_DATABASE_URL`` (um banco
+descartável: o schema ``public`` é recriado a cada teste) e são pulados
+quando a variável não está definida ou o servidor não responde.
+"""
+import itertools
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+# O app lê a configuração na importação: banco próprio, sem rate limit e com
+# hash de senha barato e síncrono
+_PASTA = tempfile.mkdtemp(prefix="trilhafuturo-testes-")
+os.environ.update(
+    DB_NAME=os.path.join(_PASTA, "app.db"),
+    RATELIMIT_ENABLED="0",
+    RATELIMIT_STORAGE_URI="memory://",
+    PASSWORD_HASH_METHOD="pbkdf2:sha256:1000",
+    PASSWORD_HASH_WORKERS="0",
+    BULK_IMPORT_HASH_WORKERS="0",
+    ADMIN_TOKEN="token-de-teste",
+    ARCHIVE_PATH=os.path.join(_PASTA, "archive"),
+    METRICS_PATH=os.path.join(_PASTA, "metrics.db"),
+    SESSION_STORE_PATH=os.path.join(_PASTA, "sessions.db"),
+)
+os.environ.pop("DATABASE_URL", None)
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'teste.db'}"
+
+
+@pytest.fixture
+def postgres_url():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL não definida")
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE"))
+            conn.execute(text("CREATE SCHEMA public"))
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL indisponível: {e.orig}")
+    finally:
+        engine.dispose()
+    return url
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def database_url(request):
+    """URL de um banco vazio, em cada backend."""
+    return request.getfixturevalue("sqlite_url" if request.param == "sqlite" else "postgres_url")
+
+
+@pytest.fixture
+def engine(database_url):
+    """Engine de um banco já migrado até a última revisão."""
+    db.upgrade_database(database_url)
+    engine = db.create_db_engine(database_url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def app():
+    import app as app_module
+    return app_module.create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture
+def usuario(client):
+    """Cadastra e loga um usuário novo; devolve ``(cliente, usuario_id)``."""
+    email = f"aluno{next(_emails)}@escola.br"
+    resposta = client.post("/register", data={"nome": "Aluno Teste", "email": email, "senha": "segredo1"})
+    assert resposta.status_code == 302
+    resposta = client.post("/login", data={"email": email, "senha": "segredo1"})
+    assert resposta.status_code == 302
+    with client.session_transaction() as sessao:
+        return client, sessao["usuario_id"]
@@ -0,0 +1,71 @@
+"""Pipeline dos arquivos estáticos (``assets.py``): build e entrega."""
+import gzip
+import json
+
+import pytest
+from flask import Flask, url_for
+
+import assets
+
+CSS = "/* tema */\nbody {\n  color : red;\n  background: url('../img/logo.png');\n}\n" + ".a { margin: 0; }\n" * 60
+JS = 'const url = "http://exemplo.com"; // comentário\n\n  /* bloco */\nfunction f() {\n  return `a // b`;\n}\n'
+
+
+@pytest.fixture
+def static(tmp_path):
+    for caminho, conteudo in [("css/style.css", CSS), ("js/app.js", JS)]:
+        (tmp_path / caminho).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / caminho).write_text(conteudo, encoding="utf-8")
+    (tmp_path / "img").mkdir()
+    (tmp_path / "img" / "logo.png").write_bytes(b"\x89PNG" + bytes(1000))
+    return tmp_path
+
+
+def test_minificacao_preserva_strings_e_seletores():
+    assert assets.minify_js(JS) == 'const url = "http://exemplo.com";\nfunction f() {\nreturn `a // b`;\n}'
+    assert assets.minify_css("a :hover { color : red; }") == "a :hover{color :red}"
+
+
+def test_build_com_hash_manifesto_e_variantes(static):
+    manifesto = assets.build(str(static), echo=lambda _: None)
+    arquivos = manifesto["arquivos"]
+    assert set(arquivos) == {"css/style.css", "js/app.js", "img/logo.png"}
+    assert arquivos["img/logo.png"].startswith("img/logo.") and arquivos["img/logo.png"].endswith(".png")
+    dist = static / assets.PASTA_DIST
+    assert json.loads((dist / assets.MANIFESTO).read_text()) == manifesto
+
+    css = (dist / arquivos["css/style.css"]).read_text(encoding="utf-8")
+    # url(...) reescrita para o nome com hash da imagem, relativa ao CSS
+    assert f"url(../{arquivos['img/logo.png']})" in css
+    assert "/* tema */" not in css
+    assert manifesto["codificacoes"][arquivos["css/style.css"]][-1] == "gzip"
+    comprimido = (dist / (arquivos["css/style.css"] + ".gz")).read_bytes()
+    assert gzip.decompress(comprimido).decode("utf-8") == css
+    # PNG não é comprimido de novo; JS pequeno não compensa
+    assert arquivos["img/logo.png"] not in manifesto["codificacoes"]
+    assert arquivos["js/app.js"] not in manifesto["codificacoes"]
+
+    # Mesmo conteúdo, mesmos nomes
+    assert assets.build(str(static), echo=lambda _: None) == manifesto
+
+
+def test_entrega_com_nome_com_hash_e_gzip(static):
+    manifesto = assets.build(str(static), echo=lambda _: None)
+    app = Flask(__name__, static_folder=str(static), static_url_path="/static")
+    estaticos = assets.Assets(str(static))
+    estaticos.init_app(app)
+    assert estaticos.digest
+
+    with app.test_request_context():
+        url = url_for("static", filename="css/style.css")
+    assert url == f"/static/{assets.PASTA_DIST}/{manifesto['arquivos']['css/style.css']}"
+
+    cliente = app.test_client()
+    resposta = cliente.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resposta.headers["Content-Encoding"] == "gzip"
+    assert resposta.headers["Content-Type"].startswith("text/css")
+    assert "immutable" in resposta.headers["Cache-Control"]
+    assert "Accept-Encoding" in resposta.headers["Vary"]
+    assert cliente.get(url).headers.get("Content-Encoding") is None
+    # Arquivos fora de dist/ continuam servidos pela view original
+    assert cliente.get("/static/js/app.js").status_code == 200
@@ -0,0 +1,27 @@
+"""Busca nas conversas do usuário (``search.search_chats``)."""
+from models import conversas_chat, usuarios
+import search
+
+
+def _conversa(pergunta, resposta, usuario_id):
+    return {"usuario_id": usuario_id, "pergunta": pergunta, "resposta": resposta, "topico": "geral"}
+
+
+def test_busca_so_no_texto_das_conversas_do_usuario(engine):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), [
+            {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"},
+            {"id": 12, "nome": "Bia", "email": "bia@escola.br", "senha": "x"},
+        ])
+        conn.execute(conversas_chat.insert(), [
+            _conversa("como virar programador?", "Estude lógica de programação.", 12),
+            _conversa("o que faz um designer?", "Cria interfaces.", 12),
+            _conversa("programação é difícil?", "Com prática fica fácil.", 1),
+        ])
+
+    with engine.connect() as conn:
+        encontradas = search.search_chats(conn, 12, search.parse_query("programa"))
+        assert [c["pergunta"] for c in encontradas] == ["como virar programador?"]
+        assert search.search_chats(conn, 1, search.parse_query("designer")) == []
+        # O filtro por dono não vira termo de busca: "u1*" não casa com "u12"
+        assert search.search_chats(conn, 12, search.parse_query("u1")) == []
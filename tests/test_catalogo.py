@@ -0,0 +1,56 @@
+"""Catálogo de perfis e trilhas (``catalog.Catalog``) e os ETags das páginas."""
+import copy
+
+from catalog import Catalog
+
+RECOMENDACOES = {
+    "exatas": {"nome": "Exatas", "trilhas": [{"id_trilha": "exatas_dados", "titulo": "Dados"}]},
+    "humanas": {"nome": "Humanas", "trilhas": [{"id_trilha": "humanas_escrita", "titulo": "Escrita"}]},
+}
+
+
+def test_indice_de_trilhas_e_perfil_padrao():
+    catalogo = Catalog(RECOMENDACOES)
+    trilha, perfil_key = catalogo.find_trilha("exatas_dados")
+    assert (trilha["titulo"], perfil_key) == ("Dados", "exatas")
+    assert catalogo.find_trilha("inexistente") == (None, None)
+    assert catalogo.get_perfil("inexistente")[0] == "humanas"
+
+
+def test_digest_so_muda_com_o_proprio_item():
+    catalogo = Catalog(RECOMENDACOES)
+    exatas, humanas = catalogo.digest("perfil", "exatas"), catalogo.digest("perfil", "humanas")
+    blob = catalogo.blob("perfil", "humanas", lambda: object())
+
+    novas = copy.deepcopy(RECOMENDACOES)
+    novas["exatas"]["nome"] = "Ciências Exatas"
+    catalogo.load(novas)
+    assert catalogo.digest("perfil", "exatas") != exatas
+    assert catalogo.digest("perfil", "humanas") == humanas
+    # Documentos de itens que não mudaram são reaproveitados
+    assert catalogo.blob("perfil", "humanas", lambda: object()) is blob
+
+
+def test_etag_das_paginas_muda_com_o_build(client, monkeypatch):
+    import app as app_module
+
+    resposta = client.get("/trilha/exatas_dados")
+    assert resposta.status_code == 200
+    etag = resposta.headers["ETag"]
+    assert client.get("/trilha/exatas_dados", headers={"If-None-Match": etag}).status_code == 304
+
+    # Templates, assets ou APP_VERSION novos: a página antiga não vale mais
+    monkeypatch.setattr(app_module, "_versao_build", "outro-deploy")
+    resposta = client.get("/trilha/exatas_dados", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+
+
+def test_versao_do_build_inclui_o_manifesto_dos_assets(monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "_versao_build", None)
+    antes = app_module.versao_build()
+    monkeypatch.setattr(app_module, "_versao_build", None)
+    monkeypatch.setattr(app_module.static_assets, "digest", "manifesto-novo")
+    assert app_module.versao_build() != antes
@@ -0,0 +1,59 @@
+"""Motor de intenções do chat (``chat_engine.ChatEngine``) e o cache de respostas."""
+import time
+
+from chat_engine import ChatEngine, normalize_question
+
+BASE = {
+    "dados": {"palavras_chave": ["ciência de dados", "estatística"], "resposta": "Dados!",
+              "carreiras": ["Cientista de Dados"]},
+    "ciencia": {"palavras_chave": ["ciência", "pesquisa"], "resposta": "Ciência!"},
+    "design": {"palavras_chave": ["ux", "design"], "resposta": "Design!", "habilidades": ["Empatia"]},
+}
+FALLBACK = "Não entendi."
+
+
+def test_normaliza_acentos_caixa_e_plural():
+    assert normalize_question("Ciências de DADOS?") == "ciencia de dado"
+
+
+def test_expressao_mais_longa_vence_e_empate_segue_a_declaracao():
+    motor = ChatEngine(BASE, FALLBACK, cache_size=0)
+    # "ciência de dados" (3 termos) pesa mais que "ciência" sozinha
+    assert motor.classify("quero estudar ciência de dados") == "dados"
+    assert motor.classify("gosto de pesquisa e de design") == "ciencia"
+    assert motor.classify("qual o salário?") is None
+    assert motor.answer("ux") == ("Design!", (), ("Empatia",), "design")
+    assert motor.answer("qual o salário?") == (FALLBACK, (), (), None)
+
+
+def test_cache_conta_acertos_e_esvazia_ao_reconstruir():
+    motor = ChatEngine(BASE, FALLBACK, cache_size=2, cache_ttl=60)
+    motor.answer("Estatística")
+    # Mesma pergunta normalizada: acerto no cache
+    assert motor.answer("estatisticas")[3] == "dados"
+    motor.answer("ux")
+    motor.answer("pesquisa")
+    assert motor.cache_stats() == {
+        "enabled": True, "size": 2, "maxsize": 2, "hits": 1, "misses": 3, "evictions": 1,
+    }
+
+    motor.build({"dados": {**BASE["dados"], "resposta": "Dados 2"}}, fallback="Outro fallback")
+    assert motor.cache_stats()["size"] == 0
+    assert motor.answer("estatística")[0] == "Dados 2"
+    assert motor.answer("ux")[0] == "Outro fallback"
+    assert motor.cache_stats()["evictions"] == 1
+
+
+def test_respostas_expiram_pelo_ttl():
+    motor = ChatEngine(BASE, FALLBACK, cache_size=8, cache_ttl=0.05)
+    motor.answer("ux")
+    time.sleep(0.1)
+    assert motor.cache_stats()["size"] == 0
+    motor.answer("ux")
+    assert motor.cache_stats()["misses"] == 2
+
+
+def test_cache_desligado():
+    motor = ChatEngine(BASE, FALLBACK, cache_size=0)
+    assert motor.answer("ux")[3] == "design"
+    assert motor.cache_stats() == {"enabled": False}
@@ -0,0 +1,101 @@
+"""Contadores e versões mantidos por triggers, em SQLite e PostgreSQL."""
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+
+import queries
+import repository
+import stats
+from models import estatisticas_usuario, feedbacks, resultados_teste, usuarios
+
+
+def globais(conn):
+    stats.invalidate()
+    return stats.get_global_stats(conn)
+
+
+def por_usuario(conn, usuario_id):
+    return conn.execute(
+        select(estatisticas_usuario.c.total_testes, estatisticas_usuario.c.total_feedbacks,
+               estatisticas_usuario.c.total_conversas)
+        .where(estatisticas_usuario.c.usuario_id == usuario_id)
+    ).one()
+
+
+def test_contadores_globais_e_distribuicao(engine):
+    with engine.connect() as conn:
+        ana = repository.create_user(conn, "Ana", "ana@x.com", "h")
+        bia = repository.create_user(conn, "Bia", "bia@x.com", "h")
+        repository.insert_rows(conn, "resultados_teste", [
+            {"usuario_id": ana, "pontuacao": 6, "perfil": "humanas"},
+            {"usuario_id": ana, "pontuacao": 4, "perfil": "exatas"},
+            {"usuario_id": bia, "pontuacao": 6, "perfil": "humanas"},
+        ])
+        conn.commit()
+
+        agregados = globais(conn)
+        assert (agregados["total_users"], agregados["total_tests"]) == (2, 3)
+        assert dict(zip(agregados["chart"]["labels"], agregados["chart"]["values"])) == {
+            "Exatas": 1, "Humanas": 2}
+        versao = agregados["version"]
+
+        conn.execute(delete(resultados_teste).where(resultados_teste.c.usuario_id == bia))
+        conn.execute(delete(usuarios).where(usuarios.c.id == bia))
+        conn.commit()
+        agregados = globais(conn)
+        assert (agregados["total_users"], agregados["total_tests"]) == (1, 2)
+        assert agregados["chart"]["values"] == [1, 1]
+        assert agregados["version"] > versao
+
+
+def test_totais_e_versao_por_usuario(engine):
+    with engine.connect() as conn:
+        ana = repository.create_user(conn, "Ana", "ana@x.com", "h")
+        conn.commit()
+        assert queries.get_user_version(conn, ana) == 0
+
+        repository.insert_rows(conn, "resultados_teste", [{"usuario_id": ana, "pontuacao": 6, "perfil": "humanas"}])
+        repository.insert_rows(conn, "feedbacks", [{"usuario_id": ana, "comentario": "Gostei bastante"}])
+        repository.insert_rows(conn, "conversas_chat", [
+            {"usuario_id": ana, "pergunta": "oi", "resposta": "olá"},
+            {"usuario_id": ana, "pergunta": "tchau", "resposta": "até"},
+        ])
+        conn.commit()
+        assert tuple(por_usuario(conn, ana)) == (1, 1, 2)
+        versao = queries.get_user_version(conn, ana)
+        assert versao > 0
+
+        # Uma alteração que não muda nada visível não muda a versão
+        conn.execute(update(feedbacks).where(feedbacks.c.usuario_id == ana)
+                     .values(comentario=feedbacks.c.comentario))
+        conn.commit()
+        assert queries.get_user_version(conn, ana) == versao
+
+        conn.execute(update(resultados_teste).where(resultados_teste.c.usuario_id == ana)
+                     .values(perfil="exatas"))
+        conn.commit()
+        assert queries.get_user_version(conn, ana) > versao
+
+        conn.execute(delete(feedbacks).where(feedbacks.c.usuario_id == ana))
+        conn.commit()
+        assert tuple(por_usuario(conn, ana)) == (1, 0, 2)
+
+
+def test_historico_paginado_por_keyset(engine):
+    with engine.connect() as conn:
+        ana = repository.create_user(conn, "Ana", "ana@x.com", "h")
+        repository.insert_rows(conn, "resultados_teste", [
+            {"usuario_id": ana, "pontuacao": i, "perfil": "humanas", "data_teste": datetime(2025, 3, 1, 12, 0)}
+            for i in range(7)
+        ])
+        conn.commit()
+
+        vistos, cursor = [], None
+        while True:
+            pagina, cursor = queries.get_test_history(conn, ana, antes=cursor, limite=3)
+            vistos.extend(row["id"] for row in pagina)
+            if cursor is None:
+                break
+        # Mesma data para todos: o id desempata, sem repetir nem pular nada
+        assert len(vistos) == 7
+        assert vistos == sorted(vistos, reverse=True)
@@ -0,0 +1,78 @@
+"""Conteúdo externo (``content_store.py``): validação e recarga sem restart."""
+import json
+import logging
+import os
+import shutil
+
+import pytest
+
+from content_store import ContentError, ContentStore, load_content
+
+PASTA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "content")
+SCHEMA = os.path.join(PASTA, "catalogo.schema.json")
+
+
+@pytest.fixture
+def catalogo(tmp_path):
+    caminho = tmp_path / "catalogo.json"
+    shutil.copy(os.path.join(PASTA, "catalogo.json"), caminho)
+    return caminho
+
+
+def _gravar(caminho, dados, versao):
+    caminho.write_text(json.dumps(dados, ensure_ascii=False), encoding="utf-8")
+    # Garante uma assinatura nova mesmo com mtime de baixa resolução
+    os.utime(caminho, ns=(versao, versao))
+
+
+def test_recarrega_e_avisa_so_as_secoes_alteradas(catalogo):
+    loja = ContentStore(str(catalogo), SCHEMA, check_interval=0)
+    avisos = []
+    loja.on_change("chat", lambda chat: avisos.append("chat"))
+    loja.on_change("recomendacoes", lambda recomendacoes: avisos.append("recomendacoes"))
+    dados = loja.get()
+    assert avisos == ["chat", "recomendacoes"]
+    # Sem mudança no arquivo, nada é relido
+    assert loja.refresh() is False
+
+    dados = json.loads(json.dumps(dados))
+    dados["chat"]["fallback"] = "Pergunte de outro jeito."
+    _gravar(catalogo, dados, 10**18)
+    assert loja.refresh() is True
+    assert loja.get()["chat"]["fallback"] == "Pergunte de outro jeito."
+    assert avisos == ["chat", "recomendacoes", "chat"]
+    assert loja.reloads == 1
+
+
+def test_versao_invalida_e_ignorada(catalogo, caplog):
+    loja = ContentStore(str(catalogo), SCHEMA, check_interval=0)
+    atual = loja.get()
+
+    catalogo.write_text('{"recomendacoes": ', encoding="utf-8")
+    with caplog.at_level(logging.WARNING, logger="content_store"):
+        assert loja.refresh() is False
+    assert loja.get() is atual
+    assert "nova versão ignorada" in caplog.text
+
+    # Arquivo removido: continua servindo a versão em memória
+    catalogo.unlink()
+    assert loja.refresh() is False
+    assert loja.get() is atual
+
+
+def test_validacao_do_arquivo(catalogo):
+    dados = json.loads(catalogo.read_text(encoding="utf-8"))
+    trilhas = [t for perfil in dados["recomendacoes"].values() for t in perfil["trilhas"]]
+    trilhas[1]["id_trilha"] = trilhas[0]["id_trilha"]
+    _gravar(catalogo, dados, 10**18)
+    with pytest.raises(ContentError, match="id_trilha repetido"):
+        load_content(str(catalogo), SCHEMA)
+
+    del dados["chat"]
+    _gravar(catalogo, dados, 2 * 10**18)
+    with pytest.raises(ContentError, match="Conteúdo inválido"):
+        load_content(str(catalogo), SCHEMA)
+
+    # Sem uma primeira versão válida, o erro chega a quem pediu o conteúdo
+    with pytest.raises(ContentError):
+        ContentStore(str(catalogo), SCHEMA).get()
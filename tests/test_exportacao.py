@@ -0,0 +1,64 @@
+"""Exportação em streaming (``export.py``)."""
+import csv
+import io
+import json
+from datetime import datetime
+
+import pyarrow.parquet as pq
+import pytest
+
+import export
+from models import resultados_teste, usuarios
+
+
+def _resultado(n):
+    return {"usuario_id": 1, "perfil": "exatas", "pontuacao": n, "respostas": None,
+            "data_teste": datetime(2025, 3, n, 10, 0)}
+
+
+@pytest.fixture
+def banco(engine):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+        conn.execute(resultados_teste.insert(), [_resultado(n) for n in range(1, 6)])
+    return engine
+
+
+def test_csv_em_blocos_ate_a_watermark(banco):
+    ate_id, dados = export.prepare(banco.connect, "resultados_teste", "csv", chunk_size=2)
+    # Gravado depois do início: fica para a próxima exportação
+    with banco.begin() as conn:
+        conn.execute(resultados_teste.insert(), _resultado(6))
+
+    partes = list(dados)
+    # Cabeçalho com o primeiro bloco, depois um pedaço por bloco de 2 linhas
+    assert len(partes) == 3
+    linhas = list(csv.DictReader(io.StringIO(b"".join(partes).decode("utf-8"))))
+    assert [int(linha["pontuacao"]) for linha in linhas] == [1, 2, 3, 4, 5]
+    assert int(linhas[-1]["id"]) == ate_id
+
+    ate_id_novo, dados = export.prepare(banco.connect, "resultados_teste", "ndjson", desde_id=ate_id)
+    registros = [json.loads(linha) for linha in b"".join(dados).decode("utf-8").splitlines()]
+    assert [r["pontuacao"] for r in registros] == [6]
+    assert registros[0]["data_teste"] == "2025-03-06T10:00:00"
+    assert ate_id_novo == registros[0]["id"]
+
+
+def test_filtro_por_data_e_parquet(banco):
+    _, dados = export.prepare(banco.connect, "resultados_teste", "parquet",
+                              desde="2025-03-04", chunk_size=1)
+    tabela = pq.read_table(io.BytesIO(b"".join(dados)))
+    assert tabela.column("pontuacao").to_pylist() == [4, 5]
+    assert tabela.column("data_teste").to_pylist()[0] == datetime(2025, 3, 4, 10, 0)
+
+
+def test_parametros_invalidos(banco):
+    for argumentos, mensagem in [
+        ({"tabela": "usuarios"}, "Tabela não exportável"),
+        ({"formato": "xlsx"}, "Formato desconhecido"),
+        ({"desde": "ontem"}, "Data inválida"),
+        ({"chunk_size": 0}, "chunk_size"),
+    ]:
+        argumentos = {"tabela": "resultados_teste", **argumentos}
+        with pytest.raises(export.ExportError, match=mensagem):
+            export.prepare(banco.connect, **argumentos)
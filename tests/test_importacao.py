@@ -0,0 +1,85 @@
+"""Importação de usuários em lote (``bulk_import.py`` e ``/api/admin/users/import``)."""
+import io
+from concurrent.futures.process import BrokenProcessPool
+
+import bulk_import
+
+ADMIN = {"Authorization": "Bearer token-de-teste", "Content-Type": "text/csv"}
+RESPOSTAS = "analitico;analitico;analitico;organizado;analitico"
+
+
+def _importar(client, csv):
+    resposta = client.post("/api/admin/users/import", data=csv.encode("utf-8"), headers=ADMIN)
+    assert resposta.status_code == 200
+    return resposta.get_json()
+
+
+def test_importa_usuarios_novos_com_teste(client):
+    relatorio = _importar(client, "nome,email,senha,respostas\n"
+                                  f"Caio,caio@turma.br,segredo1,{RESPOSTAS}\n"
+                                  "Duda,duda@turma.br,segredo1,\n")
+    assert relatorio["importados"] == 2
+    assert relatorio["testes"] == 1
+    assert relatorio["total_erros"] == 0
+
+    assert client.post("/login", data={"email": "caio@turma.br", "senha": "segredo1"}).status_code == 302
+    assert client.get("/api/stats").get_json()["total_testes"] == 1
+
+
+def test_respostas_de_usuario_existente_viram_resultado(client):
+    _importar(client, "nome,email,senha\nEli,eli@turma.br,segredo1\n")
+    relatorio = _importar(client, "nome,email,senha,respostas\n"
+                                  f"Outro Nome,eli@turma.br,outra-senha,{RESPOSTAS}\n"
+                                  "Eli,ELI@turma.br,segredo1,\n"
+                                  f"Fabi,fabi@turma.br,segredo1,{RESPOSTAS}\n")
+    assert relatorio["importados"] == 1
+    assert relatorio["testes"] == 2
+    assert relatorio["testes_de_cadastrados"] == 1
+    assert relatorio["erros"] == [
+        {"linha": 3, "email": "eli@turma.br", "erro": "E-mail repetido no arquivo (linha 2)"},
+    ]
+
+    # A conta existente fica com a senha original e ganha o resultado
+    assert client.post("/login", data={"email": "eli@turma.br", "senha": "outra-senha"}).status_code == 200
+    assert client.post("/login", data={"email": "eli@turma.br", "senha": "segredo1"}).status_code == 302
+    assert client.get("/api/v1/me/dashboard").get_json()["total_testes"] == 1
+
+
+def test_usuario_existente_sem_respostas_e_recusado(client):
+    _importar(client, "nome,email,senha\nGabi,gabi@turma.br,segredo1\n")
+    relatorio = _importar(client, "nome,email,senha\nGabi,gabi@turma.br,segredo1\n")
+    assert relatorio["importados"] == 0
+    assert relatorio["erros"] == [
+        {"linha": 2, "email": "gabi@turma.br", "erro": bulk_import.ERRO_CADASTRADO},
+    ]
+
+
+class _HasherQuebrado:
+    """Falha no segundo bloco, como um pool de processos que morreu."""
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+        self.blocos = 0
+
+    def hash_many(self, senhas):
+        self.blocos += 1
+        if self.blocos == 2:
+            raise BrokenProcessPool("processo de hash encerrado")
+        return self.hasher.hash_many(senhas)
+
+
+def test_falha_no_hash_afeta_so_o_bloco(app):
+    import app as app_module
+
+    csv = "nome,email,senha\n" + "".join(f"Aluno {n},hash{n}@turma.br,segredo1\n" for n in range(5))
+    with app.app_context():
+        relatorio = bulk_import.run(
+            app_module.get_db(), io.StringIO(csv), "csv", _HasherQuebrado(app_module.password_hasher),
+            app_module.scorer, app_module.validate_email, app_module.validate_password,
+            agora=app_module.utc_timestamp(), chunk_size=2,
+        )
+    assert relatorio["importados"] == 3
+    assert [(erro["linha"], erro["erro"]) for erro in relatorio["erros"]] == [
+        (4, "Erro ao calcular as senhas do bloco: BrokenProcessPool"),
+        (5, "Erro ao calcular as senhas do bloco: BrokenProcessPool"),
+    ]
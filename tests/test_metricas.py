@@ -0,0 +1,56 @@
+"""Contagem de requisições em ``metrics.Metrics``, inclusive das que falham."""
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+
+from metrics import Metrics
+
+
+@pytest.fixture
+def app_metricas(tmp_path):
+    app = Flask(__name__)
+
+    @app.route("/ok")
+    def ok():
+        return "ok"
+
+    @app.route("/falha")
+    def falha():
+        raise RuntimeError("erro não tratado")
+
+    metricas = Metrics(str(tmp_path / "metrics.db"), flush_interval=0)
+    engine = create_engine("sqlite://")
+    metricas.init_app(app, engine)
+    yield app, metricas
+    engine.dispose()
+
+
+def _total(metricas, endpoint, status):
+    serie = (f'trilhafuturo_http_requests_total{{endpoint="{endpoint}",'
+             f'method="GET",status="{status}"}}')
+    for linha in metricas.render().splitlines():
+        if linha.startswith(serie + " "):
+            return float(linha.split()[-1])
+    return 0
+
+
+def test_requisicoes_com_sucesso(app_metricas):
+    app, metricas = app_metricas
+    client = app.test_client()
+    client.get("/ok")
+    client.get("/ok")
+    assert _total(metricas, "ok", 200) == 2
+
+
+def test_excecao_nao_tratada_conta_como_500(app_metricas):
+    app, metricas = app_metricas
+    assert app.test_client().get("/falha").status_code == 500
+    assert _total(metricas, "falha", 500) == 1
+
+
+def test_excecao_propagada_conta_como_500(app_metricas):
+    app, metricas = app_metricas
+    app.testing = True
+    with pytest.raises(RuntimeError):
+        app.test_client().get("/falha")
+    assert _total(metricas, "falha", 500) == 1
@@ -0,0 +1,150 @@
+"""Migrações Alembic: banco vazio, ida e volta, e bancos do antigo init_db()."""
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+import db
+
+HEAD = "0009"
+
+TABELAS = {
+    "usuarios", "feedbacks", "resultados_teste", "conversas_chat", "estatisticas_globais",
+    "distribuicao_perfis", "estatisticas_usuario", "rollup_testes_dia", "rollup_chat_dia",
+    "rollup_chat_arquivado",
+}
+
+# Schema criado pelo antigo init_db() do app.py (PRAGMA user_version = 0)
+SCHEMA_LEGADO = """
+    CREATE TABLE usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        senha TEXT NOT NULL,
+        data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE feedbacks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        comentario TEXT NOT NULL,
+        data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+    );
+    CREATE TABLE resultados_teste (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        pontuacao INTEGER,
+        perfil TEXT NOT NULL,
+        data_teste TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+    );
+    CREATE TABLE conversas_chat (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        pergunta TEXT NOT NULL,
+        resposta TEXT NOT NULL,
+        data_conversa TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+    );
+    CREATE INDEX idx_usuarios_email ON usuarios(email);
+    CREATE INDEX idx_resultados_usuario ON resultados_teste(usuario_id);
+    CREATE INDEX idx_feedbacks_usuario ON feedbacks(usuario_id);
+"""
+
+DADOS = """
+    INSERT INTO usuarios (id, nome, email, senha) VALUES (1, 'Ana', 'ana@x.com', 'h'), (2, 'Bia', 'bia@x.com', 'h');
+    INSERT INTO resultados_teste (usuario_id, pontuacao, perfil)
+        VALUES (1, 6, 'humanas'), (1, 4, 'exatas'), (2, 6, 'humanas');
+    INSERT INTO feedbacks (usuario_id, comentario) VALUES (1, 'Muito bom mesmo');
+    INSERT INTO conversas_chat (usuario_id, pergunta, resposta) VALUES (2, 'oi', 'olá');
+"""
+
+
+def revisao(url):
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    finally:
+        engine.dispose()
+
+
+def consultar(url, sql):
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(sql)).all()
+    finally:
+        engine.dispose()
+
+
+def verificar_contadores(url):
+    assert dict(consultar(url, "SELECT chave, valor FROM estatisticas_globais "
+                               "WHERE chave IN ('total_usuarios', 'total_testes')")) == {
+        "total_usuarios": 2, "total_testes": 3}
+    assert dict(consultar(url, "SELECT perfil, total FROM distribuicao_perfis WHERE total > 0")) == {
+        "humanas": 2, "exatas": 1}
+    assert sorted(consultar(url, "SELECT usuario_id, total_testes, total_feedbacks, total_conversas "
+                                 "FROM estatisticas_usuario")) == [(1, 2, 1, 0), (2, 1, 0, 1)]
+
+
+def test_upgrade_de_banco_vazio(database_url):
+    db.upgrade_database(database_url)
+    assert revisao(database_url) == HEAD
+    engine = create_engine(database_url)
+    try:
+        assert TABELAS <= set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+    # Rodar de novo (outro worker subindo) não faz nada
+    db.upgrade_database(database_url)
+    assert revisao(database_url) == HEAD
+
+
+def test_downgrade_e_upgrade_da_ultima_revisao(database_url):
+    db.upgrade_database(database_url)
+    with db.migration_connection(database_url) as conn:
+        from alembic import command
+        command.downgrade(db.alembic_config(conn), "0006")
+    assert revisao(database_url) == "0006"
+    db.upgrade_database(database_url)
+    assert revisao(database_url) == HEAD
+
+
+def test_banco_do_init_db_antigo(tmp_path):
+    caminho = tmp_path / "legado.db"
+    with sqlite3.connect(caminho) as conn:
+        conn.executescript(SCHEMA_LEGADO + DADOS)
+    url = f"sqlite:///{caminho}"
+
+    db.upgrade_database(url)
+
+    assert revisao(url) == HEAD
+    verificar_contadores(url)
+
+
+@pytest.mark.parametrize("user_version, revisao_equivalente", [(1, "0002"), (2, "0003"), (3, "0004")])
+def test_banco_migrado_pelo_user_version(tmp_path, user_version, revisao_equivalente):
+    # Um banco do antigo db.MIGRATIONS tem o schema da revisão equivalente,
+    # mas nenhuma tabela alembic_version: só o PRAGMA user_version
+    caminho = tmp_path / "legado.db"
+    with sqlite3.connect(caminho) as conn:
+        conn.executescript(SCHEMA_LEGADO + DADOS)
+    url = f"sqlite:///{caminho}"
+    db.upgrade_database(url, revisao_equivalente)
+    with sqlite3.connect(caminho) as conn:
+        conn.execute("DROP TABLE alembic_version")
+        conn.execute(f"PRAGMA user_version = {user_version}")
+        # Marca que só sobrevive se as revisões já aplicadas não rodarem de novo
+        conn.execute("UPDATE estatisticas_globais SET valor = 999 WHERE chave = 'total_usuarios'")
+
+    db.upgrade_database(url)
+
+    assert revisao(url) == HEAD
+    assert consultar(url, "SELECT valor FROM estatisticas_globais WHERE chave = 'total_usuarios'") == [(999,)]
+    # Os triggers continuam mantendo o contador a partir dali
+    with sqlite3.connect(caminho) as conn:
+        conn.execute("INSERT INTO usuarios (nome, email, senha) VALUES ('Caio', 'caio@x.com', 'h')")
+    assert consultar(url, "SELECT valor FROM estatisticas_globais WHERE chave = 'total_usuarios'") == [(1000,)]
+    with sqlite3.connect(caminho) as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
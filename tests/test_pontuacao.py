@@ -0,0 +1,69 @@
+"""Pontuação do teste vocacional (``scoring.Scorer``) e o recálculo do histórico."""
+import json
+
+import pytest
+from sqlalchemy import select
+
+from models import resultados_teste, usuarios
+from scoring import Scorer, rescore_results
+
+
+def test_pontua_pela_matriz_de_pesos():
+    scorer = Scorer()
+    perfil, pontuacao, contagens = scorer.score(["analitico", "analitico", "organizado", "desconhecida"])
+    assert (perfil, pontuacao) == ("exatas", 5)
+    assert scorer.counts_to_dict(contagens) == {"analitico": 2, "organizado": 1}
+
+
+def test_empate_vai_para_a_primeira_area():
+    scorer = Scorer()
+    # criativo + analitico: exatas 2, biologicas 2, humanas 2
+    assert scorer.score(["criativo", "analitico"])[:2] == ("exatas", 2)
+    assert scorer.score(["social", "organizado"])[:2] == ("humanas", 3)
+    # Sem respostas conhecidas todas as áreas empatam em zero
+    assert scorer.score([])[:2] == ("exatas", 0)
+
+
+def test_pontuacao_em_lote_igual_a_individual():
+    scorer = Scorer()
+    folhas = [["criativo"] * 3 + ["analitico"] * 2, ["social", "organizado"], ["analitico"] * 5]
+    perfis, pontuacoes = scorer.score_counts([scorer.count(folha) for folha in folhas])
+    individuais = [scorer.score(folha)[:2] for folha in folhas]
+    assert [(str(p), int(n)) for p, n in zip(perfis, pontuacoes)] == individuais
+
+    codigos = [[scorer.respostas.index(r) for r in folha] + [-1] * (5 - len(folha)) for folha in folhas]
+    perfis, pontuacoes = scorer.score_codes(codigos)
+    assert [(str(p), int(n)) for p, n in zip(perfis, pontuacoes)] == individuais
+
+
+def test_pesos_do_arquivo(tmp_path):
+    caminho = tmp_path / "pesos.json"
+    caminho.write_text(json.dumps({"areas": ["a", "b"], "pesos": {"x": {"b": 3}, "y": {"a": 1}}}))
+    scorer = Scorer.from_file(caminho)
+    assert scorer.score(["x", "y", "y"])[:2] == ("b", 3)
+    assert scorer.matrix.tolist() == [[0, 3], [1, 0]]
+
+    with pytest.raises(ValueError, match="Área desconhecida"):
+        Scorer({"x": {"c": 1}}, areas=("a", "b"))
+
+
+def test_recalculo_grava_so_o_que_mudou(engine):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+        conn.execute(resultados_teste.insert(), [
+            {"usuario_id": 1, "perfil": "exatas", "pontuacao": 10,
+             "respostas": json.dumps({"analitico": 5})},
+            {"usuario_id": 1, "perfil": "exatas", "pontuacao": 6,
+             "respostas": json.dumps({"criativo": 3})},
+            # Resultados antigos, sem as respostas, ficam como estão
+            {"usuario_id": 1, "perfil": "biologicas", "pontuacao": 1, "respostas": None},
+        ])
+
+    with engine.connect() as conn:
+        resumo = rescore_results(conn, Scorer(), chunk_size=1)
+        assert resumo == {"analisados": 2, "alterados": 1,
+                          "antes": {"exatas": 2}, "depois": {"exatas": 1, "humanas": 1}}
+        linhas = conn.execute(
+            select(resultados_teste.c.perfil, resultados_teste.c.pontuacao).order_by(resultados_teste.c.id)
+        ).all()
+    assert [tuple(linha) for linha in linhas] == [("exatas", 10), ("humanas", 6), ("biologicas", 1)]
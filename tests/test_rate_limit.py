@@ -0,0 +1,43 @@
+"""Storage SQLite do rate limiting (``rate_limit_storage.py``)."""
+import time
+
+from limits import parse, strategies
+from limits.storage import storage_from_string
+
+from rate_limit_storage import SQLiteStorage  # registra o esquema sqlite://
+
+
+def test_limites_compartilhados_entre_instancias(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'limites.db'}"
+    # Cada worker do gunicorn abre a própria storage sobre o mesmo arquivo
+    workers = [storage_from_string(uri), storage_from_string(uri)]
+    assert all(isinstance(storage, SQLiteStorage) for storage in workers)
+
+    limite = parse("3/minute")
+    for estrategia in (strategies.FixedWindowRateLimiter, strategies.SlidingWindowCounterRateLimiter):
+        limitadores = [estrategia(storage) for storage in workers]
+        chave = estrategia.__name__
+        assert [limitadores[n % 2].hit(limite, chave) for n in range(4)] == [True, True, True, False]
+        assert not limitadores[0].test(limite, chave)
+
+
+def test_contador_reinicia_ao_expirar(tmp_path):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path / 'limites.db'}")
+    assert storage.incr("login", 0.05) == 1
+    assert storage.incr("login", 0.05, amount=2) == 3
+    assert storage.get("login") == 3
+    assert storage.decr("login", 5) == 0
+    time.sleep(0.1)
+    assert storage.get("login") == 0
+    assert storage.incr("login", 60) == 1
+    assert storage.get_expiry("login") > time.time() + 50
+
+
+def test_compactacao_remove_so_as_expiradas(tmp_path):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path / 'limites.db'}", compaction_batch=2)
+    for n in range(5):
+        storage.incr(f"velha{n}", 0.01)
+    storage.incr("atual", 60)
+    time.sleep(0.05)
+    assert storage.compact() == 5
+    assert storage._conn().execute("SELECT chave FROM limites").fetchall() == [("atual",)]
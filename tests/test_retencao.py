@@ -0,0 +1,115 @@
+"""Retenção (``retention.py``) e os rollups das conversas arquivadas."""
+import gzip
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+
+import queries
+import retention
+import rollups
+from models import conversas_chat, feedbacks, rollup_chat_dia, usuarios
+
+CORTE = datetime(2025, 3, 10, 12, 0)
+
+
+def _rollup(conn):
+    return {(str(dia), topico): total
+            for dia, topico, total in conn.execute(select(rollup_chat_dia)) if total}
+
+
+def _podar(conn, tabela, pasta, formato="ndjson"):
+    ate_id = conn.execute(select(func.max(retention.TABELAS[tabela][0].c.id))).scalar()
+    arquivos = retention.archive(conn, tabela, CORTE, ate_id, str(pasta), formato=formato)
+    conn.rollback()
+    return arquivos, retention.purge(conn, tabela, CORTE, ate_id)
+
+
+def test_backfill_depois_da_retencao_mantem_as_conversas_arquivadas(engine, tmp_path):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+        conn.execute(conversas_chat.insert(), [
+            {"usuario_id": 1, "pergunta": "p", "resposta": "r", "topico": topico,
+             "data_conversa": data}
+            for topico, data in [
+                ("ux", datetime(2025, 3, 1, 9, 0)),
+                ("ux", datetime(2025, 3, 1, 15, 0)),
+                ("", datetime(2025, 3, 5, 10, 0)),
+                # O dia do corte fica metade arquivado, metade no banco
+                ("dados", datetime(2025, 3, 10, 8, 0)),
+                ("dados", datetime(2025, 3, 10, 18, 0)),
+                ("ux", datetime(2025, 3, 12, 10, 0)),
+            ]
+        ])
+
+    with engine.connect() as conn:
+        antes = _rollup(conn)
+        _, apagados = _podar(conn, "conversas_chat", tmp_path)
+        assert apagados == 4
+        assert _rollup(conn) == antes
+
+        rollups.rebuild(conn)
+        conn.commit()
+        assert _rollup(conn) == antes
+
+        # Só o período pedido é recalculado, com o arquivado somado de volta
+        rollups.rebuild(conn, desde=datetime(2025, 3, 5).date(), ate=datetime(2025, 3, 10).date())
+        conn.commit()
+        assert _rollup(conn) == antes
+        assert antes == {("2025-03-01", "ux"): 2, ("2025-03-05", ""): 1,
+                         ("2025-03-10", "dados"): 2, ("2025-03-12", "ux"): 1}
+
+
+def test_feedbacks_sem_data_sao_arquivados(engine, tmp_path):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+        conn.execute(feedbacks.insert(), [
+            {"usuario_id": 1, "comentario": "antigo, sem data", "data_criacao": None},
+            {"usuario_id": 1, "comentario": "antes do corte", "data_criacao": datetime(2025, 2, 1)},
+            {"usuario_id": 1, "comentario": "depois do corte", "data_criacao": datetime(2025, 4, 1)},
+        ])
+        # Como os registros de antes da coluna data_criacao
+        conn.execute(update(feedbacks).where(feedbacks.c.comentario == "antigo, sem data")
+                     .values(data_criacao=None))
+
+    with engine.connect() as conn:
+        arquivos, apagados = _podar(conn, "feedbacks", tmp_path)
+        assert apagados == 2
+        restantes = conn.execute(select(feedbacks.c.comentario)).scalars().all()
+        assert restantes == ["depois do corte"]
+
+    pastas = {os.path.basename(os.path.dirname(caminho)): linhas for caminho, linhas in arquivos}
+    assert pastas == {"2025-02": 1, retention.SEM_DATA: 1}
+    sem_data = next(c for c, _ in arquivos if os.sep + retention.SEM_DATA + os.sep in c)
+    with gzip.open(sem_data, "rt", encoding="utf-8") as f:
+        assert [json.loads(linha)["comentario"] for linha in f] == ["antigo, sem data"]
+
+
+def test_totais_do_usuario_contam_os_arquivados(engine, tmp_path):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+        conn.execute(feedbacks.insert(), [
+            {"usuario_id": 1, "comentario": "antigo", "data_criacao": datetime(2025, 2, 1)},
+            {"usuario_id": 1, "comentario": "novo", "data_criacao": datetime(2025, 4, 1)},
+        ])
+        conn.execute(conversas_chat.insert(), [
+            {"usuario_id": 1, "pergunta": "p", "resposta": "r", "topico": "ux",
+             "data_conversa": datetime(2025, 3, dia)}
+            for dia in (1, 2, 20)
+        ])
+
+    with engine.connect() as conn:
+        antes = queries.get_user_summary(conn, 1)
+        assert (antes["total_feedbacks"], antes["total_conversas"]) == (2, 3)
+        assert _podar(conn, "feedbacks", tmp_path)[1] == 1
+        assert _podar(conn, "conversas_chat", tmp_path)[1] == 2
+
+        depois = queries.get_user_summary(conn, 1)
+        assert (depois["total_feedbacks"], depois["total_conversas"]) == (2, 3)
+        assert [f["comentario"] for f in depois["ultimos_feedbacks"]] == ["novo"]
+
+        # Registros novos seguem somando normalmente
+        conn.execute(feedbacks.insert(), {"usuario_id": 1, "comentario": "mais um"})
+        conn.commit()
+        assert queries.get_user_summary(conn, 1)["total_feedbacks"] == 3
@@ -0,0 +1,78 @@
+"""Rollups diários (``rollups.py``): triggers, baldes e validação do período."""
+from datetime import date, datetime
+
+import pytest
+
+import rollups
+from models import conversas_chat, resultados_teste, usuarios
+
+
+@pytest.fixture
+def banco(engine):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+        conn.execute(resultados_teste.insert(), [
+            {"usuario_id": 1, "perfil": perfil, "pontuacao": 5, "data_teste": data}
+            for perfil, data in [
+                ("exatas", datetime(2025, 3, 3, 9, 0)),     # segunda-feira
+                ("exatas", datetime(2025, 3, 9, 23, 59)),   # domingo, mesma semana
+                ("humanas", datetime(2025, 3, 10, 8, 0)),
+                ("humanas", datetime(2025, 4, 1, 8, 0)),
+            ]
+        ])
+        conn.execute(conversas_chat.insert(), [
+            {"usuario_id": 1, "pergunta": "p", "resposta": "r", "topico": topico,
+             "data_conversa": datetime(2025, 3, 4, 10, 0)}
+            for topico in ("ux", "ux", None)
+        ])
+    return engine
+
+
+def test_series_por_semana_e_mes(banco):
+    with banco.connect() as conn:
+        # O início é alinhado à segunda-feira da sua semana
+        semanas = rollups.profile_trend(conn, *rollups.parse_periodo("semana", "2025-03-05", "2025-03-20"))
+        assert semanas["inicio"] == "2025-03-03"
+        assert semanas["labels"] == ["2025-03-03", "2025-03-10", "2025-03-17"]
+        assert semanas["series"] == {"exatas": [2, 0, 0], "humanas": [0, 1, 0]}
+
+        meses = rollups.test_volume(conn, "mes", date(2025, 2, 1), date(2025, 4, 30))
+        assert meses["labels"] == ["2025-02-01", "2025-03-01", "2025-04-01"]
+        assert meses["values"] == [0, 3, 1]
+        vazio = rollups.test_volume(conn, "dia", date(2024, 1, 1), date(2024, 1, 2))
+        assert vazio["values"] == [0, 0]
+
+        dias = rollups.chat_topics(conn, "dia", date(2025, 3, 4), date(2025, 3, 4))
+        assert dias["series"] == {"sem_topico": [1], "ux": [2]}
+
+
+def test_triggers_acompanham_alteracoes_e_rebuild_confere(banco):
+    with banco.begin() as conn:
+        conn.execute(resultados_teste.update()
+                     .where(resultados_teste.c.data_teste == datetime(2025, 3, 3, 9, 0))
+                     .values(perfil="biologicas"))
+        conn.execute(resultados_teste.delete()
+                     .where(resultados_teste.c.data_teste == datetime(2025, 4, 1, 8, 0)))
+    with banco.connect() as conn:
+        antes = rollups.profile_trend(conn, "dia", date(2025, 3, 1), date(2025, 4, 1))
+        assert antes["series"]["biologicas"][2] == 1
+        assert sum(antes["series"]["humanas"]) == 1
+
+        rollups.rebuild(conn)
+        conn.commit()
+        assert rollups.profile_trend(conn, "dia", date(2025, 3, 1), date(2025, 4, 1)) == antes
+
+
+def test_parse_periodo():
+    hoje = date(2025, 3, 12)
+    assert rollups.parse_periodo("semana", hoje=hoje) == ("semana", date(2024, 12, 23), hoje)
+    assert rollups.parse_periodo("mes", "2025-01-15", "2025-03-01") == (
+        "mes", date(2025, 1, 1), date(2025, 3, 1))
+    for argumentos, mensagem in [
+        (("ano",), "Granularidade desconhecida"),
+        (("dia", "2025-13-01"), "Data inválida em 'inicio'"),
+        (("dia", "2025-03-10", "2025-03-01"), "anterior a 'fim'"),
+        (("dia", "2020-01-01", "2025-01-01"), "Período longo demais"),
+    ]:
+        with pytest.raises(rollups.RollupError, match=mensagem):
+            rollups.parse_periodo(*argumentos)
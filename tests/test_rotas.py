@@ -0,0 +1,126 @@
+"""Rotas principais do app contra o banco SQLite de testes."""
+import csv
+import io
+
+import pytest
+
+RESPOSTAS = {"q1": "analitico", "q2": "analitico", "q3": "analitico", "q4": "organizado", "q5": "analitico"}
+ADMIN = {"Authorization": "Bearer token-de-teste"}
+
+
+def test_paginas_publicas(client):
+    for rota in ("/", "/login", "/register", "/resultado?perfil=exatas"):
+        assert client.get(rota).status_code == 200
+
+
+@pytest.mark.parametrize("rota", ["/dashboard", "/teste", "/chat", "/feedback", "/api/stats"])
+def test_rotas_protegidas_exigem_login(client, rota):
+    resposta = client.get(rota)
+    assert resposta.status_code == 302
+    assert "/login" in resposta.headers["Location"]
+
+
+def test_login_com_senha_errada(client):
+    dados = {"nome": "Senha Errada", "email": "senha.errada@escola.br", "senha": "segredo1"}
+    assert client.post("/register", data=dados).status_code == 302
+    resposta = client.post("/login", data={"email": dados["email"], "senha": "outra-senha"})
+    assert resposta.status_code == 200
+    assert "E-mail ou senha incorretos." in resposta.get_data(as_text=True)
+    with client.session_transaction() as sessao:
+        assert "usuario_id" not in sessao
+
+
+def test_cadastro_com_email_repetido(client):
+    dados = {"nome": "Repetido", "email": "repetido@escola.br", "senha": "segredo1"}
+    assert client.post("/register", data=dados).status_code == 302
+    resposta = client.post("/register", data=dados)
+    assert resposta.status_code == 200
+    assert "Este e-mail já está cadastrado." in resposta.get_data(as_text=True)
+
+
+def test_teste_feedback_e_chat_aparecem_nos_totais(usuario):
+    client, _ = usuario
+    resposta = client.post("/teste", data=RESPOSTAS)
+    assert resposta.status_code == 302
+    assert "/resultado?perfil=" in resposta.headers["Location"]
+    assert client.post("/feedback", data={"message": "Gostei muito das trilhas."}).status_code == 302
+    assert client.post("/chat", data={"question": "o que faz um ux designer?"}).status_code == 200
+
+    assert client.get("/api/stats").get_json() == {
+        "total_testes": 1, "total_feedbacks": 1, "total_conversas": 1,
+    }
+    pagina = client.get("/dashboard").get_data(as_text=True)
+    assert "Seu Histórico de Testes (1)" in pagina
+
+
+def test_teste_incompleto_nao_grava(usuario):
+    client, _ = usuario
+    resposta = client.post("/teste", data={"q1": "analitico"})
+    assert resposta.headers["Location"].endswith("/teste")
+    assert client.get("/api/stats").get_json()["total_testes"] == 0
+
+
+def test_feedback_curto_nao_grava(usuario):
+    client, _ = usuario
+    assert client.post("/feedback", data={"message": "curto"}).status_code == 200
+    assert client.get("/api/stats").get_json()["total_feedbacks"] == 0
+
+
+def test_dashboard_da_api_com_etag(usuario):
+    client, _ = usuario
+    resposta = client.get("/api/v1/me/dashboard")
+    assert resposta.status_code == 200
+    assert resposta.get_json()["total_testes"] == 0
+    etag = resposta.headers["ETag"]
+    assert client.get("/api/v1/me/dashboard", headers={"If-None-Match": etag}).status_code == 304
+
+    # Um teste novo muda a versão do usuário e, com ela, o ETag
+    client.post("/teste", data=RESPOSTAS)
+    resposta = client.get("/api/v1/me/dashboard", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+    assert resposta.get_json()["total_testes"] == 1
+
+
+def test_dashboard_da_api_exige_login(client):
+    assert client.get("/api/v1/me/dashboard").status_code == 401
+
+
+def test_perfil_da_api_com_etag(client):
+    resposta = client.get("/api/v1/perfis/exatas")
+    assert resposta.status_code == 200
+    etag = resposta.headers["ETag"]
+    assert client.get("/api/v1/perfis/exatas", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/v1/perfis/inexistente").status_code == 404
+
+
+def test_distribuicao_de_perfis_com_etag(usuario):
+    client, _ = usuario
+    resposta = client.get("/api/chart/profile-distribution")
+    assert resposta.status_code == 200
+    assert set(resposta.get_json()) == {"labels", "values"}
+    etag = resposta.headers["ETag"]
+    resposta = client.get("/api/chart/profile-distribution", headers={"If-None-Match": etag})
+    assert resposta.status_code == 304
+
+
+def test_exportacao_administrativa(usuario):
+    client, usuario_id = usuario
+    client.post("/teste", data=RESPOSTAS)
+
+    assert client.get("/api/admin/export/resultados_teste").status_code == 401
+    resposta = client.get("/api/admin/export/resultados_teste?formato=csv", headers=ADMIN)
+    assert resposta.status_code == 200
+    linhas = list(csv.DictReader(io.StringIO(resposta.get_data(as_text=True))))
+    assert any(int(linha["usuario_id"]) == usuario_id for linha in linhas)
+    assert int(resposta.headers["X-Export-Watermark"]) >= max(int(linha["id"]) for linha in linhas)
+
+    resposta = client.get("/api/admin/export/usuarios", headers=ADMIN)
+    assert resposta.status_code == 400
+
+
+def test_rotas_desligadas_respondem_404(client):
+    for rota in ("/metrics", "/api/db/pool-stats", "/api/chat/cache-stats"):
+        resposta = client.get(rota)
+        assert resposta.status_code == 404
+        assert resposta.get_json() == {"error": "Não encontrado"}
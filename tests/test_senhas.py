@@ -0,0 +1,78 @@
+"""Hash de senhas no pool de processos (``passwords.PasswordHasher``)."""
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import repository
+from passwords import HasherBusy, PasswordHasher
+
+METODO = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(method=METODO, workers=1, max_pending=1, timeout=10)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_e_verificacao_no_pool(hasher):
+    senha_hash = hasher.hash("segredo1")
+    assert senha_hash.startswith(METODO + "$")
+    assert hasher.verify(senha_hash, "segredo1")
+    assert not hasher.verify(senha_hash, "outra")
+    assert hasher.hash_many(["a", "b"])[1].startswith(METODO + "$")
+
+
+def test_needs_rehash():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0)
+    assert not hasher.needs_rehash(generate_password_hash("x", "pbkdf2:sha256:1000"))
+    assert hasher.needs_rehash(generate_password_hash("x", "pbkdf2:sha256:500"))
+
+
+def test_vaga_so_volta_quando_o_processo_termina(hasher):
+    hasher.hash("aquece o pool")
+    hasher.timeout = 0.05
+    with pytest.raises(HasherBusy):
+        hasher._run(time.sleep, 1.0)
+    # O processo segue ocupado depois do timeout: a vaga continua tomada
+    with pytest.raises(HasherBusy):
+        hasher.hash("segredo1")
+    assert hasher.rejected == 1
+
+    hasher.timeout = 10
+    fim = time.monotonic() + 10
+    while True:
+        try:
+            assert hasher.hash("segredo1").startswith(METODO + "$")
+            break
+        except HasherBusy:
+            assert time.monotonic() < fim
+            time.sleep(0.05)
+
+
+def test_login_segue_quando_o_rehash_falha(app, client, monkeypatch):
+    import app as app_module
+
+    antigo = generate_password_hash("segredo1", "pbkdf2:sha256:500")
+    with app.app_context():
+        conn = app_module.get_db()
+        repository.create_user(conn, "Rehash", "rehash@escola.br", antigo)
+        conn.commit()
+
+    def ocupado(senha):
+        raise HasherBusy("Muitas operações de senha em andamento")
+
+    monkeypatch.setattr(app_module.password_hasher, "hash", ocupado)
+    resposta = client.post("/login", data={"email": "rehash@escola.br", "senha": "segredo1"})
+    assert resposta.status_code == 302
+    with client.session_transaction() as sessao:
+        assert "usuario_id" in sessao
+
+    # Com o pool livre, o próximo login refaz o hash
+    monkeypatch.undo()
+    client.post("/login", data={"email": "rehash@escola.br", "senha": "segredo1"})
+    with app.app_context():
+        usuario = repository.get_user_by_email(app_module.get_db(), "rehash@escola.br")
+    assert usuario["senha"].startswith("pbkdf2:sha256:1000$")
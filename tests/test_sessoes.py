@@ -0,0 +1,86 @@
+"""Sessões no servidor (``sessions.py``) num app Flask mínimo."""
+import time
+from datetime import timedelta
+
+import pytest
+from flask import Flask, session
+
+from sessions import ServerSessionInterface, SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sessoes.db"))
+
+
+@pytest.fixture
+def cliente(store):
+    app = Flask(__name__)
+    app.secret_key = "segredo"
+    app.permanent_session_lifetime = timedelta(hours=1)
+    app.session_interface = ServerSessionInterface(store)
+
+    @app.route("/login/<int:usuario_id>")
+    def login(usuario_id):
+        session["usuario_id"] = usuario_id
+        return ""
+
+    @app.route("/quem")
+    def quem():
+        return str(session.get("usuario_id"))
+
+    @app.route("/publica")
+    def publica():
+        return "ok"
+
+    @app.route("/logout")
+    def logout():
+        session.clear()
+        return ""
+
+    return app.test_client()
+
+
+def _cookie(cliente):
+    cookie = cliente.get_cookie("session")
+    return cookie.value if cookie else None
+
+
+def test_cookie_opaco_e_id_trocado_no_login(cliente, store):
+    assert cliente.get("/publica").headers.get("Set-Cookie") is None
+    cliente.get("/login/1")
+    sid = _cookie(cliente)
+    assert store.load(sid)[0] == {"usuario_id": 1}
+    # Requisições que só leem a sessão não regravam o cookie
+    resposta = cliente.get("/quem")
+    assert resposta.get_data(as_text=True) == "1"
+    assert resposta.headers.get("Set-Cookie") is None
+
+    # Troca de usuário: id novo e o antigo deixa de valer
+    cliente.get("/login/2")
+    assert _cookie(cliente) != sid
+    assert store.load(sid) is None
+
+    cliente.get("/logout")
+    assert _cookie(cliente) is None
+    assert store.count() == 0
+
+
+def test_revogar_encerra_todas_as_sessoes_do_usuario(store, cliente):
+    cliente.get("/login/7")
+    store.save("outro-aparelho", {"usuario_id": 7}, time.time() + 60)
+    store.save("outra-pessoa", {"usuario_id": 8}, time.time() + 60)
+    assert store.revoke_user(7) == 2
+    assert cliente.get("/quem").get_data(as_text=True) == "None"
+    assert store.count() == 1
+
+
+def test_limpeza_remove_so_as_expiradas(tmp_path):
+    store = SessionStore(str(tmp_path / "sessoes.db"), cleanup_batch=2)
+    for n in range(5):
+        store.save(f"velha{n}", {"usuario_id": n}, time.time() - 1)
+    store.save("atual", {"usuario_id": 9}, time.time() + 60)
+    assert store.load("velha0") is None
+    assert store.cleanup() == 5
+    assert store.count() == 1
+    assert store.load("atual")[0] == {"usuario_id": 9}
@@ -0,0 +1,104 @@
+"""Fila write-behind (``write_behind.WriteBehindQueue``)."""
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from models import feedbacks, usuarios
+from write_behind import WriteBehindQueue
+
+
+def _feedback(usuario_id, comentario):
+    return {"usuario_id": usuario_id, "comentario": comentario}
+
+
+def test_on_written_roda_depois_do_commit(engine):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), [
+            {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"},
+            {"id": 2, "nome": "Bia", "email": "bia@escola.br", "senha": "x"},
+        ])
+
+    vistos = []
+
+    def on_written(registros):
+        # Outra conexão já enxerga o lote: a versão relida é a nova
+        with engine.connect() as conn:
+            total = conn.execute(select(func.count()).select_from(feedbacks)).scalar()
+        vistos.append((sorted(v["usuario_id"] for _, v in registros), total))
+
+    fila = WriteBehindQueue(engine.connect, flush_interval=0.05, on_written=on_written)
+    try:
+        assert fila.submit("feedbacks", _feedback(1, "primeiro feedback"))
+        assert fila.submit("feedbacks", _feedback(2, "segundo feedback"))
+        assert fila.flush(timeout=5)
+    finally:
+        fila.stop()
+
+    assert vistos == [([1, 2], 2)]
+    assert fila.stats()["written"] == 2
+
+
+def test_erro_no_on_written_nao_descarta_o_lote(engine):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+
+    def on_written(registros):
+        raise RuntimeError("falha no callback")
+
+    fila = WriteBehindQueue(engine.connect, flush_interval=0.05, on_written=on_written)
+    try:
+        assert fila.submit("feedbacks", _feedback(1, "um feedback qualquer"))
+        assert fila.flush(timeout=5)
+    finally:
+        fila.stop()
+
+    assert fila.stats()["written"] == 1
+    assert fila.stats()["failed"] == 0
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(feedbacks)).scalar() == 1
+
+
+def test_stop_com_fila_cheia_respeita_o_timeout(engine):
+    with engine.begin() as conn:
+        conn.execute(usuarios.insert(), {"id": 1, "nome": "Ana", "email": "ana@escola.br", "senha": "x"})
+
+    liberado = threading.Event()
+
+    def connect():
+        # Banco travado: a thread fica presa no primeiro lote
+        liberado.wait()
+        return engine.connect()
+
+    fila = WriteBehindQueue(connect, batch_size=1, flush_interval=0.05, max_size=1)
+    assert fila.submit("feedbacks", _feedback(1, "primeiro feedback"))
+    time.sleep(0.2)
+    assert fila.submit("feedbacks", _feedback(1, "segundo feedback"))
+
+    inicio = time.monotonic()
+    fila.stop(timeout=0.3)
+    assert time.monotonic() - inicio < 1
+
+    # Destravado, a thread grava o que ficou na fila e termina
+    liberado.set()
+    fila._thread.join(5)
+    assert not fila._thread.is_alive()
+    assert fila.stats()["written"] == 2
+
+
+def test_caches_invalidados_depois_da_gravacao(app):
+    import app as app_module
+    from models import resultados_teste
+
+    with app.app_context():
+        conn = app_module.get_db()
+        antes = app_module.stats_cache.get_global_stats(conn)["total_tests"]
+        registro = {"usuario_id": None, "pontuacao": 1, "perfil": "exatas"}
+        conn.execute(resultados_teste.insert(), registro)
+        conn.commit()
+
+        # Gravado pela fila, mas o lote só tinha feedbacks: o cache segue valendo
+        app_module.invalidar_caches([("feedbacks", {"usuario_id": None})])
+        assert app_module.stats_cache.get_global_stats(conn)["total_tests"] == antes
+        app_module.invalidar_caches([("resultados_teste", registro)])
+        assert app_module.stats_cache.get_global_stats(conn)["total_tests"] == antes + 1
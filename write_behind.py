@@ -0,0 +1,204 @@
+"""Fila write-behind para gravações que não precisam ser síncronas.
+
+Uma thread por worker drena a fila e grava os INSERTs de ``conversas_chat``,
+``feedbacks`` e ``resultados_teste`` em lotes, numa única transação por
+lote, deixando a latência da requisição independente do custo de fsync e
+da disputa pelo lock de escrita do banco. Cada lote vira um INSERT em lote
+por tabela (``repository.insert_rows``). ``on_written`` recebe os
+registros ``[(tabela, valores)]`` de cada lote logo depois do commit, para
+invalidar caches que dependem deles.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+import repository
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    def __init__(self, connect, batch_size=100, flush_interval=0.5,
+                 max_size=10000, put_timeout=0.25, on_written=None):
+        self.connect = connect
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopped = False
+        # Pedido de parada quando a fila está cheia demais para receber _STOP
+        self._stop_event = threading.Event()
+
+        # Contadores expostos em stats()
+        self._submitted = 0
+        self._written = 0
+        self._batches = 0
+        self._rejected = 0
+        self._failed = 0
+
+        atexit.register(self.stop)
+
+    def _ensure_started(self):
+        # A thread é criada sob demanda em cada processo (seguro após fork)
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._stopped = False
+                self._stop_event = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, name="write-behind", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, tabela, valores):
+        """Enfileira um INSERT de ``valores`` (dict) em ``tabela``. Retorna
+        False se a fila continuar cheia após
+        ``put_timeout`` (backpressure); quem chamou deve gravar direto."""
+        if self._stopped:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put((tabela, valores), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return False
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Bloqueia até que tudo o que já foi enfileirado esteja gravado."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self, timeout=10):
+        """Grava o que estiver pendente e encerra a thread (chamado no atexit)."""
+        if self._stopped or self._thread is None or self._pid != os.getpid():
+            return
+        self._stopped = True
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            # A thread para no fim do lote atual, drenando o que couber no prazo
+            self._stop_event.set()
+        self._thread.join(max(0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "submitted": self._submitted,
+                "written": self._written,
+                "batches": self._batches,
+                "rejected": self._rejected,
+                "failed": self._failed,
+            }
+
+    def _run(self):
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            events = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if not running or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if self._stop_event.is_set():
+                running = False
+
+            # No encerramento, drena o que ainda estiver na fila
+            while not running:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    events.append(item)
+                elif item is not _STOP:
+                    batch.append(item)
+
+            if batch:
+                self._write(batch)
+            for event in events:
+                event.set()
+
+    def _write(self, batch):
+        # Conexão emprestada do pool só durante a gravação do lote
+        grouped = defaultdict(list)
+        for tabela, valores in batch:
+            grouped[tabela].append(valores)
+        try:
+            with self.connect() as conn:
+                for tabela, registros in grouped.items():
+                    repository.insert_rows(conn, tabela, registros)
+                conn.commit()
+            written, failed = len(batch), 0
+            self._notify(batch)
+        except Exception:
+            logger.exception("Erro ao gravar lote write-behind de %d registros; "
+                             "gravando registro a registro", len(batch))
+            written, failed = 0, 0
+            for tabela, valores in batch:
+                try:
+                    with self.connect() as conn:
+                        repository.insert_rows(conn, tabela, [valores])
+                        conn.commit()
+                    written += 1
+                    self._notify([(tabela, valores)])
+                except Exception as row_error:
+                    # Perda de dado: o registro não volta para a fila
+                    failed += 1
+                    logger.error("Registro descartado pela fila write-behind (tabela %s): %s",
+                                 tabela, row_error, exc_info=row_error)
+        with self._lock:
+            self._written += written
+            self._failed += failed
+            self._batches += 1
+
+    def _notify(self, registros):
+        if self.on_written is None:
+            return
+        try:
+            self.on_written(registros)
+        except Exception:
+            # Os registros já estão gravados; um erro aqui não os descarta
+            logger.exception("Erro no on_written da fila write-behind")